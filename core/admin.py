@@ -1,14 +1,14 @@
 from django.contrib import admin
-from .models import Task, Schedule, ScheduleItem, Preferences, CalendarEvent
+from .models import Task, Schedule, ScheduleItem, Preferences, CalendarEvent, PlanCacheEntry, DayRollup
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = (
-        'title', 'priority', 'duration_minutes', 'energy_level', 'daily_time_minutes',
+        'title', 'user', 'priority', 'duration_minutes', 'energy_level', 'daily_time_minutes',
         'time_of_day_pref', 'task_type', 'begin_date', 'deadline', 'completed', 'created_at'
     )
-    list_filter = ('priority', 'energy_level', 'time_of_day_pref', 'task_type', 'completed')
+    list_filter = ('user', 'priority', 'energy_level', 'time_of_day_pref', 'task_type', 'completed')
     search_fields = ('title',)
     date_hierarchy = 'begin_date'
     ordering = ('-created_at',)
@@ -23,8 +23,8 @@ class ScheduleItemInline(admin.TabularInline):
 
 @admin.register(Schedule)
 class ScheduleAdmin(admin.ModelAdmin):
-    list_display = ('id', 'mode', 'day_date', 'day_start', 'day_end', 'created_at')
-    list_filter = ('mode', 'day_date')
+    list_display = ('id', 'user', 'mode', 'day_date', 'day_start', 'day_end', 'created_at')
+    list_filter = ('user', 'mode', 'day_date')
     search_fields = ('plan_text',)
     date_hierarchy = 'day_date'
     ordering = ('-day_date', '-created_at')
@@ -41,12 +41,25 @@ class ScheduleItemAdmin(admin.ModelAdmin):
 
 @admin.register(Preferences)
 class PreferencesAdmin(admin.ModelAdmin):
-    list_display = ('focus_window_start', 'focus_window_end', 'break_cadence_minutes', 'working_days')
+    list_display = ('user', 'focus_window_start', 'focus_window_end', 'break_cadence_minutes', 'working_days')
 
 
 @admin.register(CalendarEvent)
 class CalendarEventAdmin(admin.ModelAdmin):
-    list_display = ('title', 'start_time', 'end_time', 'source')
-    list_filter = ('source',)
+    list_display = ('title', 'user', 'start_time', 'end_time', 'source')
+    list_filter = ('user', 'source')
     search_fields = ('title',)
     date_hierarchy = 'start_time'
+
+
+@admin.register(PlanCacheEntry)
+class PlanCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'stored_at', 'last_used_at', 'hits')
+    ordering = ('-last_used_at',)
+
+
+@admin.register(DayRollup)
+class DayRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'user', 'scheduled_minutes', 'item_count', 'event_minutes', 'has_schedule', 'updated_at')
+    date_hierarchy = 'day'
+    ordering = ('-day',)
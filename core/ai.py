@@ -1,7 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable, List
 from django.conf import settings
 import json
 
+from . import plan_cache
+from .chat_context import build_chat_context, estimate_tokens
+from .llm import chat_completion, chat_completion_stream
+
 def _format_task(t):
     dur = getattr(t, 'daily_time_minutes', 0) or getattr(t, 'duration_minutes', 30)
     base = f"- {t.title} | priority={t.priority}, planned={dur}m, energy={t.energy_level}"
@@ -10,7 +15,11 @@ def _format_task(t):
     return base
 
 def build_prompt(tasks: Iterable, mode: str, day_start: str, day_end: str) -> str:
-    items = "\n".join(_format_task(t) for t in tasks)
+    return _build_prompt_from_lines([_format_task(t) for t in tasks], mode, day_start, day_end)
+
+
+def _build_prompt_from_lines(task_lines: List[str], mode: str, day_start: str, day_end: str) -> str:
+    items = "\n".join(task_lines)
     return (
         "You are Kash AI, an empathetic scheduling assistant for the Kairos app.\n"
         "Create an optimized, conflict-free day plan entirely within the timeframe.\n"
@@ -22,167 +31,257 @@ def build_prompt(tasks: Iterable, mode: str, day_start: str, day_end: str) -> st
         "Tasks:\n" + (items if items else "(no tasks provided)")
     )
 
+def build_range_prompt(days: List[dict], mode: str) -> str:
+    """Prompt covering several dates in one request.
+
+    ``days`` is a list of dicts with keys date, day_start, day_end, tasks and
+    optionally busy (list of "HH:MM-HH:MM" strings for calendar events).
+    """
+    return _build_range_prompt_from_lines(_range_day_lines(days), mode)
+
+
+def _range_day_lines(days: List[dict]) -> List[str]:
+    lines = []
+    for d in days:
+        lines.append(f"Date {d['date'].isoformat()} ({d['date'].strftime('%A')}): timeframe {d['day_start']} to {d['day_end']}")
+        if d.get('busy'):
+            lines.append("Busy (do not schedule over): " + ", ".join(d['busy']))
+        task_lines = [_format_task(t) for t in d['tasks']]
+        lines.extend(task_lines if task_lines else ["(no tasks provided)"])
+    return lines
+
+
+def _build_range_prompt_from_lines(day_lines: List[str], mode: str) -> str:
+    return (
+        "You are Kash AI, an empathetic scheduling assistant for the Kairos app.\n"
+        "Create an optimized, conflict-free plan for EACH date below, entirely within that date's timeframe.\n"
+        f"Mode: {mode}.\n"
+        "Rules: Respect deadlines, balance energy, cluster deep work, include short breaks, spread recurring work across days.\n"
+        "IMPORTANT OUTPUT FORMAT: Respond ONLY with JSON using this schema, one key per date:\n"
+        "{\n  \"days\": { \"YYYY-MM-DD\": { \"items\": [ { \"title\": \"...\", \"start\": \"HH:MM\", \"end\": \"HH:MM\" }, ... ], \"notes\": \"...\" }, ... }\n}\n"
+        "Ensure all times use 24h format HH:MM, are ordered, non-overlapping, and within each date's timeframe.\n"
+        "Dates:\n" + "\n".join(day_lines)
+    )
+
+
+def _is_cacheable_plan(plan: str) -> bool:
+    # Only cache well-formed JSON plans; error strings and free text must not stick
+    try:
+        data = json.loads(plan)
+    except Exception:
+        return False
+    return isinstance(data, dict) and bool(data.get('items') or data.get('days'))
+
+
+def _schedule_cache_key(task_lines: List[str], mode: str, day_start: str, day_end: str) -> str:
+    return plan_cache.plan_cache_key(task_lines, mode, day_start, day_end, getattr(settings, 'OPENAI_MODEL', ''))
+
+
+def cached_schedule(tasks: Iterable, mode: str, day_start: str, day_end: str):
+    """Return a cached plan for these inputs without calling OpenAI, or None."""
+    return plan_cache.get_plan(_schedule_cache_key([_format_task(t) for t in tasks], mode, day_start, day_end))
+
+
 def generate_schedule(tasks: Iterable, mode: str, day_start: str, day_end: str) -> str:
     if not settings.OPENAI_API_KEY:
         return "Missing OPENAI_API_KEY. Set it in environment to enable Kash AI."
-    prompt = build_prompt(tasks, mode, day_start, day_end)
-    # Prefer modern SDK (v1+) but gracefully fall back to legacy (<=0.28)
-    try:
-        from openai import OpenAI  # modern SDK
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        model = getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are Kash AI for Kairos."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.5,
-        )
-        return resp.choices[0].message.content
-    except Exception:
-        try:
-            import openai  # legacy SDK
-            openai.api_key = settings.OPENAI_API_KEY
-            legacy_model = getattr(settings, 'OPENAI_MODEL', 'gpt-3.5-turbo')
-            resp = openai.ChatCompletion.create(
-                model=legacy_model,
-                messages=[
-                    {"role": "system", "content": "You are Kash AI for Kairos."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.5,
-            )
-            return resp['choices'][0]['message']['content']
-        except Exception as e2:
-            return f"Kash AI error: {e2}"
-
-
-def _summarize_tasks_for_chat(tasks: Iterable) -> str:
-    lines: List[str] = []
-    for t in tasks:
-        dur = int(getattr(t, 'daily_time_minutes', 0) or getattr(t, 'duration_minutes', 30))
-        bits = [
-            f"title={t.title}",
-            f"priority={getattr(t, 'priority', 'Medium')}",
-            f"energy={getattr(t, 'energy_level', 'Normal')}",
-            f"planned={dur}m",
-        ]
-        if getattr(t, 'begin_date', None):
-            bits.append(f"begin={t.begin_date.isoformat()}")
-        if getattr(t, 'deadline', None):
-            try:
-                bits.append(f"deadline={t.deadline.isoformat()}")
-            except Exception:
-                pass
-        lines.append("- " + ", ".join(bits))
-    return "\n".join(lines) if lines else "(no tasks)"
-
-
-def _summarize_schedules_for_chat(schedules: Iterable) -> str:
-    lines: List[str] = []
-    for sch in schedules:
-        try:
-            day = getattr(sch, 'day_date', None)
-            day_s = day.isoformat() if day else '(unknown day)'
-        except Exception:
-            day_s = '(unknown day)'
-        lines.append(f"Day {day_s}:")
-        idx = 0
-        for it in getattr(sch, 'items', []).all() if hasattr(sch, 'items') else []:
-            st = getattr(it, 'start_time', None)
-            en = getattr(it, 'end_time', None)
-            st_s = st.strftime('%H:%M') if st else '??:??'
-            en_s = en.strftime('%H:%M') if en else '??:??'
-            lines.append(f"  {idx+1}. {st_s}-{en_s} {getattr(it, 'title', '')}")
-            idx += 1
-        if idx == 0:
-            lines.append("  (no items)")
-    return "\n".join(lines) if lines else "(no saved schedules)"
-
-
-def generate_chat_reply(user_message: str, tasks: Iterable, schedules: Iterable, day_start: str = None, day_end: str = None) -> str:
-    """Produce a helpful assistant reply using tasks and saved schedules.
+    task_lines = [_format_task(t) for t in tasks]
+    key = _schedule_cache_key(task_lines, mode, day_start, day_end)
+    cached = plan_cache.get_plan(key)
+    if cached is not None:
+        return cached
+    return _generate_and_store(key, task_lines, mode, day_start, day_end)
 
-    Uses the configured OpenAI API key. Defaults to a fast chat model if none set.
+
+def _generate_and_store(key: str, task_lines: List[str], mode: str, day_start: str, day_end: str) -> str:
+    plan = _generate_schedule_uncached(task_lines, mode, day_start, day_end)
+    if plan and _is_cacheable_plan(plan):
+        plan_cache.put_plan(key, plan)
+    return plan
+
+
+def generate_schedule_range(days: List[dict], mode: str) -> str:
+    """One LLM call planning every date in ``days`` (see build_range_prompt).
+
+    Returns the raw JSON text with a top-level "days" object keyed by ISO date.
+    Cached like single-day plans, keyed on every date's inputs.
     """
     if not settings.OPENAI_API_KEY:
-        return "AI is not configured. Set OPENAI_API_KEY in the environment."
-    task_summary = _summarize_tasks_for_chat(tasks)
-    schedule_summary = _summarize_schedules_for_chat(schedules)
-    timeframe = f"Focus window: {day_start or '09:00'}–{day_end or '18:00'}"
+        return "Missing OPENAI_API_KEY. Set it in environment to enable Kash AI."
+    day_lines = _range_day_lines(days)
+    key = _schedule_cache_key(day_lines, f"range:{mode}", '', '')
+    cached = plan_cache.get_plan(key)
+    if cached is not None:
+        return cached
+    prompt = _build_range_prompt_from_lines(day_lines, mode)
+    try:
+        plan = chat_completion([
+            {"role": "system", "content": "You are Kash AI for Kairos."},
+            {"role": "user", "content": prompt},
+        ], temperature=0.5)
+    except Exception as e2:
+        return f"Kash AI error: {e2}"
+    if plan and _is_cacheable_plan(plan):
+        plan_cache.put_plan(key, plan)
+    return plan
+
+
+def _generate_schedule_uncached(task_lines: List[str], mode: str, day_start: str, day_end: str) -> str:
+    prompt = _build_prompt_from_lines(task_lines, mode, day_start, day_end)
+    try:
+        return chat_completion([
+            {"role": "system", "content": "You are Kash AI for Kairos."},
+            {"role": "user", "content": prompt},
+        ], temperature=0.5)
+    except Exception as e2:
+        return f"Kash AI error: {e2}"
+
+
+def _plan_lines_from_json(plan: str) -> List[str]:
+    """Turn a JSON plan into "- HH:MM-HH:MM Title" lines; empty when unparsable."""
+    try:
+        data = json.loads(plan)
+        items = data.get('items') or []
+    except Exception:
+        return []
+    lines = []
+    for it in items:
+        st = (it or {}).get('start')
+        en = (it or {}).get('end')
+        title = (it or {}).get('title') or ''
+        if st and en and title:
+            lines.append(f"- {st}-{en} {title}")
+    return lines
+
+
+def _plan_lines_from_schedule(schedule) -> List[str]:
+    lines = []
+    for it in schedule.items.all():
+        lines.append(f"- {it.start_time.strftime('%H:%M')}-{it.end_time.strftime('%H:%M')} {it.title}")
+    return lines
+
+
+def _generate_plan_in_thread(tasks: List, day_start: str, day_end: str) -> str:
+    # Worker threads get their own DB connection (plan cache); release it when done
+    from django.db import connections
+    try:
+        return generate_schedule(tasks, 'Balanced', day_start, day_end)
+    finally:
+        connections.close_all()
+
+
+def _chat_messages(user_message: str, tasks: List, schedules: Iterable, day_start: str, day_end: str):
+    """Build the chat prompt; returns ``(messages, context_report)``."""
+    context, report = build_chat_context(user_message, tasks, schedules, day_start, day_end)
     system = (
         "You are Kash AI, a helpful planning assistant inside the Kairos app. "
         "You can see the user's tasks and saved schedules. Answer clearly, propose plans, "
         "and reference items by title/times when helpful. Keep responses concise and actionable."
     )
-    context = (
-        f"Context\n{timeframe}\n\nTasks:\n{task_summary}\n\nSaved schedules:\n{schedule_summary}"
-    )
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": context},
+        {"role": "user", "content": user_message},
+    ]
+    report['prompt_tokens'] = sum(estimate_tokens(m['content']) for m in messages)
+    return messages, report
+
+
+class _PlanBlock:
+    """The reply's "Plan:" block, resolved from a saved schedule, the cache, or a concurrent generation."""
+
+    def __init__(self, tasks: List, day_start: str, day_end: str, saved_schedule=None):
+        self.source = 'none'
+        self.lines = _plan_lines_from_schedule(saved_schedule) if saved_schedule is not None else []
+        if self.lines:
+            self.source = 'saved'
+        else:
+            cached = cached_schedule(tasks, 'Balanced', day_start, day_end)
+            self.lines = _plan_lines_from_json(cached) if cached else []
+            if self.lines:
+                self.source = 'cache'
+        self._pool = None
+        self._future = None
+        if not self.lines:
+            # Start now so the plan is generated while the chat completion runs
+            self._pool = ThreadPoolExecutor(max_workers=1)
+            self._future = self._pool.submit(_generate_plan_in_thread, tasks, day_start, day_end)
+
+    def result(self) -> List[str]:
+        if self._future is not None:
+            self.lines = _plan_lines_from_json(self._future.result())
+            self._future = None
+            if self.lines:
+                self.source = 'generated'
+        return self.lines
+
+    def text(self) -> str:
+        lines = self.result()
+        return ("Plan:\n" + "\n".join(lines)) if lines else ''
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+def generate_chat_reply(user_message: str, tasks: Iterable, schedules: Iterable, day_start: str = None, day_end: str = None, saved_schedule=None):
+    """Produce a helpful assistant reply using tasks and saved schedules.
+
+    Uses the configured OpenAI API key. Defaults to a fast chat model if none set.
+    A "Plan:" block is always appended so Apply Plan can detect it. It comes
+    from ``saved_schedule`` (a fresh Schedule for the day) or the plan cache
+    when possible; otherwise the plan is generated concurrently with the chat
+    completion instead of after it.
+
+    Returns ``(reply_text, meta)`` where ``meta['plan_source']`` is one of
+    'saved', 'cache', 'generated' or 'none' and ``meta['context']`` reports
+    prompt size and truncation (see core.chat_context).
+    """
+    meta = {'plan_source': 'none'}
+    if not settings.OPENAI_API_KEY:
+        return "AI is not configured. Set OPENAI_API_KEY in the environment.", meta
+    tasks = list(tasks)
+    day_start = day_start or '09:00'
+    day_end = day_end or '18:00'
+    messages, meta['context'] = _chat_messages(user_message, tasks, schedules, day_start, day_end)
+    plan = _PlanBlock(tasks, day_start, day_end, saved_schedule)
     try:
-        # Prefer modern SDK (v1+)
-        from openai import OpenAI
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        model = getattr(settings, 'OPENAI_MODEL', 'gpt-3.5-turbo')
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": context},
-                {"role": "user", "content": user_message},
-            ],
-            temperature=0.4,
-        )
-        text = resp.choices[0].message.content
-        # Always append a valid schedule block so Apply Plan can detect it
-        plan = generate_schedule(list(tasks), 'Balanced', day_start or '09:00', day_end or '18:00')
-        try:
-            data = json.loads(plan)
-            items = data.get('items') or []
-            lines = []
-            for it in items:
-                st = (it or {}).get('start')
-                en = (it or {}).get('end')
-                title = (it or {}).get('title') or ''
-                if st and en and title:
-                    lines.append(f"- {st}-{en} {title}")
-            if lines:
-                text = text + "\n\nPlan:\n" + "\n".join(lines)
-        except Exception:
-            # If JSON parse fails, keep original text
-            pass
-        return text
-    except Exception:
-        try:
-            # Fallback legacy SDK
-            import openai
-            openai.api_key = settings.OPENAI_API_KEY
-            legacy_model = getattr(settings, 'OPENAI_MODEL', 'gpt-3.5-turbo')
-            resp = openai.ChatCompletion.create(
-                model=legacy_model,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": context},
-                    {"role": "user", "content": user_message},
-                ],
-                temperature=0.4,
-            )
-            text = resp['choices'][0]['message']['content']
-            plan = generate_schedule(list(tasks), 'Balanced', day_start or '09:00', day_end or '18:00')
-            try:
-                data = json.loads(plan)
-                items = data.get('items') or []
-                lines = []
-                for it in items:
-                    st = (it or {}).get('start')
-                    en = (it or {}).get('end')
-                    title = (it or {}).get('title') or ''
-                    if st and en and title:
-                        lines.append(f"- {st}-{en} {title}")
-                if lines:
-                    text = text + "\n\nPlan:\n" + "\n".join(lines)
-            except Exception:
-                pass
-            return text
-        except Exception as e2:
-            return f"Chat AI error: {e2}"
\ No newline at end of file
+        text = chat_completion(messages, temperature=0.4)
+        plan_text = plan.text()
+        meta['plan_source'] = plan.source
+        if plan_text:
+            text = text + "\n\n" + plan_text
+        return text, meta
+    except Exception as e2:
+        return f"Chat AI error: {e2}", meta
+    finally:
+        plan.close()
+
+
+def stream_chat_reply(user_message: str, tasks: Iterable, schedules: Iterable, day_start: str = None, day_end: str = None, saved_schedule=None):
+    """Streaming variant of ``generate_chat_reply``.
+
+    Yields event dicts: ``{"type": "token", "text": ...}`` for each delta as
+    the model produces it, then ``{"type": "plan", "text": ..., "source": ...}``
+    and finally ``{"type": "done", "context": {...}}``. Failures yield
+    ``{"type": "error"}``.
+    """
+    if not settings.OPENAI_API_KEY:
+        yield {'type': 'error', 'text': "AI is not configured. Set OPENAI_API_KEY in the environment."}
+        return
+    tasks = list(tasks)
+    day_start = day_start or '09:00'
+    day_end = day_end or '18:00'
+    messages, context_report = _chat_messages(user_message, tasks, schedules, day_start, day_end)
+    plan = _PlanBlock(tasks, day_start, day_end, saved_schedule)
+    try:
+        for delta in chat_completion_stream(messages, temperature=0.4):
+            yield {'type': 'token', 'text': delta}
+        plan_text = plan.text()
+        yield {'type': 'plan', 'text': plan_text, 'source': plan.source}
+        yield {'type': 'done', 'context': context_report}
+    except Exception as e2:
+        yield {'type': 'error', 'text': f"Chat AI error: {e2}"}
+    finally:
+        plan.close()
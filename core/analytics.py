@@ -0,0 +1,124 @@
+"""Analytics page data, aggregated in a few grouped queries and cached.
+
+The result is stored per user as an AnalyticsSnapshot keyed by their
+task/schedule data versions (core.versions) and the current date, and
+memoized in-process, so a repeat page load costs one query (the version
+check), or two when another process computed the snapshot.
+"""
+from datetime import timedelta
+import json
+import threading
+
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from . import versions
+from .models import AnalyticsSnapshot, Schedule, Task
+
+SNAPSHOT_KEY = 'analytics'
+
+# user id -> (signature, payload)
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _minutes(value) -> int:
+    return int(value.total_seconds() // 60) if value else 0
+
+
+def _item_minutes():
+    return Sum(ExpressionWrapper(F('items__end_time') - F('items__start_time'), output_field=DurationField()))
+
+
+def compute(user_id, today) -> dict:
+    """Build the user's analytics data with one task aggregate and two schedule queries."""
+    priority_labels = ['High', 'Medium', 'Low']
+    energy_labels = ['High', 'Normal', 'Low']
+    task_type_labels = [c[0] for c in Task.TASK_TYPE_CHOICES]
+    time_pref_labels = [c[0] for c in Task.TIME_OF_DAY_CHOICES]
+    last_days = [today - timedelta(days=i) for i in range(13, -1, -1)]
+    open_q = Q(completed=False)
+
+    aggs = {
+        'n_total': Count('id'),
+        'n_completed': Count('id', filter=Q(completed=True)),
+    }
+    for i, label in enumerate(priority_labels):
+        aggs[f'priority_{i}'] = Count('id', filter=open_q & Q(priority=label))
+    for i, label in enumerate(energy_labels):
+        aggs[f'energy_{i}'] = Count('id', filter=open_q & Q(energy_level=label))
+    for i, label in enumerate(task_type_labels):
+        aggs[f'type_{i}'] = Count('id', filter=Q(task_type=label))
+    for i, label in enumerate(time_pref_labels):
+        aggs[f'pref_{i}'] = Count('id', filter=open_q & Q(time_of_day_pref=label))
+    for i, d in enumerate(last_days):
+        aggs[f'created_{i}'] = Count('id', filter=Q(created_at__date=d))
+    t = Task.objects.filter(user_id=user_id, expired=False).aggregate(**aggs)
+    schedules = Schedule.objects.filter(user_id=user_id)
+
+    # Latest schedule (by creation) and the mode mix of the 50 most recent
+    recent = list(
+        schedules.order_by('-created_at').annotate(minutes=_item_minutes()).values_list('id', 'mode', 'minutes')[:50]
+    )
+    mode_labels = [c[0] for c in Schedule.MODE_CHOICES]
+    mode_counts = {m: 0 for m in mode_labels}
+    for _, mode, _ in recent:
+        mode_counts[mode] = mode_counts.get(mode, 0) + 1
+
+    # Minutes per day for the last 14 dated schedules
+    dated = list(
+        schedules.exclude(day_date__isnull=True).order_by('-day_date')
+        .annotate(minutes=_item_minutes()).values_list('day_date', 'minutes')[:14]
+    )
+    dated.reverse()
+
+    return {
+        'total_tasks': t['n_total'],
+        'completed_tasks': t['n_completed'],
+        'latest_schedule_id': recent[0][0] if recent else None,
+        'total_minutes': _minutes(recent[0][2]) if recent else 0,
+        'completion_labels': ['Completed', 'Incomplete'],
+        'completion_data': [t['n_completed'], max(t['n_total'] - t['n_completed'], 0)],
+        'priority_labels': priority_labels,
+        'priority_data': [t[f'priority_{i}'] for i in range(len(priority_labels))],
+        'energy_labels': energy_labels,
+        'energy_data': [t[f'energy_{i}'] for i in range(len(energy_labels))],
+        'schedule_labels': [d.strftime('%Y-%m-%d') for d, _ in dated],
+        'schedule_data': [_minutes(m) for _, m in dated],
+        'tasks_created_labels': [d.strftime('%Y-%m-%d') for d in last_days],
+        'tasks_created_data': [t[f'created_{i}'] for i in range(len(last_days))],
+        'task_type_labels': task_type_labels,
+        'task_type_data': [t[f'type_{i}'] for i in range(len(task_type_labels))],
+        'time_pref_labels': time_pref_labels,
+        'time_pref_data': [t[f'pref_{i}'] for i in range(len(time_pref_labels))],
+        'schedule_mode_labels': mode_labels,
+        'schedule_mode_data': [mode_counts[m] for m in mode_labels],
+    }
+
+
+def snapshot(user_id) -> dict:
+    """Return the user's analytics data, recomputing only when their tasks/schedules changed."""
+    today = timezone.localdate()
+    v = versions.current(versions.TASKS, versions.SCHEDULES, user_id=user_id)
+    signature = f"{today.isoformat()}|tasks={v[versions.TASKS]}|schedules={v[versions.SCHEDULES]}"
+    with _memo_lock:
+        memo = _memo.get(user_id)
+    if memo is not None and memo[0] == signature:
+        return memo[1]
+    key = f'{SNAPSHOT_KEY}:{user_id}'
+    payload = None
+    row = AnalyticsSnapshot.objects.filter(key=key).values_list('signature', 'payload').first()
+    if row and row[0] == signature:
+        try:
+            payload = json.loads(row[1])
+        except Exception:
+            payload = None
+    if payload is None:
+        payload = compute(user_id, today)
+        AnalyticsSnapshot.objects.update_or_create(
+            key=key,
+            defaults={'signature': signature, 'payload': json.dumps(payload), 'computed_at': timezone.now()},
+        )
+    with _memo_lock:
+        _memo[user_id] = (signature, payload)
+    return payload
@@ -0,0 +1,164 @@
+"""Token-budgeted context for calendar chat prompts.
+
+Tasks and saved schedules are ranked by relevance to the user's message and
+the date it is about, encoded compactly (one line per task / per day) and
+added best-first until the token budget is spent. Token counts use tiktoken
+when installed and a chars/4 estimate otherwise.
+"""
+from datetime import timedelta
+import re
+from typing import Iterable, List
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('cl100k_base')
+except Exception:  # optional dependency
+    _encoding = None
+
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+_STOPWORDS = {
+    'the', 'and', 'for', 'with', 'what', 'when', 'can', 'you', 'please', 'plan', 'make', 'give',
+    'have', 'how', 'should', 'today', 'tomorrow', 'this', 'that', 'are', 'any', 'all', 'my',
+}
+PRIORITY_SHORT = {'High': 'H', 'Medium': 'M', 'Low': 'L'}
+ENERGY_SHORT = {'High': 'H', 'Normal': 'N', 'Low': 'L'}
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _terms(text: str) -> set:
+    return {w for w in _WORD_RE.findall((text or '').lower()) if w not in _STOPWORDS}
+
+
+def focus_date_for(message: str, today=None):
+    """The date a message is about: an explicit YYYY-MM-DD, tomorrow, a weekday name, or today."""
+    today = today or timezone.localdate()
+    msg = (message or '').lower()
+    m = _ISO_DATE_RE.search(msg)
+    if m:
+        try:
+            return today.replace(year=int(m.group(1)), month=int(m.group(2)), day=int(m.group(3)))
+        except ValueError:
+            pass
+    if 'tomorrow' in msg:
+        return today + timedelta(days=1)
+    for idx, name in enumerate(_WEEKDAYS):
+        if name in msg:
+            return today + timedelta(days=(idx - today.weekday()) % 7)
+    return today
+
+
+def _encode_task(t) -> str:
+    dur = int(getattr(t, 'daily_time_minutes', 0) or getattr(t, 'duration_minutes', 30))
+    bits = [
+        t.title,
+        PRIORITY_SHORT.get(getattr(t, 'priority', 'Medium'), 'M'),
+        f"{dur}m",
+        ENERGY_SHORT.get(getattr(t, 'energy_level', 'Normal'), 'N'),
+    ]
+    begin = getattr(t, 'begin_date', None)
+    deadline = getattr(t, 'deadline', None)
+    bits.append(begin.isoformat() if begin else '')
+    bits.append(timezone.localtime(deadline).strftime('%Y-%m-%d %H:%M') if deadline else '')
+    return "|".join(bits).rstrip('|')
+
+
+def _encode_schedule(sch) -> str:
+    day = getattr(sch, 'day_date', None)
+    parts = [
+        f"{it.start_time.strftime('%H:%M')}-{it.end_time.strftime('%H:%M')} {it.title}"
+        for it in sch.items.all()
+    ]
+    return f"{day.isoformat() if day else '?'}: " + ("; ".join(parts) if parts else "(no items)")
+
+
+def _task_score(t, terms: set, focus) -> float:
+    score = 5.0 * len(terms & _terms(t.title))
+    score += {'High': 2.0, 'Medium': 1.0}.get(getattr(t, 'priority', 'Medium'), 0.0)
+    deadline = getattr(t, 'deadline', None)
+    if deadline:
+        days_left = (timezone.localtime(deadline).date() - focus).days
+        if days_left <= 3:
+            score += 3.0 if days_left >= 0 else 1.0
+    begin = getattr(t, 'begin_date', None)
+    if not begin or begin <= focus:
+        score += 1.0
+    return score
+
+
+def _schedule_score(sch, terms: set, focus) -> float:
+    day = getattr(sch, 'day_date', None)
+    score = 0.0
+    if day:
+        score += 10.0 / (1 + abs((day - focus).days))
+    if terms:
+        score += 2.0 * sum(1 for it in sch.items.all() if terms & _terms(it.title))
+    return score
+
+
+def _fill(lines: List[str], budget: int):
+    picked, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            continue
+        picked.append(line)
+        used += cost
+    return picked, used
+
+
+def build_chat_context(user_message: str, tasks: Iterable, schedules: Iterable, day_start: str, day_end: str, budget: int = None):
+    """Return ``(context_text, report)`` for the chat prompt.
+
+    Tasks get up to 60% of the budget first, schedules the rest, and any
+    unused schedule share goes back to tasks. ``report`` has the budget,
+    estimated context tokens, included/total counts and a truncated flag.
+    """
+    budget = int(budget or getattr(settings, 'CHAT_CONTEXT_TOKEN_BUDGET', 1500))
+    tasks = list(tasks)
+    schedules = list(schedules)
+    terms = _terms(user_message)
+    focus = focus_date_for(user_message)
+    header = (
+        f"Context\nFocus window: {day_start}–{day_end}. Date in question: {focus.isoformat()}\n\n"
+        "Tasks (title|priority H/M/L|planned|energy H/N/L|begin|deadline), most relevant first:\n"
+    )
+    sched_header = "\n\nSaved schedules:\n"
+    remaining = max(budget - estimate_tokens(header) - estimate_tokens(sched_header), 0)
+
+    task_lines = [_encode_task(t) for t in sorted(tasks, key=lambda t: -_task_score(t, terms, focus))]
+    sched_lines = [_encode_schedule(s) for s in sorted(schedules, key=lambda s: -_schedule_score(s, terms, focus))]
+    picked_tasks, used_tasks = _fill(task_lines, int(remaining * 0.6))
+    picked_scheds, used_scheds = _fill(sched_lines, remaining - used_tasks)
+    if len(picked_tasks) < len(task_lines):
+        leftover = remaining - used_tasks - used_scheds
+        chosen = set(picked_tasks)
+        extra, _ = _fill([line for line in task_lines if line not in chosen], leftover)
+        picked_tasks += extra
+
+    text = (
+        header + ("\n".join(picked_tasks) if picked_tasks else "(no tasks)")
+        + sched_header + ("\n".join(picked_scheds) if picked_scheds else "(no saved schedules)")
+    )
+    report = {
+        'budget': budget,
+        'context_tokens': estimate_tokens(text),
+        'tasks_included': len(picked_tasks),
+        'tasks_total': len(task_lines),
+        'schedules_included': len(picked_scheds),
+        'schedules_total': len(sched_lines),
+        'truncated': len(picked_tasks) < len(task_lines) or len(picked_scheds) < len(sched_lines),
+        'focus_date': focus.isoformat(),
+    }
+    return text, report
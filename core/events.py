@@ -0,0 +1,116 @@
+"""A user's calendar event lookups by time range.
+
+Events are found by overlap (start < range end AND end > range start), so
+multi-day events show up on every day they cover. The query is also given a
+lower bound on start_time (range start minus the longest event span), which
+keeps it a bounded scan of the (user, start_time, end_time) index instead
+of everything that started before the range. The longest span is memoized
+per process and user and recomputed when their events version changes.
+
+Recurring masters are left out of those queries; their occurrences come
+from core.recurrence and are merged in by ``events_between``.
+"""
+from datetime import datetime, time, timedelta
+import heapq
+from itertools import islice
+import threading
+
+from django.db.models import DurationField, ExpressionWrapper, F, Max
+from django.utils import timezone
+
+from . import recurrence, versions
+from .models import CalendarEvent
+
+# user id -> (events version, longest span)
+_span = {}
+_span_lock = threading.Lock()
+
+
+def day_bounds(d):
+    """Aware [start, end) datetimes of local date ``d``."""
+    start = timezone.make_aware(datetime.combine(d, time.min))
+    return start, timezone.make_aware(datetime.combine(d + timedelta(days=1), time.min))
+
+
+def max_event_span(user_id) -> timedelta:
+    """Duration of the user's longest stored event (cached per events version)."""
+    version = versions.current(versions.EVENTS, user_id=user_id)[versions.EVENTS]
+    with _span_lock:
+        cached = _span.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    longest = CalendarEvent.objects.filter(user_id=user_id).aggregate(
+        span=Max(ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())),
+    )['span'] or timedelta(0)
+    longest = max(longest, timedelta(0))
+    with _span_lock:
+        _span[user_id] = (version, longest)
+    return longest
+
+
+def overlapping(user_id, start, end):
+    """The user's single (non-recurring) CalendarEvents overlapping the aware range [start, end), oldest first."""
+    return CalendarEvent.objects.filter(
+        user_id=user_id,
+        start_time__gte=start - max_event_span(user_id),
+        start_time__lt=end,
+        end_time__gt=start,
+        rrule='',
+    ).order_by('start_time')
+
+
+def events_between(user_id, start, end):
+    """``(start, end, title)`` of the user's events and recurring occurrences overlapping [start, end), in order."""
+    rows = list(overlapping(user_id, start, end).values_list('start_time', 'end_time', 'title'))
+    rows.extend(recurrence.occurrences_between(user_id, start, end))
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def first_events(user_id, limit):
+    """``(start, end, title)`` of the user's ``limit`` earliest events and recurring occurrences.
+
+    Single events come from one indexed query; series are expanded only as
+    far as the merge reads them.
+    """
+    singles = CalendarEvent.objects.filter(user_id=user_id, rrule='').order_by('start_time').values_list(
+        'start_time', 'end_time', 'title',
+    )[:limit]
+    return list(islice(heapq.merge(singles, recurrence.iter_occurrences(user_id), key=lambda row: row[0]), limit))
+
+
+def busy_for_date(user_id, d):
+    """(start, end) of the user's events overlapping date ``d``, clipped to the day."""
+    return busy_by_date(user_id, [d])[d]
+
+
+def events_by_date(user_id, dates):
+    """``{date: [(start, end, title), ...]}`` of events overlapping each of several dates, from one query."""
+    dates = sorted(set(dates))
+    result = {d: [] for d in dates}
+    if not dates:
+        return result
+    bounds = {d: day_bounds(d) for d in dates}
+    lo, hi = bounds[dates[0]][0], bounds[dates[-1]][1]
+    for st, en, title in events_between(user_id, lo, hi):
+        first = max(timezone.localtime(st).date(), dates[0])
+        last = min(timezone.localtime(en).date(), dates[-1])
+        d = first
+        while d <= last:
+            if d in result:
+                day_lo, day_hi = bounds[d]
+                if st < day_hi and en > day_lo:
+                    result[d].append((st, en, title))
+            d += timedelta(days=1)
+    return result
+
+
+def busy_by_date(user_id, dates):
+    """``{date: [(start, end), ...]}`` for several dates from one query, clipped per day."""
+    return {d: clip_to_day(rows, d) for d, rows in events_by_date(user_id, dates).items()}
+
+
+def clip_to_day(rows, d):
+    """``(start, end)`` of ``rows`` (start, end, ...) clipped to local date ``d``."""
+    day_lo, day_hi = day_bounds(d)
+    return [(max(row[0], day_lo), min(row[1], day_hi)) for row in rows]
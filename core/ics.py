@@ -0,0 +1,385 @@
+"""Incremental iCalendar (RFC 5545) reader and importer.
+
+``iter_events`` reads an upload chunk by chunk, unfolds continuation lines
+and yields one dict per VEVENT, so memory stays flat however large the
+calendar is. DTSTART/DTEND honour ``TZID`` parameters, UTC ('Z') and
+floating times, and all-day ``VALUE=DATE`` values.
+
+``import_events`` upserts those dicts into one user's calendar in batches:
+each event is keyed on its UID (plus RECURRENCE-ID) and carries a hash of its content, so a
+re-import only writes the events that actually changed. Recurring events
+keep their RRULE/EXDATE and are stored once (expanded on read by
+core.recurrence); an overridden instance (RECURRENCE-ID) is its own row.
+
+``calendar_lines`` goes the other way: it turns an iterable of event
+dicts into escaped, folded iCalendar text, one VEVENT at a time, for the
+exports and the subscription feed.
+"""
+import codecs
+from datetime import datetime, timedelta, timezone as dt_timezone
+import hashlib
+import re
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import recurrence, rollups, versions
+from .models import CalendarEvent
+
+DEFAULT_BATCH_SIZE = 1000
+PRODID = '-//Todou AI//Kash Scheduler//EN'
+
+_DURATION_RE = re.compile(
+    r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$'
+)
+_TEXT_ESCAPES = {'n': '\n', 'N': '\n', ',': ',', ';': ';', '\\': '\\'}
+
+
+def _physical_lines(chunks, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+    buf = ''
+    for chunk in chunks:
+        buf += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        *complete, buf = buf.split('\n')
+        yield from complete
+    buf += decoder.decode(b'', final=True)
+    if buf:
+        yield buf
+
+
+def unfolded_lines(chunks, encoding='utf-8'):
+    """Logical content lines from an iterable of byte (or str) chunks."""
+    current = None
+    for raw in _physical_lines(chunks, encoding):
+        raw = raw.rstrip('\r')
+        if raw[:1] in (' ', '\t'):
+            # Folded: the leading whitespace belongs to the fold, not the value
+            if current is not None:
+                current += raw[1:]
+            continue
+        if current:
+            yield current
+        current = raw
+    if current:
+        yield current
+
+
+def parse_line(line):
+    """``(NAME, {PARAM: value}, value)`` for a content line; quoted params may hold ':' and ';'."""
+    if '"' in line:
+        parts = _split_unquoted(line, ':', 1)
+        head, value = parts[0], (parts[1] if len(parts) > 1 else '')
+        parts = _split_unquoted(head, ';')
+    else:
+        head, _, value = line.partition(':')
+        parts = head.split(';')
+    params = {}
+    for part in parts[1:]:
+        key, _, val = part.partition('=')
+        params[key.strip().upper()] = val.strip().strip('"')
+    return parts[0].strip().upper(), params, value
+
+
+def _split_unquoted(s, sep, maxsplit=-1):
+    out, cur, in_quotes = [], [], False
+    for i, c in enumerate(s):
+        if c == '"':
+            in_quotes = not in_quotes
+        if c == sep and not in_quotes:
+            out.append(''.join(cur))
+            cur = []
+            if len(out) == maxsplit:
+                out.append(s[i + 1:])
+                return out
+        else:
+            cur.append(c)
+    out.append(''.join(cur))
+    return out
+
+
+def unescape_text(value):
+    out, i, n = [], 0, len(value)
+    while i < n:
+        c = value[i]
+        if c == '\\' and i + 1 < n:
+            out.append(_TEXT_ESCAPES.get(value[i + 1], value[i + 1]))
+            i += 2
+            continue
+        out.append(c)
+        i += 1
+    return ''.join(out)
+
+
+def escape_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold_line(line):
+    """``line`` with CRLF, folded every 75 octets as RFC 5545 requires."""
+    parts, current, size = [], [], 0
+    for c in line:
+        n = len(c.encode('utf-8'))
+        if size + n > 75:
+            parts.append(''.join(current))
+            current, size = [' '], 1
+        current.append(c)
+        size += n
+    parts.append(''.join(current))
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def calendar_lines(events, name=None, extra=()):
+    """Yield a VCALENDAR as text chunks, one per VEVENT.
+
+    ``events`` yields dicts with uid, title, start, end and optionally
+    dtstamp (aware datetimes, written in UTC).
+    """
+    head = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN']
+    if name:
+        head.append(f'X-WR-CALNAME:{escape_text(name)}')
+    head.extend(extra)
+    yield ''.join(fold_line(line) for line in head)
+    now = recurrence.stamp(timezone.now())
+    for event in events:
+        lines = ['BEGIN:VEVENT']
+        if event.get('uid'):
+            lines.append(f"UID:{event['uid']}")
+        lines += [
+            f"DTSTAMP:{recurrence.stamp(event['dtstamp']) if event.get('dtstamp') else now}",
+            f"SUMMARY:{escape_text(event['title'])}",
+            f"DTSTART:{recurrence.stamp(event['start'])}",
+            f"DTEND:{recurrence.stamp(event['end'])}",
+            'END:VEVENT',
+        ]
+        yield ''.join(fold_line(line) for line in lines)
+    yield fold_line('END:VCALENDAR')
+
+
+def _zone(tzid):
+    if not tzid:
+        return None
+    try:
+        return ZoneInfo(tzid.strip().lstrip('/'))
+    except Exception:
+        # Unknown (e.g. Windows-style) zone names are treated as local time
+        return timezone.get_current_timezone()
+
+
+def _zone_name(value, params):
+    """Zone a DTSTART recurs in: its valid TZID, 'UTC' for Z times, '' for local."""
+    if (value or '').strip().endswith('Z'):
+        return 'UTC'
+    tzid = (params.get('TZID') or '').strip().lstrip('/')
+    try:
+        ZoneInfo(tzid)
+        return tzid[:64]
+    except Exception:
+        return ''
+
+
+def parse_datetime_value(value, params):
+    """``(aware datetime, all_day)`` for a DATE or DATE-TIME value, or ``(None, False)``."""
+    value = (value or '').strip()
+    try:
+        if params.get('VALUE', '').upper() == 'DATE' or (len(value) == 8 and value.isdigit()):
+            d = datetime.strptime(value[:8], '%Y%m%d')
+            return timezone.make_aware(d), True
+        if value.endswith('Z'):
+            return datetime.strptime(value[:15], '%Y%m%dT%H%M%S').replace(tzinfo=dt_timezone.utc), False
+        dt = datetime.strptime(value[:15], '%Y%m%dT%H%M%S')
+        tz = _zone(params.get('TZID'))
+        if tz is not None:
+            return dt.replace(tzinfo=tz), False
+        return timezone.make_aware(dt), False
+    except Exception:
+        return None, False
+
+
+def parse_duration(value):
+    m = _DURATION_RE.match((value or '').strip().upper())
+    if not m:
+        return None
+    sign, weeks, days, hours, minutes, seconds = m.groups()
+    delta = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0),
+        hours=int(hours or 0), minutes=int(minutes or 0), seconds=int(seconds or 0),
+    )
+    return -delta if sign == '-' else delta
+
+
+def _finish_event(props):
+    start, all_day = props.get('start') or (None, False)
+    if start is None:
+        return None
+    end = (props.get('end') or (None, False))[0]
+    if end is None and props.get('duration') is not None:
+        end = start + props['duration']
+    if end is None:
+        # RFC 5545: a DATE start without an end lasts one day, a DATE-TIME start is instantaneous
+        end = start + timedelta(days=1) if all_day else start
+    if end < start:
+        end = start
+    uid = (props.get('uid') or '').strip()
+    recurrence_id = props.get('recurrence_id') or ''
+    event = {
+        'title': (props.get('title') or 'Event')[:200],
+        'start': start,
+        'end': end,
+        'all_day': all_day,
+        'rrule': '',
+        'exdates': '',
+        'tzid': props.get('tzid', ''),
+        'series_end': None,
+        'recurrence_id': recurrence_id,
+    }
+    rule = recurrence.parse_rrule(props.get('rrule'), _zone(event['tzid'])) if not recurrence_id else None
+    if rule is not None:
+        event['rrule'] = props['rrule'].strip()
+        event['exdates'] = ','.join(sorted(props.get('exdates', ())))
+        zone = _zone(event['tzid']) or timezone.get_current_timezone()
+        event['series_end'] = recurrence.series_end(
+            start.astimezone(zone), end - start, rule, frozenset(props.get('exdates', ())),
+        )
+    event['content_hash'] = content_hash(event)
+    if not uid:
+        # No UID: the content itself is the identity, so identical re-imports still dedupe
+        uid = 'hash-' + event['content_hash']
+    if recurrence_id:
+        uid = f'{uid}/{recurrence_id}'
+    event['uid'] = uid[:255]
+    return event
+
+
+def content_hash(event):
+    parts = [
+        event['title'],
+        event['start'].astimezone(dt_timezone.utc).isoformat(),
+        event['end'].astimezone(dt_timezone.utc).isoformat(),
+        '1' if event['all_day'] else '0',
+        event['rrule'],
+        event['exdates'],
+        event['tzid'],
+    ]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def iter_events(chunks):
+    """Yield a dict per VEVENT (title, start, end, all_day, uid, content_hash)."""
+    props = None
+    depth = 0
+    for line in unfolded_lines(chunks):
+        if not line:
+            continue
+        name, params, value = parse_line(line)
+        if name == 'BEGIN':
+            if value.strip().upper() == 'VEVENT' and props is None:
+                props = {}
+            elif props is not None:
+                # Nested components (VALARM) carry their own DTSTART/SUMMARY
+                depth += 1
+            continue
+        if name == 'END':
+            if props is not None and depth:
+                depth -= 1
+            elif props is not None and value.strip().upper() == 'VEVENT':
+                event = _finish_event(props)
+                props = None
+                if event is not None:
+                    yield event
+            continue
+        if props is None or depth:
+            continue
+        if name == 'SUMMARY':
+            props['title'] = unescape_text(value).strip()
+        elif name == 'UID':
+            props['uid'] = value
+        elif name == 'DTSTART':
+            props['start'] = parse_datetime_value(value, params)
+            props['tzid'] = _zone_name(value, params)
+        elif name == 'DTEND':
+            props['end'] = parse_datetime_value(value, params)
+        elif name == 'DURATION':
+            props['duration'] = parse_duration(value)
+        elif name == 'RECURRENCE-ID':
+            rid, _ = parse_datetime_value(value, params)
+            if rid is not None:
+                props['recurrence_id'] = recurrence.stamp(rid)
+        elif name == 'RRULE':
+            props['rrule'] = value
+        elif name == 'EXDATE':
+            for item in value.split(','):
+                ex, _ = parse_datetime_value(item, params)
+                if ex is not None:
+                    props.setdefault('exdates', set()).add(recurrence.stamp(ex))
+
+
+def import_events(events, user_id, batch_size: int = DEFAULT_BATCH_SIZE, source: str = 'ICS'):
+    """Upsert parsed events into the user's calendar by UID; returns ``{'created', 'updated', 'unchanged'}`` counts.
+
+    Runs in one transaction; as a bulk write it marks the touched days and
+    the events version itself (see core.rollups).
+    """
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0}
+    batch = {}
+    with transaction.atomic():
+        for event in events:
+            # A UID repeated within the file: the last occurrence wins
+            batch[event['uid']] = event
+            if len(batch) >= batch_size:
+                _upsert_batch(user_id, batch, source, stats)
+                batch = {}
+        if batch:
+            _upsert_batch(user_id, batch, source, stats)
+    return stats
+
+
+def _upsert_batch(user_id, batch, source, stats):
+    existing = {
+        row['uid']: row
+        for row in CalendarEvent.objects.filter(user_id=user_id, uid__in=list(batch)).values('id', 'uid', 'content_hash', 'start_time', 'end_time', 'rrule', 'series_end')
+    }
+    to_create, to_update, days = [], [], set()
+    for uid, event in batch.items():
+        row = existing.get(uid)
+        if row is not None and row['content_hash'] == event['content_hash']:
+            stats['unchanged'] += 1
+            continue
+        obj = CalendarEvent(
+            user_id=user_id,
+            title=event['title'],
+            start_time=event['start'],
+            end_time=event['end'],
+            all_day=event['all_day'],
+            source=source,
+            uid=uid,
+            content_hash=event['content_hash'],
+            rrule=event['rrule'],
+            exdates=event['exdates'],
+            tzid=event['tzid'],
+            series_end=event['series_end'],
+            recurrence_id=event['recurrence_id'],
+        )
+        days.update(rollups.days_of_event(obj.start_time, obj.end_time, obj.rrule, obj.series_end))
+        if row is None:
+            to_create.append(obj)
+        else:
+            obj.id = row['id']
+            to_update.append(obj)
+            # The days the event used to cover need refreshing too
+            days.update(rollups.days_of_event(row['start_time'], row['end_time'], row['rrule'], row['series_end']))
+    if to_create:
+        CalendarEvent.objects.bulk_create(to_create, batch_size=500)
+        stats['created'] += len(to_create)
+    if to_update:
+        CalendarEvent.objects.bulk_update(
+            to_update,
+            ['title', 'start_time', 'end_time', 'all_day', 'source', 'content_hash',
+             'rrule', 'exdates', 'tzid', 'series_end', 'recurrence_id'],
+            batch_size=500,
+        )
+        stats['updated'] += len(to_update)
+    if to_create or to_update:
+        # Events version first (see core.rollups)
+        versions.mark(versions.EVENTS, user_id=user_id)
+        rollups.mark_days(user_id, days)
@@ -0,0 +1,176 @@
+"""DB-backed queue for background schedule generation.
+
+Views enqueue a ScheduleJob on a cache miss and return immediately; the
+``run_schedule_worker`` management command claims pending jobs and runs
+``_generate_day_schedule`` outside the request cycle. Several queued dates
+are claimed together and planned with one multi-day LLM call.
+"""
+from datetime import timedelta
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import sweeper
+from .models import ScheduleJob
+
+log = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+def enqueue_day_schedule(user_id, day_date):
+    """Queue generation of the user's ``day_date`` unless a pending/running job already covers it."""
+    return enqueue_day_schedules(user_id, [day_date])[day_date]
+
+
+def enqueue_day_schedules(user_id, dates):
+    """``enqueue_day_schedule`` for several dates in two queries; returns ``{date: job}``."""
+    queued = {}
+    for job in ScheduleJob.objects.filter(
+        user_id=user_id,
+        day_date__in=dates,
+        status__in=[ScheduleJob.STATUS_PENDING, ScheduleJob.STATUS_RUNNING],
+    ).order_by('created_at'):
+        # Newest wins, as in the single-date lookup
+        queued[job.day_date] = job
+    new = ScheduleJob.objects.bulk_create([ScheduleJob(user_id=user_id, day_date=d) for d in dict.fromkeys(dates) if d not in queued])
+    queued.update((job.day_date, job) for job in new)
+    return queued
+
+
+def claim_next_job():
+    """Atomically move the oldest pending job to running and return it (or None).
+
+    The claim is a conditional UPDATE, so concurrent workers (threads or
+    processes, SQLite or Postgres) never run the same job twice.
+    """
+    for job_id in ScheduleJob.objects.filter(status=ScheduleJob.STATUS_PENDING).order_by('created_at').values_list('id', flat=True)[:10]:
+        claimed = ScheduleJob.objects.filter(id=job_id, status=ScheduleJob.STATUS_PENDING).update(
+            status=ScheduleJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return ScheduleJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Generate the schedule for a claimed job and record the outcome."""
+    from .views import _generate_day_schedule
+    try:
+        schedule = _generate_day_schedule(job.user_id, job.day_date)
+    except Exception as e:
+        job.attempts += 1
+        job.error = str(e)[:2000]
+        job.status = ScheduleJob.STATUS_PENDING if job.attempts < MAX_ATTEMPTS else ScheduleJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+        job.save(update_fields=['attempts', 'error', 'status', 'finished_at'])
+        log.exception("Schedule job %s failed", job.id)
+        return None
+    job.attempts += 1
+    job.status = ScheduleJob.STATUS_DONE
+    job.schedule = schedule
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['attempts', 'status', 'schedule', 'error', 'finished_at'])
+    return schedule
+
+
+def claim_jobs(limit: int):
+    """Claim up to ``limit`` pending jobs (one per user and date)."""
+    claimed = []
+    seen = set()
+    while len(claimed) < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        if (job.user_id, job.day_date) in seen:
+            # Duplicate date in the same batch: the first job covers it
+            job.status = ScheduleJob.STATUS_DONE
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'finished_at'])
+            continue
+        seen.add((job.user_id, job.day_date))
+        claimed.append(job)
+    return claimed
+
+
+def run_jobs(batch):
+    """Run claimed jobs; one user's dates are generated with one multi-day LLM call."""
+    by_user = {}
+    for job in batch:
+        by_user.setdefault(job.user_id, []).append(job)
+    results = []
+    for user_batch in by_user.values():
+        results.extend(_run_user_jobs(user_batch))
+    return results
+
+
+def _run_user_jobs(batch):
+    if len(batch) == 1:
+        return [run_job(batch[0])]
+    from .views import _generate_range_schedules
+    try:
+        schedules = _generate_range_schedules(batch[0].user_id, [j.day_date for j in batch])
+    except Exception as e:
+        log.exception("Batched schedule generation failed; retrying dates one by one")
+        for job in batch:
+            job.error = str(e)[:2000]
+        return [run_job(job) for job in batch]
+    now = timezone.now()
+    for job in batch:
+        job.attempts += 1
+        job.status = ScheduleJob.STATUS_DONE
+        job.schedule = schedules.get(job.day_date)
+        job.error = ''
+        job.finished_at = now
+    ScheduleJob.objects.bulk_update(batch, ['attempts', 'status', 'schedule', 'error', 'finished_at'])
+    return [j.schedule for j in batch]
+
+
+def batch_size() -> int:
+    return max(1, int(getattr(settings, 'SCHEDULE_JOB_BATCH_SIZE', 7)))
+
+
+def requeue_stuck_jobs(older_than_seconds: int = 600):
+    """Return running jobs whose worker died back to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    return ScheduleJob.objects.filter(status=ScheduleJob.STATUS_RUNNING, started_at__lt=cutoff).update(
+        status=ScheduleJob.STATUS_PENDING,
+    )
+
+
+def prune_finished_jobs(older_than_days: int = 7):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return ScheduleJob.objects.filter(
+        status__in=[ScheduleJob.STATUS_DONE, ScheduleJob.STATUS_FAILED],
+        finished_at__lt=cutoff,
+    ).delete()[0]
+
+
+def work(stop_event: threading.Event = None, poll_seconds: float = 1.0, once: bool = False):
+    """Worker loop: claim and run jobs until stopped (or the queue is empty when ``once``)."""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        close_old_connections()
+        # Housekeeping that used to run on every page load; throttled per process
+        sweeper.maybe_sweep()
+        try:
+            batch = claim_jobs(batch_size())
+        except Exception:
+            log.exception("Failed to claim schedule jobs")
+            batch = []
+        if not batch:
+            if once:
+                break
+            stop_event.wait(poll_seconds)
+            continue
+        run_jobs(batch)
+    close_old_connections()
+
+
+def async_enabled() -> bool:
+    return bool(getattr(settings, 'SCHEDULE_ASYNC', False))
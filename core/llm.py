@@ -0,0 +1,219 @@
+"""Process-wide OpenAI transport for Kash AI.
+
+One pooled client is shared by every call (keep-alive and TLS sessions are
+reused), requests have bounded timeouts, 429/5xx/connection failures are
+retried with jittered backoff, and a circuit breaker stops calling the
+provider after repeated failures so callers can fall back to local planning.
+"""
+import logging
+import random
+import threading
+import time
+from typing import List
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling OpenAI while the circuit breaker is open."""
+
+
+class _CircuitBreaker:
+    """Closed -> open after ``threshold`` consecutive failures; half-open after ``cooldown`` seconds."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            # Half-open: let a single trial request through
+            self._trial_in_flight = True
+            return True
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.cooldown
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    log.warning("OpenAI circuit breaker opened after %s failures", self._failures)
+                self._opened_at = time.monotonic()
+
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'open' if time.monotonic() - self._opened_at < self.cooldown else 'half-open'
+
+
+_breaker = _CircuitBreaker(
+    threshold=int(getattr(settings, 'OPENAI_BREAKER_FAILURES', 5)),
+    cooldown=float(getattr(settings, 'OPENAI_BREAKER_COOLDOWN_SECONDS', 60)),
+)
+_client = None
+_client_lock = threading.Lock()
+
+
+def _modern_sdk_available() -> bool:
+    try:
+        from openai import OpenAI  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_client():
+    """Return the shared OpenAI client, building it on first use."""
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            kwargs = {
+                'api_key': settings.OPENAI_API_KEY,
+                'timeout': float(getattr(settings, 'OPENAI_TIMEOUT_SECONDS', 20)),
+                # Retries are handled here so the breaker sees every failure
+                'max_retries': 0,
+            }
+            base_url = getattr(settings, 'OPENAI_BASE_URL', '')
+            if base_url:
+                # e.g. the bundled stand-in: python manage.py fake_openai
+                kwargs['base_url'] = base_url
+            try:
+                import httpx
+                from openai import DefaultHttpxClient
+                max_conn = int(getattr(settings, 'OPENAI_MAX_CONNECTIONS', 10))
+                kwargs['http_client'] = DefaultHttpxClient(
+                    limits=httpx.Limits(max_connections=max_conn, max_keepalive_connections=max_conn),
+                )
+            except ImportError:
+                pass
+            _client = OpenAI(**kwargs)
+    return _client
+
+
+def provider_available() -> bool:
+    """True when an API key is set and the circuit breaker is not open."""
+    return bool(settings.OPENAI_API_KEY) and not _breaker.is_open()
+
+
+def breaker_state() -> str:
+    """'closed', 'open' or 'half-open' for this process (shown on the analytics page)."""
+    return _breaker.state()
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, 'status_code', None) or getattr(exc, 'http_status', None)
+    if status is not None:
+        return int(status) in RETRYABLE_STATUS
+    # Connection errors and timeouts carry no status code
+    name = type(exc).__name__
+    return name in ('APIConnectionError', 'APITimeoutError', 'Timeout', 'ServiceUnavailableError', 'TryAgain')
+
+
+def _with_retries(call):
+    attempts = int(getattr(settings, 'OPENAI_MAX_RETRIES', 2)) + 1
+    base = float(getattr(settings, 'OPENAI_RETRY_BASE_SECONDS', 0.5))
+    for attempt in range(attempts):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == attempts - 1 or not _is_retryable(e):
+                raise
+            # Full jitter backoff
+            time.sleep(random.uniform(0, base * (2 ** attempt)))
+
+
+def _guarded(call):
+    """Run ``call`` with retries behind the circuit breaker."""
+    if not _breaker.allow():
+        raise ProviderUnavailable("Kash AI is temporarily unavailable; using local planning.")
+    try:
+        result = _with_retries(call)
+    except Exception as e:
+        if _is_retryable(e):
+            _breaker.record_failure()
+        else:
+            # The provider answered; a 4xx is a request problem, not an outage
+            _breaker.record_success()
+        raise
+    _breaker.record_success()
+    return result
+
+
+def chat_completion(messages: List[dict], temperature: float) -> str:
+    """Run one chat completion and return the message text.
+
+    Uses the modern SDK (v1+); the legacy SDK (<=0.28) is used only when the
+    modern one is not installed.
+    """
+    model = getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+    if _modern_sdk_available():
+        resp = _guarded(lambda: get_client().chat.completions.create(model=model, messages=messages, temperature=temperature))
+        return resp.choices[0].message.content
+    import openai  # legacy SDK
+    openai.api_key = settings.OPENAI_API_KEY
+    if getattr(settings, 'OPENAI_BASE_URL', ''):
+        openai.api_base = settings.OPENAI_BASE_URL
+    resp = _guarded(lambda: openai.ChatCompletion.create(
+        model=model, messages=messages, temperature=temperature,
+        request_timeout=float(getattr(settings, 'OPENAI_TIMEOUT_SECONDS', 20)),
+    ))
+    return resp['choices'][0]['message']['content']
+
+
+def chat_completion_stream(messages: List[dict], temperature: float):
+    """Yield text deltas of a streamed chat completion.
+
+    Opening the stream is retried; a failure after the first delta is raised
+    and counted by the breaker.
+    """
+    model = getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+    if _modern_sdk_available():
+        stream = _guarded(lambda: get_client().chat.completions.create(
+            model=model, messages=messages, temperature=temperature, stream=True,
+        ))
+        pick = lambda chunk: chunk.choices[0].delta.content if chunk.choices else None  # noqa: E731
+    else:
+        import openai  # legacy SDK
+        openai.api_key = settings.OPENAI_API_KEY
+        if getattr(settings, 'OPENAI_BASE_URL', ''):
+            openai.api_base = settings.OPENAI_BASE_URL
+        stream = _guarded(lambda: openai.ChatCompletion.create(
+            model=model, messages=messages, temperature=temperature, stream=True,
+            request_timeout=float(getattr(settings, 'OPENAI_TIMEOUT_SECONDS', 20)),
+        ))
+        pick = lambda chunk: chunk['choices'][0].get('delta', {}).get('content')  # noqa: E731
+    try:
+        for chunk in stream:
+            delta = pick(chunk)
+            if delta:
+                yield delta
+    except Exception as e:
+        if _is_retryable(e):
+            _breaker.record_failure()
+        raise
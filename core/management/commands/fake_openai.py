@@ -0,0 +1,154 @@
+"""Local stand-in for the OpenAI chat-completions API, for offline benchmarking.
+
+Run it, then point Kairos at it:
+
+    python manage.py fake_openai --port 8765 --latency-ms 800
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python manage.py runserver
+
+Schedule prompts (the ones asking for JSON) get a canned plan built from the
+task lines in the prompt, single-day or multi-day; chat prompts get a canned
+reply. Streaming requests are answered with server-sent events.
+"""
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+_TASK_RE = re.compile(r"^- (?P<title>.+?) \| .*?planned=(?P<minutes>\d+)m", re.M)
+_TIMEFRAME_RE = re.compile(r"Timeframe: (\d{1,2}:\d{2}) to (\d{1,2}:\d{2})")
+_DAY_RE = re.compile(r"^Date (\d{4}-\d{2}-\d{2}) \(\w+\): timeframe (\d{1,2}:\d{2}) to (\d{1,2}:\d{2})$", re.M)
+CHAT_REPLY = (
+    "Here is a focused way to approach your day. Start with the highest-priority work while "
+    "your energy is fresh, batch small tasks together after lunch, and leave a buffer before "
+    "your last meeting so nothing runs over."
+)
+
+
+def _layout(block: str, day_start: str, day_end: str):
+    cursor = datetime.strptime(day_start, '%H:%M')
+    end = datetime.strptime(day_end, '%H:%M')
+    items = []
+    for m in _TASK_RE.finditer(block):
+        nxt = cursor + timedelta(minutes=int(m.group('minutes')))
+        if nxt > end:
+            break
+        items.append({'title': m.group('title'), 'start': cursor.strftime('%H:%M'), 'end': nxt.strftime('%H:%M')})
+        cursor = nxt + timedelta(minutes=10)
+    return items
+
+
+def canned_content(prompt: str) -> str:
+    """Plausible model output for a Kairos prompt."""
+    if 'Respond ONLY with JSON' not in prompt:
+        return CHAT_REPLY
+    days = list(_DAY_RE.finditer(prompt))
+    if days:
+        out = {}
+        for i, m in enumerate(days):
+            block = prompt[m.end():days[i + 1].start() if i + 1 < len(days) else len(prompt)]
+            out[m.group(1)] = {'items': _layout(block, m.group(2), m.group(3)), 'notes': 'canned plan'}
+        return json.dumps({'days': out})
+    tf = _TIMEFRAME_RE.search(prompt)
+    day_start, day_end = (tf.group(1), tf.group(2)) if tf else ('09:00', '18:00')
+    return json.dumps({'items': _layout(prompt, day_start, day_end), 'notes': 'canned plan'})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    opts = {}
+
+    def log_message(self, fmt, *args):
+        if self.opts.get('verbose'):
+            super().log_message(fmt, *args)
+
+    def _json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._json(404, {'error': {'message': 'not found'}})
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            req = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._json(400, {'error': {'message': 'invalid JSON'}})
+        opts = self.opts
+        time.sleep(max(0.0, random.gauss(opts['latency_ms'], opts['jitter_ms'])) / 1000.0)
+        if random.random() < opts['error_rate']:
+            status = random.choice([429, 500, 503])
+            return self._json(status, {'error': {'message': f'fake upstream error {status}', 'type': 'server_error'}})
+        prompt = "\n".join(str(m.get('content') or '') for m in req.get('messages') or [])
+        content = canned_content(prompt)
+        model = req.get('model') or 'fake-model'
+        cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        if req.get('stream'):
+            return self._stream(cid, created, model, content)
+        self._json(200, {
+            'id': cid,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4, 'total_tokens': (len(prompt) + len(content)) // 4},
+        })
+
+    def _stream(self, cid, created, model, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        words = re.findall(r"\S+\s*", content)
+        step = max(1, self.opts['words_per_chunk'])
+        for i in range(0, len(words), step):
+            chunk = {
+                'id': cid, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'delta': {'content': ''.join(words[i:i + step])}, 'finish_reason': None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(self.opts['chunk_ms'] / 1000.0)
+        final = {
+            'id': cid, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class Command(BaseCommand):
+    help = "Serve a fake OpenAI-compatible chat-completions API (set OPENAI_BASE_URL to use it)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=500, help='Mean time before the first byte.')
+        parser.add_argument('--jitter-ms', type=float, default=100, help='Std deviation of the latency.')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 429/5xx.')
+        parser.add_argument('--chunk-ms', type=float, default=30, help='Delay between streamed chunks.')
+        parser.add_argument('--words-per-chunk', type=int, default=1)
+        parser.add_argument('--verbose', action='store_true')
+
+    def handle(self, *args, **opts):
+        _Handler.opts = opts
+        server = ThreadingHTTPServer((opts['host'], opts['port']), _Handler)
+        server.daemon_threads = True
+        self.stdout.write(f"Fake OpenAI listening on http://{opts['host']}:{opts['port']}/v1")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
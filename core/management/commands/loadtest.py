@@ -0,0 +1,159 @@
+"""Concurrent load driver for a running Kairos instance.
+
+Example (against runserver backed by ``manage.py fake_openai``):
+
+    python manage.py loadtest --base-url http://127.0.0.1:8000 \\
+        --username demo --password demo --concurrency 8 --requests 200
+
+Each worker logs in with its own session, then cycles through the selected
+endpoints. Latency percentiles and throughput are reported per endpoint.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import http.cookiejar
+import itertools
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+ENDPOINTS = ('day', 'chat', 'month', 'analytics')
+CHAT_MESSAGES = [
+    'What should I focus on today?',
+    'Plan tomorrow around my deadlines.',
+    'Can I fit a workout in on Friday?',
+]
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank: the smallest value with at least pct% of the samples at or below it
+    k = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class _Session:
+    """A logged-in browser-like session (cookies + CSRF token)."""
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.jar = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.jar))
+
+    def _csrf(self) -> str:
+        for c in self.jar:
+            if c.name == 'csrftoken':
+                return c.value
+        return ''
+
+    def request(self, method: str, path: str, data: bytes = None, headers: dict = None):
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers or {})
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                body = resp.read()
+                return resp.status, body, resp.geturl()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.geturl()
+
+    def login(self, username: str, password: str):
+        self.request('GET', '/login/')
+        form = urllib.parse.urlencode({
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': self._csrf(),
+        }).encode('utf-8')
+        status, _, url = self.request('POST', '/login/', form, {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Referer': self.base_url + '/login/',
+        })
+        if status >= 400 or urllib.parse.urlparse(url).path.rstrip('/') == '/login':
+            raise CommandError(f"Login failed for {username!r} (status {status})")
+
+    def post_json(self, path: str, payload: dict):
+        return self.request('POST', path, json.dumps(payload).encode('utf-8'), {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': self._csrf(),
+            'Referer': self.base_url + path,
+        })
+
+
+def _call(session: _Session, endpoint: str, i: int):
+    day = date.today() + timedelta(days=i % 7)
+    if endpoint == 'day':
+        return session.request('GET', f"/scheduler/day/?date={day.isoformat()}")
+    if endpoint == 'month':
+        return session.request('GET', f"/scheduler/month/?year={day.year}&month={day.month}")
+    if endpoint == 'analytics':
+        return session.request('GET', '/analytics/')
+    return session.post_json('/calendar/chat/', {'message': CHAT_MESSAGES[i % len(CHAT_MESSAGES)]})
+
+
+class Command(BaseCommand):
+    help = "Load-test the scheduler, chat, month and analytics endpoints and report latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=100, help='Total requests across all workers.')
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help=f"Comma-separated subset of {', '.join(ENDPOINTS)}.")
+        parser.add_argument('--timeout', type=float, default=60.0)
+
+    def handle(self, *args, **opts):
+        endpoints = [e.strip() for e in opts['endpoints'].split(',') if e.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown or not endpoints:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown)) or '(none given)'}")
+        concurrency = max(1, opts['concurrency'])
+        total = max(1, opts['requests'])
+
+        sessions = []
+        for _ in range(concurrency):
+            s = _Session(opts['base_url'], opts['timeout'])
+            s.login(opts['username'], opts['password'])
+            sessions.append(s)
+
+        counter = itertools.count()
+        lock = threading.Lock()
+        results = {e: {'latencies': [], 'errors': 0} for e in endpoints}
+
+        def worker(session):
+            while True:
+                i = next(counter)
+                if i >= total:
+                    return
+                endpoint = endpoints[i % len(endpoints)]
+                t0 = time.perf_counter()
+                try:
+                    status, _, _ = _call(session, endpoint, i)
+                    ok = status < 400
+                except Exception:
+                    ok = False
+                elapsed = (time.perf_counter() - t0) * 1000.0
+                with lock:
+                    results[endpoint]['latencies'].append(elapsed)
+                    if not ok:
+                        results[endpoint]['errors'] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, sessions))
+        wall = time.perf_counter() - started
+
+        self.stdout.write(f"{total} requests, concurrency {concurrency}, {wall:.2f}s wall, {total / wall:.1f} req/s")
+        self.stdout.write(f"{'endpoint':<10} {'n':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7}")
+        for endpoint in endpoints:
+            lat = sorted(results[endpoint]['latencies'])
+            self.stdout.write(
+                f"{endpoint:<10} {len(lat):>5} {results[endpoint]['errors']:>4} "
+                f"{percentile(lat, 50):>8.1f} {percentile(lat, 95):>8.1f} {percentile(lat, 99):>8.1f} "
+                f"{len(lat) / wall:>7.1f}"
+            )
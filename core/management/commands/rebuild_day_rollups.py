@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.rollups import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-day DayRollup totals from schedules and calendar events."
+
+    def handle(self, *args, **opts):
+        count = rebuild_all()
+        self.stdout.write(f"Rebuilt rollups for {count} day(s).")
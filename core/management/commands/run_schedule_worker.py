@@ -0,0 +1,71 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def _process_main(poll_seconds, once):
+    # Spawned (non-fork) children start without Django configured
+    import django
+    django.setup()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    jobs.work(stop, poll_seconds=poll_seconds, once=once)
+
+
+class Command(BaseCommand):
+    help = "Run background workers that generate queued day schedules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of concurrent workers.')
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit.')
+
+    def handle(self, *args, **opts):
+        workers = max(1, opts['workers'])
+        requeued = jobs.requeue_stuck_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stuck job(s)")
+        jobs.prune_finished_jobs()
+        self.stdout.write(f"Starting {workers} {opts['mode']} worker(s)")
+        if opts['mode'] == 'process':
+            self._run_processes(workers, opts['poll'], opts['once'])
+        else:
+            self._run_threads(workers, opts['poll'], opts['once'])
+
+    def _run_threads(self, workers, poll, once):
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        threads = [
+            threading.Thread(target=jobs.work, args=(stop, poll, once), name=f'schedule-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=0.5)
+
+    def _run_processes(self, workers, poll, once):
+        # Never share DB sockets across a fork
+        connections.close_all()
+        procs = [
+            multiprocessing.Process(target=_process_main, args=(poll, once), name=f'schedule-worker-{i}')
+            for i in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        try:
+            for p in procs:
+                p.join()
+        except KeyboardInterrupt:
+            for p in procs:
+                p.terminate()
+            for p in procs:
+                p.join()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.sweeper import sweep_expired_tasks
+
+
+class Command(BaseCommand):
+    help = "Flag tasks whose deadline has passed and delete them in batches (run from cron or a scheduler)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Tasks deleted per chunk (default TASK_SWEEP_BATCH_SIZE).')
+
+    def handle(self, *args, **opts):
+        flagged, deleted = sweep_expired_tasks(batch_size=opts['batch_size'])
+        self.stdout.write(f"Flagged {flagged} expired task(s), deleted {deleted}.")
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_schedule_day_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('plan_text', models.TextField()),
+                ('stored_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('hits', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_plancacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_schedule_stale'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('schedule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.schedule')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='core_schedu_status_64befe_idx'), models.Index(fields=['day_date', 'status'], name='core_schedu_day_dat_a27bb3_idx')],
+            },
+        ),
+    ]
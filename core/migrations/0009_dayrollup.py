@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:23
+
+from datetime import datetime, time, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    Schedule = apps.get_model('core', 'Schedule')
+    ScheduleItem = apps.get_model('core', 'ScheduleItem')
+    CalendarEvent = apps.get_model('core', 'CalendarEvent')
+    DayRollup = apps.get_model('core', 'DayRollup')
+    rows = {}
+
+    def row(d):
+        if d not in rows:
+            rows[d] = DayRollup(day=d)
+        return rows[d]
+
+    for d in Schedule.objects.filter(day_date__isnull=False).values_list('day_date', flat=True):
+        row(d).has_schedule = True
+    for d, st, en in ScheduleItem.objects.filter(schedule__day_date__isnull=False).values_list('schedule__day_date', 'start_time', 'end_time'):
+        r = row(d)
+        r.scheduled_minutes += max(int((en - st).total_seconds() // 60), 0)
+        r.item_count += 1
+    for st, en in CalendarEvent.objects.values_list('start_time', 'end_time'):
+        d = timezone.localtime(st).date()
+        while True:
+            lo = timezone.make_aware(datetime.combine(d, time.min))
+            hi = lo + timedelta(days=1)
+            if lo >= en:
+                break
+            overlap = min(en, hi) - max(st, lo)
+            if overlap.total_seconds() > 0:
+                row(d).event_minutes += int(overlap.total_seconds() // 60)
+            d += timedelta(days=1)
+    DayRollup.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_schedulejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('scheduled_minutes', models.PositiveIntegerField(default=0)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('event_minutes', models.PositiveIntegerField(default=0)),
+                ('has_schedule', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_dataversion_analyticssnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
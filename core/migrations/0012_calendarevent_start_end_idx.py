@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_schedule_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['start_time', 'end_time'], name='event_start_end_idx'),
+        ),
+    ]
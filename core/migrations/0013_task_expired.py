@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_calendarevent_start_end_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='expired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['expired', 'deadline'], name='task_expired_deadline_idx'),
+        ),
+    ]
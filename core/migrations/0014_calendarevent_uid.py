@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_task_expired'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='all_day',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='uid',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name='calendarevent',
+            constraint=models.UniqueConstraint(condition=models.Q(('uid', ''), _negated=True), fields=('uid',), name='event_uid_unique'),
+        ),
+    ]
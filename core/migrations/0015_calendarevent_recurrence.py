@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_calendarevent_uid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='exdates',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='recurrence_id',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='rrule',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='series_end',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='tzid',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
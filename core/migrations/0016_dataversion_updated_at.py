@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:43
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_calendarevent_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+OWNED_MODELS = ['Task', 'Schedule', 'ScheduleItem', 'Preferences', 'CalendarEvent', 'ScheduleJob', 'DayRollup']
+
+
+def assign_existing_rows(apps, schema_editor):
+    """Give pre-existing (single-tenant) data to the first user, if there is one."""
+    app_label, model_name = settings.AUTH_USER_MODEL.split('.')
+    User = apps.get_model(app_label, model_name)
+    owner = User.objects.order_by('pk').values_list('pk', flat=True).first()
+    if owner is None:
+        return
+    Preferences = apps.get_model('core', 'Preferences')
+    first_prefs = Preferences.objects.filter(user__isnull=True).order_by('pk').values_list('pk', flat=True).first()
+    if first_prefs is not None and not Preferences.objects.filter(user_id=owner).exists():
+        Preferences.objects.filter(pk=first_prefs).update(user_id=owner)
+    for name in OWNED_MODELS:
+        if name != 'Preferences':
+            apps.get_model('core', name).objects.filter(user__isnull=True).update(user_id=owner)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0016_dataversion_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='calendarevent',
+            name='event_uid_unique',
+        ),
+        migrations.RemoveIndex(
+            model_name='calendarevent',
+            name='event_start_end_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='schedulejob',
+            name='core_schedu_day_dat_a27bb3_idx',
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='dayrollup',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='preferences',
+            name='feed_token',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='preferences',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='preferences', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='scheduleitem',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='schedulejob',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='dayrollup',
+            name='day',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['user', 'start_time', 'end_time'], name='event_user_start_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['user', 'day_date'], name='schedule_user_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['user', 'created_at'], name='schedule_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedulejob',
+            index=models.Index(fields=['user', 'day_date', 'status'], name='job_user_day_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'completed', 'begin_date'], name='task_user_open_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='calendarevent',
+            constraint=models.UniqueConstraint(condition=models.Q(('uid', ''), _negated=True), fields=('user', 'uid'), name='event_user_uid_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='dayrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='dayrollup_user_day_unique'),
+        ),
+        migrations.RunPython(assign_existing_rows, migrations.RunPython.noop),
+    ]
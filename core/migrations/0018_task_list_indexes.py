@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_user_scoping'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'completed', '-created_at', '-id'], name='task_user_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'priority', 'completed', '-created_at', '-id'], name='task_user_prio_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'task_type', 'completed', '-created_at', '-id'], name='task_user_type_list_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Full-text search index for core.search.
+#
+# SQLite: one FTS5 table core_search(body, owner) with task titles, schedule
+# item titles, event titles and plan texts; rowid = source id * 4 + kind and
+# owner = 'u<user id>'. Triggers keep it in sync with every write, bulk ones
+# included. PostgreSQL: GIN indexes on to_tsvector('simple', column).
+# Other backends get nothing and core.search falls back to LIKE scans.
+# core.search.ensure_index keeps this current after later migrations
+# (SQLite table rebuilds drop triggers); the two must create the same objects.
+
+from django.db import migrations
+
+# (table, column, kind); kind must match core.search.KINDS
+SOURCES = [
+    ('core_task', 'title', 0),
+    ('core_scheduleitem', 'title', 1),
+    ('core_calendarevent', 'title', 2),
+    ('core_schedule', 'plan_text', 3),
+]
+
+SQLITE_ROW = "SELECT {new}.id * 4 + {kind}, {new}.{column}, COALESCE('u' || {new}.user_id, '') WHERE {new}.{column} != ''"
+
+
+def _sqlite_forwards(cursor):
+    cursor.execute(
+        "CREATE VIRTUAL TABLE core_search USING fts5("
+        "body, owner, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    for table, column, kind in SOURCES:
+        insert = 'INSERT INTO core_search(rowid, body, owner) ' + SQLITE_ROW
+        delete = 'DELETE FROM core_search WHERE rowid = old.id * 4 + {kind};'.format(kind=kind)
+        cursor.execute(
+            f"CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN "
+            f"{insert.format(new='new', column=column, kind=kind)}; END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {table}_search_au AFTER UPDATE OF {column}, user_id ON {table} BEGIN "
+            f"{delete} {insert.format(new='new', column=column, kind=kind)}; END"
+        )
+        cursor.execute(f"CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN {delete} END")
+        # Backfill existing rows
+        cursor.execute(
+            'INSERT INTO core_search(rowid, body, owner) '
+            + SQLITE_ROW.format(new=table, column=column, kind=kind).replace(' WHERE', f' FROM {table} WHERE')
+        )
+
+
+def _sqlite_backwards(cursor):
+    for table, _, _ in SOURCES:
+        for suffix in ('ai', 'au', 'ad'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {table}_search_{suffix}')
+    cursor.execute('DROP TABLE IF EXISTS core_search')
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            _sqlite_forwards(cursor)
+        elif vendor == 'postgresql':
+            for table, column, _ in SOURCES:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{column}_fts ON {table} "
+                    f"USING gin (to_tsvector('simple', {column}))"
+                )
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            _sqlite_backwards(cursor)
+        elif vendor == 'postgresql':
+            for table, column, _ in SOURCES:
+                cursor.execute(f'DROP INDEX IF EXISTS {table}_{column}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_task_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
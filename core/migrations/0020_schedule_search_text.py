@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-17 08:04
+
+import json
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of core.search.plan_search_text as of this migration
+PLAN_LINE = re.compile(r'^\s*(?:[-*•]\s*)?\d{1,2}:\d{2}\s*[-–—]\s*\d{1,2}:\d{2}\s*[|:\-–]?\s*')
+
+
+def plan_search_text(plan_text):
+    try:
+        data = json.loads(plan_text)
+    except Exception:
+        data = None
+    if not isinstance(data, (dict, list)):
+        lines = (PLAN_LINE.sub('', line).strip() for line in (plan_text or '').splitlines())
+        return '\n'.join(line for line in lines if line)
+    parts = []
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            parts.extend(node[key].strip() for key in ('title', 'notes') if isinstance(node.get(key), str))
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return '\n'.join(part for part in parts if part)
+
+
+def fill_search_text(apps, schema_editor):
+    """Extract the searchable text of existing plans, in chunks."""
+    Schedule = apps.get_model('core', 'Schedule')
+    batch = []
+    for schedule in Schedule.objects.only('id', 'plan_text').iterator(chunk_size=500):
+        schedule.search_text = plan_search_text(schedule.plan_text)
+        batch.append(schedule)
+        if len(batch) >= 500:
+            Schedule.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        Schedule.objects.bulk_update(batch, ['search_text'])
+
+
+def drop_schedule_triggers(apps, schema_editor):
+    """SQLite cannot drop search_text while the search triggers read it; the
+    next forward migrate recreates them (core.search.ensure_index)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for suffix in ('ai', 'au', 'ad'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS core_schedule_search_{suffix}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        # The search index itself is refreshed by core.search.ensure_index after migrate
+        migrations.RunPython(fill_search_text, drop_schedule_triggers),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
@@ -32,6 +33,7 @@ class Task(models.Model):
         ('Other', 'Other'),
     ]
 
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='Medium')
     duration_minutes = models.PositiveIntegerField(default=30)
@@ -44,6 +46,20 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed = models.BooleanField(default=False)
+    # Set by the background sweep (core.sweeper) once the deadline has passed;
+    # expired tasks are hidden from reads and deleted in batches later
+    expired = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Per-user reads filter open tasks by begin date
+            models.Index(fields=['user', 'completed', 'begin_date'], name='task_user_open_idx'),
+            # Task list keyset pages (open first, newest first), unfiltered or by priority / type
+            models.Index(fields=['user', 'completed', '-created_at', '-id'], name='task_user_list_idx'),
+            models.Index(fields=['user', 'priority', 'completed', '-created_at', '-id'], name='task_user_prio_list_idx'),
+            models.Index(fields=['user', 'task_type', 'completed', '-created_at', '-id'], name='task_user_type_list_idx'),
+            models.Index(fields=['expired', 'deadline'], name='task_expired_deadline_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -55,19 +71,34 @@ class Schedule(models.Model):
         ('Deep-work', 'Deep-work'),
         ('Quick-win', 'Quick-win'),
     ]
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
     mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='Balanced')
     day_start = models.TimeField(default=timezone.datetime.strptime('09:00', '%H:%M').time())
     day_end = models.TimeField(default=timezone.datetime.strptime('18:00', '%H:%M').time())
     plan_text = models.TextField(blank=True, default='')
+    # Item titles and notes of plan_text, the part search indexes (core.search.plan_search_text)
+    search_text = models.TextField(blank=True, default='', editable=False)
     # New: the calendar date this schedule applies to
     day_date = models.DateField(null=True, blank=True)
+    # Soft invalidation: a task change affecting this date marks it stale; it is
+    # regenerated on the next view instead of being deleted up front
+    stale = models.BooleanField(default=False)
+    # Bumped by every reorder; clients send the version they saw (optimistic concurrency)
+    version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'day_date'], name='schedule_user_day_idx'),
+            models.Index(fields=['user', 'created_at'], name='schedule_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Schedule {self.id} ({self.mode})"
 
 
 class ScheduleItem(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
     schedule = models.ForeignKey(Schedule, related_name='items', on_delete=models.CASCADE)
     task = models.ForeignKey(Task, null=True, blank=True, on_delete=models.SET_NULL)
     title = models.CharField(max_length=200)
@@ -83,22 +114,133 @@ class ScheduleItem(models.Model):
 
 
 class Preferences(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='preferences')
     focus_window_start = models.TimeField(null=True, blank=True)
     focus_window_end = models.TimeField(null=True, blank=True)
     break_cadence_minutes = models.PositiveIntegerField(default=0)
     working_days = models.CharField(max_length=32, default='Mon,Tue,Wed,Thu,Fri')
+    # Secret for the ICS subscription feed (calendar clients cannot log in)
+    feed_token = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     def __str__(self):
         return "Preferences"
 
 
 class CalendarEvent(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
+    all_day = models.BooleanField(default=False)
     source = models.CharField(max_length=50, default='ICS')
+    # Import identity (ICS UID, plus RECURRENCE-ID for overridden instances) and a hash
+    # of the imported content, so re-imports only rewrite changed events (core.ics)
+    uid = models.CharField(max_length=255, blank=True, default='')
+    content_hash = models.CharField(max_length=40, blank=True, default='')
+    # Recurring "master" events are stored once and expanded on read (core.recurrence):
+    # start/end are the first occurrence, exdates are comma-separated UTC stamps
+    rrule = models.TextField(blank=True, default='')
+    exdates = models.TextField(blank=True, default='')
+    tzid = models.CharField(max_length=64, blank=True, default='')
+    series_end = models.DateTimeField(null=True, blank=True)
+    # Set on an overridden instance of a series: the UTC stamp of the occurrence it replaces
+    recurrence_id = models.CharField(max_length=16, blank=True, default='')
+
+    class Meta:
+        # Overlap lookups (core.events) range-scan start_time and filter end_time from the index
+        indexes = [
+            models.Index(fields=['user', 'start_time', 'end_time'], name='event_user_start_end_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'uid'], condition=~models.Q(uid=''), name='event_user_uid_unique'),
+        ]
 
     def __str__(self):
         return f"{self.title}"
 
+
+class ScheduleJob(models.Model):
+    """Queued background generation of a day's schedule (see core.jobs)."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
+    day_date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    schedule = models.ForeignKey(Schedule, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'day_date', 'status'], name='job_user_day_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"ScheduleJob {self.day_date} ({self.status})"
+
+
+class PlanCacheEntry(models.Model):
+    """Persistent tier of the generated day-plan cache (see core.plan_cache)."""
+    key = models.CharField(max_length=64, unique=True)
+    plan_text = models.TextField()
+    stored_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"PlanCacheEntry {self.key[:12]}"
+
+
+class DayRollup(models.Model):
+    """Per-day totals for the month/year summaries, kept current by core.rollups."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
+    day = models.DateField()
+    scheduled_minutes = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    event_minutes = models.PositiveIntegerField(default=0)
+    has_schedule = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='dayrollup_user_day_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.scheduled_minutes}m scheduled"
+
+
+class DataVersion(models.Model):
+    """Monotonic change counter per data set and user ('tasks:<user id>'), see core.versions."""
+    name = models.CharField(max_length=32, unique=True)
+    version = models.BigIntegerField(default=0)
+    # When the counter was last bumped (Last-Modified for feeds)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class AnalyticsSnapshot(models.Model):
+    """Computed analytics page data, valid while its data-version signature matches."""
+    key = models.CharField(max_length=32, unique=True)
+    signature = models.CharField(max_length=200)
+    payload = models.TextField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"AnalyticsSnapshot {self.key} ({self.signature})"
+
 # Create your models here.
@@ -0,0 +1,153 @@
+"""Content-addressed cache for generated day plans.
+
+Plans are keyed by a stable hash of the prompt inputs (the formatted task
+lines, mode and focus window), so regenerating a day whose inputs did not
+change returns the previous plan without another OpenAI round trip.
+
+Two tiers:
+- an in-process LRU (fast, per worker)
+- a DB-backed table (PlanCacheEntry), shared by every worker
+
+Both tiers honour a TTL and a maximum size.
+"""
+from collections import OrderedDict
+from datetime import timedelta
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+
+def _ttl_seconds() -> int:
+    return int(getattr(settings, 'PLAN_CACHE_TTL_SECONDS', 6 * 3600))
+
+
+def _memory_max() -> int:
+    return int(getattr(settings, 'PLAN_CACHE_MEMORY_MAX_ENTRIES', 256))
+
+
+def _db_max() -> int:
+    return int(getattr(settings, 'PLAN_CACHE_DB_MAX_ENTRIES', 5000))
+
+
+_lock = threading.Lock()
+_memory = OrderedDict()  # key -> (stored_at monotonic, plan_text)
+_stats = {
+    'memory_hits': 0,
+    'db_hits': 0,
+    'misses': 0,
+    'stores': 0,
+    'evictions': 0,
+}
+
+
+def plan_cache_key(task_lines, mode: str, day_start: str, day_end: str, model: str = '') -> str:
+    """Stable sha256 of the prompt inputs. Task order is significant (it is part of the prompt)."""
+    h = hashlib.sha256()
+    for part in (model or '', mode or '', day_start or '', day_end or ''):
+        h.update(part.encode('utf-8'))
+        h.update(b'\x1f')
+    for line in task_lines:
+        h.update(line.encode('utf-8'))
+        h.update(b'\x1e')
+    return h.hexdigest()
+
+
+def _bump(name: str, n: int = 1):
+    with _lock:
+        _stats[name] += n
+
+
+def _memory_get(key: str):
+    with _lock:
+        hit = _memory.get(key)
+        if hit is None:
+            return None
+        stored_at, plan = hit
+        if time.monotonic() - stored_at > _ttl_seconds():
+            del _memory[key]
+            _stats['evictions'] += 1
+            return None
+        _memory.move_to_end(key)
+        return plan
+
+
+def _memory_put(key: str, plan: str):
+    with _lock:
+        _memory[key] = (time.monotonic(), plan)
+        _memory.move_to_end(key)
+        while len(_memory) > _memory_max():
+            _memory.popitem(last=False)
+            _stats['evictions'] += 1
+
+
+def get_plan(key: str):
+    """Return a cached plan for ``key`` or None. Counts a hit or a miss."""
+    plan = _memory_get(key)
+    if plan is not None:
+        _bump('memory_hits')
+        return plan
+    from .models import PlanCacheEntry
+    cutoff = timezone.now() - timedelta(seconds=_ttl_seconds())
+    try:
+        entry = PlanCacheEntry.objects.filter(key=key, stored_at__gte=cutoff).only('plan_text').first()
+    except Exception:
+        entry = None
+    if entry is None:
+        _bump('misses')
+        return None
+    try:
+        PlanCacheEntry.objects.filter(pk=entry.pk).update(last_used_at=timezone.now(), hits=F('hits') + 1)
+    except Exception:
+        pass
+    _memory_put(key, entry.plan_text)
+    _bump('db_hits')
+    return entry.plan_text
+
+
+def put_plan(key: str, plan: str):
+    """Store ``plan`` in both tiers, evicting expired and least-recently-used DB rows."""
+    from .models import PlanCacheEntry
+    _memory_put(key, plan)
+    _bump('stores')
+    now = timezone.now()
+    try:
+        PlanCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={'plan_text': plan, 'stored_at': now, 'last_used_at': now, 'hits': 0},
+        )
+        _evict_db(now)
+    except Exception:
+        pass
+
+
+def _evict_db(now):
+    from .models import PlanCacheEntry
+    cutoff = now - timedelta(seconds=_ttl_seconds())
+    removed, _ = PlanCacheEntry.objects.filter(stored_at__lt=cutoff).delete()
+    overflow = PlanCacheEntry.objects.count() - _db_max()
+    if overflow > 0:
+        old_ids = list(PlanCacheEntry.objects.order_by('last_used_at').values_list('id', flat=True)[:overflow])
+        extra, _ = PlanCacheEntry.objects.filter(id__in=old_ids).delete()
+        removed += extra
+    if removed:
+        _bump('evictions', removed)
+
+
+def clear_memory():
+    """Empty this process's LRU tier; the DB tier is left alone."""
+    with _lock:
+        _memory.clear()
+
+
+def cache_stats() -> dict:
+    """Snapshot of hit/miss counters for this process."""
+    with _lock:
+        stats = dict(_stats)
+        stats['memory_entries'] = len(_memory)
+    lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 3) if lookups else 0.0
+    return stats
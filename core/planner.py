@@ -0,0 +1,201 @@
+"""Deterministic local day planner.
+
+Used whenever the LLM is unavailable or its plan is unparsable, and as the
+provisional layout while a generation job is queued. Times are handled as
+minutes since local midnight of the target date; free time is a sorted list
+of disjoint intervals, so each placement is a bisect plus a short scan.
+
+Ordering by mode:
+- Balanced:  deadline urgency, High priority, then energy clusters (High
+             energy first, while focus is freshest), longer tasks first
+- Deep-work: deadline urgency, long blocks first, energy clusters
+- Quick-win: deadline urgency, shortest tasks first
+
+Tasks with a time-of-day preference are placed inside that window when it
+has room, otherwise anywhere in the focus window. With a break cadence, a
+short gap is kept once contiguous work would exceed the cadence.
+"""
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+BREAK_MINUTES = 10
+DAY_MINUTES = 24 * 60
+
+TIME_OF_DAY_WINDOWS = {
+    'Morning': (6 * 60, 12 * 60),
+    'Noon': (11 * 60 + 30, 14 * 60),
+    'Afternoon': (12 * 60, 17 * 60),
+    'Evening': (17 * 60, 21 * 60),
+    'Night': (20 * 60, DAY_MINUTES),
+}
+PRIORITY_RANK = {'High': 0, 'Medium': 1, 'Low': 2}
+ENERGY_RANK = {'High': 0, 'Normal': 1, 'Low': 2}
+
+
+class FreeIntervals:
+    """Sorted, disjoint free intervals [start, end) in minutes."""
+
+    def __init__(self, start: int, end: int, busy=()):
+        self.starts = []
+        self.ends = []
+        cursor = start
+        for bs, be in _merge(busy):
+            if be <= cursor:
+                continue
+            if bs >= end:
+                break
+            if bs > cursor:
+                self.starts.append(cursor)
+                self.ends.append(bs)
+            cursor = max(cursor, be)
+        if cursor < end:
+            self.starts.append(cursor)
+            self.ends.append(end)
+        self._longest = max((e - s for s, e in zip(self.starts, self.ends)), default=0)
+
+    def find(self, duration: int, earliest: int, latest_end: int, runs=None, cadence: int = 0):
+        """Earliest start >= ``earliest`` where ``duration`` fits before ``latest_end``, or None.
+
+        With a ``cadence``, a slot whose block would join ``runs`` (WorkRuns)
+        on either side into a run longer than the cadence is skipped; a
+        break after the preceding run is tried instead.
+        """
+        if duration > self._longest:
+            # Nothing left that could hold it; skip the scan once the day is full
+            return None
+        i = bisect_right(self.ends, earliest)
+        while i < len(self.starts) and self.starts[i] < latest_end:
+            s = max(self.starts[i], earliest)
+            limit = min(self.ends[i], latest_end)
+            for start in ((s, s + BREAK_MINUTES) if cadence and runs else (s,)):
+                if start + duration > limit:
+                    break
+                if not cadence or not runs or runs.fits(start, start + duration, cadence):
+                    return start
+            i += 1
+        return None
+
+    def reserve(self, start: int, end: int):
+        i = bisect_right(self.starts, start) - 1
+        fs, fe = self.starts[i], self.ends[i]
+        pieces = [(a, b) for (a, b) in ((fs, start), (end, fe)) if b > a]
+        self.starts[i:i + 1] = [a for a, _ in pieces]
+        self.ends[i:i + 1] = [b for _, b in pieces]
+        if fe - fs == self._longest:
+            self._longest = max((e - s for s, e in zip(self.starts, self.ends)), default=0)
+
+
+class WorkRuns:
+    """Runs of back-to-back placed blocks, indexed from both ends."""
+
+    def __init__(self):
+        self.start_of = {}  # run end -> run start
+        self.end_of = {}  # run start -> run end
+
+    def __bool__(self):
+        return bool(self.start_of)
+
+    def span(self, start: int, end: int):
+        """(start, end) of the run a block [start, end) would form with its neighbours."""
+        return self.start_of.get(start, start), self.end_of.get(end, end)
+
+    def fits(self, start: int, end: int, cadence: int) -> bool:
+        """Whether the block keeps every run within ``cadence`` (a lone block may be longer)."""
+        run_start, run_end = self.span(start, end)
+        return (run_start, run_end) == (start, end) or run_end - run_start <= cadence
+
+    def add(self, start: int, end: int):
+        run_start, run_end = self.span(start, end)
+        self.start_of.pop(start, None)
+        self.end_of.pop(end, None)
+        self.start_of[run_end] = run_start
+        self.end_of[run_start] = run_end
+
+
+def _merge(busy):
+    merged = []
+    for bs, be in sorted(busy):
+        if merged and bs <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], be)
+        else:
+            merged.append([bs, be])
+    return merged
+
+
+def _duration(t) -> int:
+    dur = int(getattr(t, 'daily_time_minutes', 0) or 0)
+    if dur <= 0:
+        dur = int(getattr(t, 'duration_minutes', 30) or 30)
+    return dur
+
+
+def _order_key(mode: str, target_date):
+    def key(t):
+        deadline = getattr(t, 'deadline', None)
+        days_left = (timezone.localtime(deadline).date() - target_date).days if deadline else 999
+        urgency = 0 if days_left <= 0 else (1 if days_left <= 2 else 2)
+        prio = PRIORITY_RANK.get(getattr(t, 'priority', 'Medium'), 1)
+        energy = ENERGY_RANK.get(getattr(t, 'energy_level', 'Normal'), 1)
+        dur = _duration(t)
+        if mode == 'Quick-win':
+            return (urgency, dur, prio)
+        if mode == 'Deep-work':
+            return (urgency, -dur, energy, prio)
+        return (urgency, 0 if prio == 0 else 1, energy, prio, -dur)
+    return key
+
+
+def plan_day(tasks, target_date, window_start: time, window_end: time, busy=(), mode: str = 'Balanced', break_cadence: int = 0):
+    """Place ``tasks`` on ``target_date`` inside the focus window, around ``busy``.
+
+    ``busy`` is an iterable of aware (start, end) datetimes. Returns items in
+    chronological order as dicts with task, title, start, end (aware) and
+    position, the same shape as ``_seq_schedule_items``. Tasks that do not
+    fit are left out.
+    """
+    midnight = timezone.make_aware(datetime.combine(target_date, time.min))
+
+    def to_min(dt):
+        return int((dt - midnight).total_seconds() // 60)
+
+    w_start = window_start.hour * 60 + window_start.minute
+    w_end = window_end.hour * 60 + window_end.minute
+    busy_min = []
+    for bs, be in busy:
+        s, e = max(to_min(bs), 0), min(to_min(be), DAY_MINUTES)
+        if e > s:
+            busy_min.append((s, e))
+    free = FreeIntervals(w_start, w_end, busy_min)
+    runs = WorkRuns()
+    placed = []
+    for t in sorted(tasks, key=_order_key(mode, target_date)):
+        dur = _duration(t)
+        latest_end = w_end
+        deadline = getattr(t, 'deadline', None)
+        if deadline and timezone.localtime(deadline).date() == target_date:
+            latest_end = min(latest_end, to_min(deadline))
+        start = None
+        pref = TIME_OF_DAY_WINDOWS.get(getattr(t, 'time_of_day_pref', 'Any'))
+        if pref:
+            start = free.find(dur, max(w_start, pref[0]), min(latest_end, pref[1]), runs, break_cadence)
+        if start is None:
+            start = free.find(dur, w_start, latest_end, runs, break_cadence)
+        if start is None:
+            continue
+        end = start + dur
+        free.reserve(start, end)
+        runs.add(start, end)
+        placed.append((start, end, t))
+    placed.sort(key=lambda p: p[0])
+    return [
+        {
+            'task': t,
+            'title': t.title,
+            'start': midnight + timedelta(minutes=s),
+            'end': midnight + timedelta(minutes=e),
+            'position': pos,
+        }
+        for pos, (s, e, t) in enumerate(placed)
+    ]
@@ -0,0 +1,112 @@
+"""Cached, pre-parsed user preferences.
+
+``get_prefs(user_id)`` returns a user's ``UserPrefs`` with the focus window
+as ``time`` objects (defaults 09:00-18:00 when unset or reversed), the break
+cadence and the working days as weekday numbers. It is parsed once per
+process and user and reused. Saving or deleting Preferences clears this
+process's copy through a signal and bumps that user's 'prefs' data version;
+other processes check that version at most every
+PREFS_VERSION_CHECK_SECONDS and reload on change.
+"""
+from datetime import datetime, time
+import threading
+import time as _time
+from typing import FrozenSet, NamedTuple
+
+from django.conf import settings
+
+from . import versions
+from .models import Preferences
+
+DEFAULT_START = time(9, 0)
+DEFAULT_END = time(18, 0)
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# user id -> (prefs, version, checked_at)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class UserPrefs(NamedTuple):
+    day_start: time
+    day_end: time
+    break_cadence: int
+    working_days: FrozenSet[int]
+
+    @property
+    def day_start_str(self) -> str:
+        return self.day_start.strftime('%H:%M')
+
+    @property
+    def day_end_str(self) -> str:
+        return self.day_end.strftime('%H:%M')
+
+    @property
+    def window_minutes(self) -> int:
+        return (self.day_end.hour * 60 + self.day_end.minute) - (self.day_start.hour * 60 + self.day_start.minute)
+
+
+def parse_time(value, default=None):
+    """A ``time`` from a time or an 'HH:MM' string; ``default`` when invalid."""
+    if isinstance(value, time):
+        return value
+    try:
+        return datetime.strptime((value or '').strip(), '%H:%M').time()
+    except Exception:
+        return default
+
+
+def parse_window(start, end):
+    """(start, end) times for a focus window, falling back to 09:00-18:00 when invalid or reversed."""
+    st = parse_time(start, DEFAULT_START)
+    en = parse_time(end, DEFAULT_END)
+    if en <= st:
+        return DEFAULT_START, DEFAULT_END
+    return st, en
+
+
+def parse_working_days(value: str) -> FrozenSet[int]:
+    days = set()
+    for part in (value or '').split(','):
+        name = part.strip()[:3].title()
+        if name in WEEKDAYS:
+            days.add(WEEKDAYS.index(name))
+    return frozenset(days) if days else frozenset(range(5))
+
+
+def parse_prefs(obj) -> UserPrefs:
+    st, en = parse_window(getattr(obj, 'focus_window_start', None), getattr(obj, 'focus_window_end', None))
+    return UserPrefs(
+        day_start=st,
+        day_end=en,
+        break_cadence=int(getattr(obj, 'break_cadence_minutes', 0) or 0),
+        working_days=parse_working_days(getattr(obj, 'working_days', '')),
+    )
+
+
+def get_prefs(user_id) -> UserPrefs:
+    """The user's current preferences, from the per-process cache when still valid."""
+    interval = float(getattr(settings, 'PREFS_VERSION_CHECK_SECONDS', 5))
+    now = _time.monotonic()
+    with _cache_lock:
+        cached, cached_version, checked_at = _cache.get(user_id, (None, None, 0.0))
+    if cached is not None and now - checked_at < interval:
+        return cached
+    version = versions.current(versions.PREFS, user_id=user_id)[versions.PREFS]
+    if cached is not None and version == cached_version:
+        with _cache_lock:
+            _cache[user_id] = (cached, cached_version, now)
+        return cached
+    prefs = parse_prefs(Preferences.objects.filter(user_id=user_id).first())
+    with _cache_lock:
+        _cache[user_id] = (prefs, version, now)
+    return prefs
+
+
+def invalidate(user_id=None):
+    """Drop the cached preferences of ``user_id`` (everyone's when None)."""
+    with _cache_lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
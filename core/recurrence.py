@@ -0,0 +1,370 @@
+"""Lazy expansion of recurring calendar events (RFC 5545 RRULE/EXDATE).
+
+A recurring event is stored once, as a "master" CalendarEvent whose
+start/end are the first occurrence and whose ``rrule``/``exdates`` describe
+the rest. ``expand`` is a generator that walks the rule period by period
+(skipping straight to the requested window when the rule has no COUNT), so
+only the occurrences that are asked for are ever built.
+
+``occurrences_between`` answers "which occurrences overlap [start, end)"
+for one user's masters. The parsed masters are memoized per user and events
+data version, and the answers per window, both in small LRUs bounded by
+RECURRENCE_CACHE_WINDOWS, so repeat lookups for the same day or month cost
+one version check. ``iter_occurrences`` walks every series lazily in start
+order, for listings that want the first N events rather than a window.
+
+Supported: FREQ=DAILY/WEEKLY/MONTHLY/YEARLY with INTERVAL, COUNT, UNTIL,
+BYDAY (with ordinals such as 2TU or -1FR), BYMONTHDAY, BYMONTH and
+BYSETPOS. Other BYxxx parts are ignored.
+"""
+from calendar import monthrange
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+import heapq
+import threading
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import versions
+from .models import CalendarEvent
+
+WEEKDAY_CODES = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+# Periods scanned per expansion before giving up on a rule that never matches
+MAX_EMPTY_PERIODS = 2000
+# How far iter_occurrences follows a series that never ends
+ITER_YEARS = 10
+
+# user id -> (events version, parsed masters), and (user id, version, start, end) -> occurrences
+_masters = OrderedDict()
+_windows = OrderedDict()
+_lock = threading.Lock()
+
+
+class Rule(NamedTuple):
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+    byday: tuple = ()          # ((ordinal or 0, weekday), ...)
+    bymonthday: tuple = ()
+    bymonth: tuple = ()
+    bysetpos: tuple = ()
+
+
+class Master(NamedTuple):
+    uid: str
+    title: str
+    start: datetime
+    duration: timedelta
+    rule: Rule
+    exdates: frozenset
+    all_day: bool
+
+
+def stamp(dt) -> str:
+    """UTC 'YYYYMMDDTHHMMSSZ' form used for EXDATE / RECURRENCE-ID matching."""
+    return dt.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _ints(value):
+    out = []
+    for part in value.split(','):
+        try:
+            out.append(int(part))
+        except ValueError:
+            pass
+    return tuple(out)
+
+
+def parse_rrule(text: str, until_zone=None) -> Optional[Rule]:
+    """A ``Rule`` from an RRULE value, or None when it is missing or unsupported."""
+    parts = {}
+    for part in (text or '').strip().split(';'):
+        key, _, value = part.partition('=')
+        if key:
+            parts[key.strip().upper()] = value.strip().upper()
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        return None
+    until = None
+    if parts.get('UNTIL'):
+        raw = parts['UNTIL']
+        try:
+            if raw.endswith('Z'):
+                until = datetime.strptime(raw[:15], '%Y%m%dT%H%M%S').replace(tzinfo=dt_timezone.utc)
+            elif 'T' in raw:
+                until = datetime.strptime(raw[:15], '%Y%m%dT%H%M%S').replace(tzinfo=until_zone or timezone.get_current_timezone())
+            else:
+                # A DATE UNTIL includes that whole day
+                until = datetime.strptime(raw[:8], '%Y%m%d').replace(tzinfo=until_zone or timezone.get_current_timezone()) + timedelta(days=1, microseconds=-1)
+        except ValueError:
+            return None
+    byday = []
+    for code in filter(None, parts.get('BYDAY', '').split(',')):
+        wd = code[-2:]
+        if wd not in WEEKDAY_CODES:
+            continue
+        try:
+            ordinal = int(code[:-2]) if code[:-2] else 0
+        except ValueError:
+            continue
+        byday.append((ordinal, WEEKDAY_CODES.index(wd)))
+    try:
+        interval = max(1, int(parts.get('INTERVAL') or 1))
+        count = int(parts['COUNT']) if parts.get('COUNT') else None
+    except ValueError:
+        return None
+    return Rule(
+        freq=freq,
+        interval=interval,
+        count=count,
+        until=until,
+        byday=tuple(byday),
+        bymonthday=_ints(parts.get('BYMONTHDAY', '')),
+        bymonth=_ints(parts.get('BYMONTH', '')),
+        bysetpos=_ints(parts.get('BYSETPOS', '')),
+    )
+
+
+def _add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def _month_days(year, month, rule, default_day):
+    """Candidate dates of one month for MONTHLY/YEARLY rules."""
+    last = monthrange(year, month)[1]
+    monthdays = set()
+    for md in rule.bymonthday:
+        day = md if md > 0 else last + md + 1
+        if 1 <= day <= last:
+            monthdays.add(day)
+    weekdays = set()
+    if rule.byday:
+        for ordinal, wd in rule.byday:
+            first = (wd - date(year, month, 1).weekday()) % 7 + 1
+            days = list(range(first, last + 1, 7))
+            if ordinal == 0:
+                weekdays.update(days)
+            elif -len(days) <= ordinal <= len(days):
+                weekdays.add(days[ordinal - 1] if ordinal > 0 else days[ordinal])
+    if rule.bymonthday and rule.byday:
+        days = monthdays & weekdays
+    elif rule.bymonthday:
+        days = monthdays
+    elif rule.byday:
+        days = weekdays
+    else:
+        days = {default_day} if default_day <= last else set()
+    return [date(year, month, day) for day in sorted(days)]
+
+
+def _period_dates(rule: Rule, first: date, index: int):
+    """Candidate dates of the ``index``-th period of the rule (before BYSETPOS)."""
+    step = index * rule.interval
+    if rule.freq == 'DAILY':
+        d = first + timedelta(days=step)
+        if rule.byday and d.weekday() not in {wd for _, wd in rule.byday}:
+            return []
+        if rule.bymonthday:
+            last = monthrange(d.year, d.month)[1]
+            if not any(d.day == (md if md > 0 else last + md + 1) for md in rule.bymonthday):
+                return []
+        return [d]
+    if rule.freq == 'WEEKLY':
+        week_start = first - timedelta(days=first.weekday()) + timedelta(weeks=step)
+        weekdays = sorted({wd for _, wd in rule.byday}) if rule.byday else [first.weekday()]
+        return [week_start + timedelta(days=wd) for wd in weekdays]
+    if rule.freq == 'MONTHLY':
+        m = _add_months(first, step)
+        return _month_days(m.year, m.month, rule, first.day)
+    year = first.year + step
+    if rule.bymonth or rule.bymonthday or not rule.byday:
+        out = []
+        for month in (rule.bymonth or (first.month,)):
+            if 1 <= month <= 12:
+                out.extend(_month_days(year, month, rule, first.day))
+        return sorted(out)
+    # YEARLY with BYDAY only: ordinals count within the year
+    out = []
+    for ordinal, wd in rule.byday:
+        d = date(year, 1, 1) + timedelta(days=(wd - date(year, 1, 1).weekday()) % 7)
+        days = []
+        while d.year == year:
+            days.append(d)
+            d += timedelta(weeks=1)
+        if ordinal == 0:
+            out.extend(days)
+        elif -len(days) <= ordinal <= len(days):
+            out.append(days[ordinal - 1] if ordinal > 0 else days[ordinal])
+    return sorted(set(out))
+
+
+def _periods_between(rule: Rule, first: date, target: date) -> int:
+    """Index of the period containing ``target`` (never negative)."""
+    if target <= first:
+        return 0
+    if rule.freq == 'DAILY':
+        n = (target - first).days
+    elif rule.freq == 'WEEKLY':
+        n = ((target - timedelta(days=target.weekday())) - (first - timedelta(days=first.weekday()))).days // 7
+    elif rule.freq == 'MONTHLY':
+        n = (target.year - first.year) * 12 + target.month - first.month
+    else:
+        n = target.year - first.year
+    return max(0, n // rule.interval)
+
+
+def expand(start, duration, rule: Rule, exdates=frozenset(), window_start=None, window_end=None):
+    """Yield ``(start, end)`` of occurrences overlapping [window_start, window_end), in order.
+
+    Occurrences keep the first occurrence's wall-clock time in its own zone,
+    so they stay put across DST changes. Without ``window_end`` the rule
+    must be bounded by COUNT or UNTIL.
+    """
+    if window_end is None and rule.count is None and rule.until is None:
+        raise ValueError('unbounded rule needs a window end')
+    zone = start.tzinfo
+    first = start.date()
+    wall = start.timetz().replace(tzinfo=None)
+    index = 0
+    if rule.count is None and window_start is not None:
+        # Nothing before the window can matter without a COUNT to keep
+        index = max(0, _periods_between(rule, first, (window_start - duration).astimezone(zone).date()) - 1)
+    produced = 0
+    empty = 0
+    while True:
+        dates = [d for d in _period_dates(rule, first, index) if not rule.bymonth or d.month in rule.bymonth]
+        if rule.bysetpos and dates:
+            dates = sorted({dates[p - 1] if p > 0 else dates[p] for p in rule.bysetpos if -len(dates) <= p <= len(dates) and p})
+        index += 1
+        empty = 0 if dates else empty + 1
+        if empty > MAX_EMPTY_PERIODS:
+            return
+        for d in dates:
+            occ = datetime.combine(d, wall, tzinfo=zone)
+            if occ < start:
+                continue
+            if rule.until is not None and occ > rule.until:
+                return
+            if window_end is not None and occ >= window_end:
+                return
+            produced += 1
+            if rule.count is not None and produced > rule.count:
+                return
+            if stamp(occ) in exdates:
+                continue
+            end = occ + duration
+            if window_start is not None and end <= window_start:
+                continue
+            yield occ, end
+
+
+def series_end(start, duration, rule: Rule, exdates=frozenset()):
+    """End of the last occurrence, or None when the series never ends."""
+    if rule.count is None and rule.until is None:
+        return None
+    last_end = None
+    for _, end in expand(start, duration, rule, exdates):
+        last_end = end
+    return last_end
+
+
+def master_from_event(event) -> Optional[Master]:
+    zone = _zone_of(event)
+    rule = parse_rrule(event.rrule, zone)
+    if rule is None:
+        return None
+    start = event.start_time.astimezone(zone)
+    return Master(
+        uid=event.uid,
+        title=event.title,
+        start=start,
+        duration=max(event.end_time - event.start_time, timedelta(0)),
+        rule=rule,
+        exdates=frozenset(filter(None, (event.exdates or '').split(','))),
+        all_day=event.all_day,
+    )
+
+
+def _zone_of(event):
+    try:
+        return ZoneInfo(event.tzid) if event.tzid else timezone.get_current_timezone()
+    except Exception:
+        return timezone.get_current_timezone()
+
+
+def _cache_limit() -> int:
+    return max(1, int(getattr(settings, 'RECURRENCE_CACHE_WINDOWS', 256)))
+
+
+def _load_masters(user_id, version):
+    with _lock:
+        cached = _masters.get(user_id)
+        if cached is not None and cached[0] == version:
+            _masters.move_to_end(user_id)
+            return cached[1]
+    # Overridden instances (RECURRENCE-ID rows) replace the occurrence they name
+    overridden = {}
+    for uid, rid in CalendarEvent.objects.filter(user_id=user_id).exclude(recurrence_id='').values_list('uid', 'recurrence_id'):
+        overridden.setdefault(uid.rsplit('/', 1)[0], set()).add(rid)
+    items = []
+    for event in CalendarEvent.objects.filter(user_id=user_id).exclude(rrule=''):
+        master = master_from_event(event)
+        if master is None:
+            continue
+        if master.uid in overridden:
+            master = master._replace(exdates=master.exdates | overridden[master.uid])
+        items.append(master)
+    items = tuple(items)
+    with _lock:
+        _masters[user_id] = (version, items)
+        while len(_masters) > _cache_limit():
+            _masters.popitem(last=False)
+        # Windows expanded from the previous version can never be hit again
+        for key in [k for k in _windows if k[0] == user_id and k[1] != version]:
+            del _windows[key]
+    return items
+
+
+def occurrences_between(user_id, start, end):
+    """``(start, end, title)`` of the user's recurring-event occurrences overlapping [start, end)."""
+    version = versions.current(versions.EVENTS, user_id=user_id)[versions.EVENTS]
+    key = (user_id, version, start, end)
+    with _lock:
+        if key in _windows:
+            _windows.move_to_end(key)
+            return _windows[key]
+    result = []
+    for master in _load_masters(user_id, version):
+        if master.start >= end:
+            continue
+        for occ_start, occ_end in expand(master.start, master.duration, master.rule, master.exdates, start, end):
+            result.append((occ_start, occ_end, master.title))
+    result.sort(key=lambda row: row[0])
+    result = tuple(result)
+    with _lock:
+        _windows[key] = result
+        while len(_windows) > _cache_limit():
+            _windows.popitem(last=False)
+    return result
+
+
+def iter_occurrences(user_id):
+    """``(start, end, title)`` of all the user's recurring occurrences in start order, built as consumed.
+
+    Series without an end stop ITER_YEARS after their first occurrence;
+    callers take as many rows as they need.
+    """
+    version = versions.current(versions.EVENTS, user_id=user_id)[versions.EVENTS]
+
+    def rows(master):
+        horizon = master.start + timedelta(days=366 * ITER_YEARS)
+        for occ_start, occ_end in expand(master.start, master.duration, master.rule, master.exdates, window_end=horizon):
+            yield occ_start, occ_end, master.title
+
+    return heapq.merge(*(rows(m) for m in _load_masters(user_id, version)), key=lambda row: row[0])
@@ -0,0 +1,143 @@
+"""Materialized per-user, per-day totals (DayRollup) behind the month/year summaries.
+
+Signal handlers in core.signals mark the (user, day) pairs touched by a
+Schedule, ScheduleItem or CalendarEvent write; the marked days are recomputed once
+when the surrounding transaction commits. Recurring events count on every day they occur,
+up to RECURRENCE_ROLLUP_DAYS ahead for series without an end.
+
+Rules for code that writes this data (referred to from the call sites):
+
+- Bulk writes (``bulk_create``, ``bulk_update``, ``QuerySet.update``)
+  send no model signals, so the code doing them calls ``mark_days`` and
+  ``versions.mark`` itself.
+- Mark the events version before the event days. Commit callbacks run in
+  the order they were registered, and the refresh reads the longest event
+  span, which core.events caches per events version.
+"""
+from datetime import timedelta
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .events import busy_by_date
+from .models import CalendarEvent, DayRollup, Schedule, ScheduleItem
+from .planner import _merge
+
+_state = threading.local()
+
+
+def _pending():
+    if not hasattr(_state, 'days'):
+        _state.days = set()
+        _state.schedule_ids = set()
+    return _state
+
+
+def mark_days(user_id, days):
+    """Recompute the user's rollups of ``days`` when the current transaction commits."""
+    _pending().days.update((user_id, d) for d in days if d)
+    transaction.on_commit(flush)
+
+
+def mark_schedules(schedule_ids):
+    """Like ``mark_days`` for the days of the given schedules (resolved at flush)."""
+    _pending().schedule_ids.update(i for i in schedule_ids if i)
+    transaction.on_commit(flush)
+
+
+def event_days(start, end):
+    """Local dates covered by an event running from ``start`` to ``end``."""
+    first = timezone.localtime(start).date()
+    last = timezone.localtime(max(end - timedelta(microseconds=1), start)).date()
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def days_of_event(start, end, rrule='', series_end=None):
+    """Local dates whose rollups an event (or a whole recurring series) affects."""
+    if not rrule:
+        return event_days(start, end)
+    horizon = timezone.now() + timedelta(days=int(getattr(settings, 'RECURRENCE_ROLLUP_DAYS', 366)))
+    last = min(series_end or horizon, horizon)
+    return event_days(start, max(last, end))
+
+
+def flush():
+    state = _pending()
+    pairs, ids = state.days, state.schedule_ids
+    state.days, state.schedule_ids = set(), set()
+    if ids:
+        pairs |= set(Schedule.objects.filter(id__in=ids, day_date__isnull=False).values_list('user_id', 'day_date'))
+    by_user = {}
+    for user_id, d in pairs:
+        # Ownerless legacy rows have no rollups
+        if user_id is not None:
+            by_user.setdefault(user_id, set()).add(d)
+    for user_id, days in by_user.items():
+        days = sorted(days)
+        # Bounded IN lists: an import can touch years of days at once
+        for i in range(0, len(days), 500):
+            refresh_days(user_id, days[i:i + 500])
+
+
+def refresh_days(user_id, days):
+    """Recompute and store the user's rollups for ``days`` (a few queries plus the write)."""
+    days = sorted(set(days))
+    if not days:
+        return
+    scheduled = {d: 0 for d in days}
+    counts = {d: 0 for d in days}
+    has_schedule = set(Schedule.objects.filter(user_id=user_id, day_date__in=days).values_list('day_date', flat=True))
+    for d, st, en in ScheduleItem.objects.filter(
+        schedule__user_id=user_id, schedule__day_date__in=days,
+    ).values_list('schedule__day_date', 'start_time', 'end_time'):
+        scheduled[d] += max(int((en - st).total_seconds() // 60), 0)
+        counts[d] += 1
+    events = {d: 0 for d in days}
+    for d, spans in busy_by_date(user_id, days).items():
+        # Busy time, so overlapping events count once
+        events[d] = sum(max(int((en - st).total_seconds() // 60), 0) for st, en in _merge(spans))
+
+    rows, empty = [], []
+    for d in days:
+        if d in has_schedule or events[d]:
+            rows.append(DayRollup(
+                user_id=user_id,
+                day=d,
+                scheduled_minutes=scheduled[d],
+                item_count=counts[d],
+                event_minutes=events[d],
+                has_schedule=d in has_schedule,
+            ))
+        else:
+            empty.append(d)
+    if rows:
+        DayRollup.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user', 'day'],
+            update_fields=['scheduled_minutes', 'item_count', 'event_minutes', 'has_schedule', 'updated_at'],
+        )
+    if empty:
+        DayRollup.objects.filter(user_id=user_id, day__in=empty).delete()
+
+
+def rebuild_all():
+    """Recompute every rollup from scratch (backfill / repair); returns the number of (user, day) rows."""
+    by_user = {}
+    for user_id, d in Schedule.objects.filter(day_date__isnull=False).values_list('user_id', 'day_date'):
+        by_user.setdefault(user_id, set()).add(d)
+    for user_id, st, en, rrule, series_end in CalendarEvent.objects.values_list('user_id', 'start_time', 'end_time', 'rrule', 'series_end'):
+        by_user.setdefault(user_id, set()).update(days_of_event(st, en, rrule, series_end))
+    DayRollup.objects.exclude(user_id__in=[u for u in by_user if u is not None]).delete()
+    total = 0
+    for user_id, days in by_user.items():
+        if user_id is None:
+            continue
+        DayRollup.objects.filter(user_id=user_id).exclude(day__in=days).delete()
+        days = sorted(days)
+        for i in range(0, len(days), 500):
+            refresh_days(user_id, days[i:i + 500])
+        total += len(days)
+    return total
@@ -0,0 +1,294 @@
+"""Full-text search over a user's tasks, schedule items, events and plans.
+
+``search(user_id, text)`` matches every word of ``text`` as a prefix
+("rep wri" finds "Write the report") against task titles, schedule item
+titles, calendar event titles and the item titles and notes of saved plans
+(Schedule.search_text), best matches first.
+
+The index lives in the database: on SQLite an FTS5 table kept in sync by
+triggers, ranked with bm25 and restricted to the user through an indexed
+owner token; on PostgreSQL GIN indexes on to_tsvector('simple') ranked with
+ts_rank. Either way a query is one index lookup plus one small query per
+result type. Other backends fall back to LIKE scans.
+
+``ensure_index`` (re)creates all of it idempotently after every ``migrate``
+(see core.signals): SQLite applies most schema changes by rebuilding the
+table, which silently drops its triggers, so a one-time migration is not
+enough. When triggers had to be recreated the FTS table is refilled, since
+writes made without them are missing from it.
+"""
+import json
+import logging
+import re
+import threading
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import CalendarEvent, Schedule, ScheduleItem
+from .sweeper import live_tasks
+
+log = logging.getLogger(__name__)
+
+# Index row kinds; row ids on SQLite are source id * 4 + kind
+KINDS = ('task', 'item', 'event', 'plan')
+MAX_TERMS = 8
+SNIPPET_CHARS = 80
+# Leading bullet and time range of a plan line
+_PLAN_LINE = re.compile(r'^\s*(?:[-*•]\s*)?\d{1,2}:\d{2}\s*[-–—]\s*\d{1,2}:\d{2}\s*[|:\-–]?\s*')
+
+_fts = {}
+_fts_lock = threading.Lock()
+
+# (table, indexed column); the position is the kind
+SOURCES = [
+    ('core_task', 'title'),
+    ('core_scheduleitem', 'title'),
+    ('core_calendarevent', 'title'),
+    ('core_schedule', 'search_text'),
+]
+# Indexes of earlier SOURCES, dropped by ensure_index
+OBSOLETE_PG_INDEXES = ['core_schedule_plan_text_fts']
+
+SQLITE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_search USING fts5("
+    "body, owner, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+SQLITE_ROW = "SELECT {new}.id * 4 + {kind}, {new}.{column}, COALESCE('u' || {new}.user_id, '') WHERE {new}.{column} != ''"
+
+
+def _sqlite_triggers():
+    """``{name: CREATE TRIGGER statement}`` keeping core_search in sync with the sources."""
+    triggers = {}
+    for kind, (table, column) in enumerate(SOURCES):
+        insert = 'INSERT INTO core_search(rowid, body, owner) ' + SQLITE_ROW.format(new='new', column=column, kind=kind)
+        delete = f'DELETE FROM core_search WHERE rowid = old.id * 4 + {kind};'
+        triggers[f'{table}_search_ai'] = f'CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN {insert}; END'
+        triggers[f'{table}_search_au'] = (
+            f'CREATE TRIGGER {table}_search_au AFTER UPDATE OF {column}, user_id ON {table} BEGIN {delete} {insert}; END'
+        )
+        triggers[f'{table}_search_ad'] = f'CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN {delete} END'
+    return triggers
+
+
+def _ensure_sqlite(cursor):
+    try:
+        cursor.execute(SQLITE_TABLE)
+    except Exception:
+        # SQLite built without FTS5: search falls back to LIKE scans
+        log.warning("FTS5 unavailable; search will use unindexed LIKE scans")
+        return False
+    wanted = _sqlite_triggers()
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    if {name: sql for name, sql in cursor.fetchall() if name in wanted} == wanted:
+        return False
+    for name in wanted:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    for sql in wanted.values():
+        cursor.execute(sql)
+    cursor.execute('DELETE FROM core_search')
+    for kind, (table, column) in enumerate(SOURCES):
+        cursor.execute(
+            'INSERT INTO core_search(rowid, body, owner) '
+            + SQLITE_ROW.format(new=table, column=column, kind=kind).replace(' WHERE', f' FROM {table} WHERE')
+        )
+    return True
+
+
+def _ensure_postgres(cursor):
+    for name in OBSOLETE_PG_INDEXES:
+        cursor.execute(f'DROP INDEX IF EXISTS {name}')
+    for table, column in SOURCES:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_{column}_fts ON {table} "
+            f"USING gin (to_tsvector('simple', {column}))"
+        )
+    return False
+
+
+def ensure_index(conn=None) -> bool:
+    """Create the search index, triggers included, where missing; True when SQLite's had to be rebuilt."""
+    conn = conn or connection
+    tables = set(conn.introspection.table_names())
+    with conn.cursor() as cursor:
+        # Nothing to do while migrated back to before the sources existed
+        for table, column in SOURCES:
+            if table not in tables or column not in {c.name for c in conn.introspection.get_table_description(cursor, table)}:
+                return False
+        if conn.vendor == 'sqlite':
+            rebuilt = _ensure_sqlite(cursor)
+        elif conn.vendor == 'postgresql':
+            rebuilt = _ensure_postgres(cursor)
+        else:
+            rebuilt = False
+    with _fts_lock:
+        _fts.pop(conn.alias, None)
+    return rebuilt
+
+
+def plan_search_text(plan_text: str) -> str:
+    """Item titles and notes of a plan (JSON, single or multi-day, or "HH:MM-HH:MM Title" lines).
+
+    Stored as Schedule.search_text, so JSON keys ("items", "start", ...) and
+    times never make a plan match.
+    """
+    try:
+        data = json.loads(plan_text)
+    except Exception:
+        data = None
+    if not isinstance(data, (dict, list)):
+        lines = (_PLAN_LINE.sub('', line).strip() for line in (plan_text or '').splitlines())
+        return '\n'.join(line for line in lines if line)
+    parts = []
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            parts.extend(node[key].strip() for key in ('title', 'notes') if isinstance(node.get(key), str))
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return '\n'.join(part for part in parts if part)
+
+
+def terms(text: str):
+    """Lower-cased words of ``text`` (at most MAX_TERMS); punctuation never reaches the query syntax."""
+    return re.findall(r'\w+', (text or '').lower())[:MAX_TERMS]
+
+
+def _fts_ready() -> bool:
+    """Whether the SQLite FTS5 table exists (checked once per process and database)."""
+    alias = connection.alias
+    with _fts_lock:
+        if alias not in _fts:
+            _fts[alias] = 'core_search' in connection.introspection.table_names()
+        return _fts[alias]
+
+
+def _sqlite_hits(user_id, words, limit, offset=0):
+    match = 'owner:u{} AND body:({})'.format(user_id, ' '.join(f'"{w}"*' for w in words))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT rowid FROM core_search WHERE core_search MATCH %s ORDER BY bm25(core_search, 1.0, 0.0) LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [(KINDS[rowid % 4], rowid // 4) for (rowid,) in cursor.fetchall()]
+
+
+def _postgres_hits(user_id, words, limit, offset=0):
+    query = ' & '.join(f'{w}:*' for w in words)
+    parts, params = [], []
+    for kind, (table, column) in enumerate(SOURCES):
+        parts.append(
+            f"SELECT {kind} AS kind, id, ts_rank(to_tsvector('simple', {column}), q) AS rank "
+            f"FROM {table}, to_tsquery('simple', %s) q "
+            f"WHERE user_id = %s AND to_tsvector('simple', {column}) @@ q"
+        )
+        params += [query, user_id]
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(parts) + ' ORDER BY rank DESC, kind, id LIMIT %s OFFSET %s', params + [limit, offset])
+        return [(KINDS[kind], pk) for kind, pk, _ in cursor.fetchall()]
+
+
+def _like_hits(user_id, words, limit, offset=0):
+    """Unindexed fallback for other backends: newest matches of each kind."""
+    hits = []
+    for kind, qs, column in (
+        ('task', live_tasks(user_id), 'title'),
+        ('item', ScheduleItem.objects.filter(user_id=user_id), 'title'),
+        ('event', CalendarEvent.objects.filter(user_id=user_id), 'title'),
+        ('plan', Schedule.objects.filter(user_id=user_id), 'search_text'),
+    ):
+        for w in words:
+            qs = qs.filter(**{f'{column}__icontains': w})
+        hits += [(kind, pk) for pk in qs.order_by('-id').values_list('id', flat=True)[:offset + limit]]
+    return hits[offset:offset + limit]
+
+
+def _snippet(text: str, words) -> str:
+    """About SNIPPET_CHARS of ``text`` around the first matched word."""
+    text = ' '.join((text or '').split())
+    lowered = text.lower()
+    found = [i for i in (lowered.find(w) for w in words) if i >= 0]
+    start = max(min(found) - SNIPPET_CHARS // 4, 0) if found else 0
+    if start:
+        # Start on a word boundary
+        start = text.rfind(' ', 0, start) + 1
+    piece = text[start:start + SNIPPET_CHARS]
+    return ('…' if start else '') + piece + ('…' if start + SNIPPET_CHARS < len(text) else '')
+
+
+def _local(dt):
+    return timezone.localtime(dt).isoformat() if dt else None
+
+
+def _results(user_id, hits, words):
+    """Result dicts for ``hits`` in rank order, one query per result type."""
+    ids = {kind: [pk for k, pk in hits if k == kind] for kind in KINDS}
+    found = {}
+    if ids['task']:
+        for t in live_tasks(user_id).filter(id__in=ids['task']).values('id', 'title', 'completed', 'begin_date', 'deadline'):
+            found['task', t['id']] = {
+                'title': t['title'],
+                'completed': t['completed'],
+                'date': t['begin_date'].isoformat() if t['begin_date'] else None,
+                'deadline': _local(t['deadline']),
+                'url': f"/tasks/{t['id']}/edit/",
+            }
+    if ids['item']:
+        for it in ScheduleItem.objects.filter(user_id=user_id, id__in=ids['item']).values(
+            'id', 'title', 'start_time', 'end_time', 'schedule_id', 'schedule__day_date',
+        ):
+            day = it['schedule__day_date']
+            found['item', it['id']] = {
+                'title': it['title'],
+                'date': day.isoformat() if day else None,
+                'start': _local(it['start_time']),
+                'end': _local(it['end_time']),
+                'schedule_id': it['schedule_id'],
+            }
+    if ids['event']:
+        for ev in CalendarEvent.objects.filter(user_id=user_id, id__in=ids['event']).values(
+            'id', 'title', 'start_time', 'end_time', 'all_day', 'rrule',
+        ):
+            found['event', ev['id']] = {
+                'title': ev['title'],
+                'date': timezone.localtime(ev['start_time']).date().isoformat(),
+                'start': _local(ev['start_time']),
+                'end': _local(ev['end_time']),
+                'all_day': ev['all_day'],
+                'recurring': bool(ev['rrule']),
+            }
+    if ids['plan']:
+        for sc in Schedule.objects.filter(user_id=user_id, id__in=ids['plan']).values('id', 'day_date', 'mode', 'search_text'):
+            day = sc['day_date']
+            found['plan', sc['id']] = {
+                'title': f"{sc['mode']} plan" + (f" for {day:%Y-%m-%d}" if day else ''),
+                'date': day.isoformat() if day else None,
+                'snippet': _snippet(sc['search_text'], words),
+            }
+    # Hits can vanish between the index lookup and the load (or be expired tasks)
+    return [dict(type=kind, id=pk, **found[kind, pk]) for kind, pk in hits if (kind, pk) in found]
+
+
+def search(user_id, text: str, limit: int = 20):
+    """The user's best ``limit`` matches for ``text`` as dicts (type, id, title, date, ...)."""
+    words = terms(text)
+    if not words:
+        return []
+    if connection.vendor == 'sqlite' and _fts_ready():
+        find = _sqlite_hits
+    elif connection.vendor == 'postgresql':
+        find = _postgres_hits
+    else:
+        find = _like_hits
+    # Expired tasks stay in the index until the sweep deletes them and are
+    # dropped by _results, so keep reading ranked hits until the page is full
+    results, offset, batch = [], 0, limit * 2
+    while len(results) < limit:
+        hits = find(user_id, words, batch, offset)
+        results += _results(user_id, hits, words)
+        if len(hits) < batch:
+            break
+        offset += batch
+    return results[:limit]
@@ -0,0 +1,74 @@
+"""Model signal handlers that keep derived data (core.rollups, core.versions, core.prefs, core.search) current."""
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from . import prefs, rollups, search, versions
+from .models import CalendarEvent, Preferences, Schedule, ScheduleItem, Task
+
+
+@receiver(pre_save, sender=Schedule)
+def _schedule_search_text(sender, instance, **kwargs):
+    # Bulk creates set it themselves (views._replace_day_schedules)
+    instance.search_text = search.plan_search_text(instance.plan_text)
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def _schedule_changed(sender, instance, **kwargs):
+    rollups.mark_days(instance.user_id, [instance.day_date])
+    versions.mark(versions.SCHEDULES, user_id=instance.user_id)
+
+
+@receiver(post_save, sender=ScheduleItem)
+@receiver(post_delete, sender=ScheduleItem)
+def _schedule_item_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    if ScheduleItem.schedule.is_cached(instance):
+        user_id = instance.schedule.user_id
+        rollups.mark_days(user_id, [instance.schedule.day_date])
+    else:
+        rollups.mark_schedules([instance.schedule_id])
+    versions.mark(versions.SCHEDULES, user_id=user_id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def _task_changed(sender, instance, **kwargs):
+    versions.mark(versions.TASKS, user_id=instance.user_id)
+
+
+@receiver(pre_save, sender=CalendarEvent)
+def _calendar_event_moving(sender, instance, **kwargs):
+    # The days an edited event leaves need refreshing too
+    if instance.pk is None:
+        return
+    old = CalendarEvent.objects.filter(pk=instance.pk).values('user_id', 'start_time', 'end_time', 'rrule', 'series_end').first()
+    if old:
+        # Events version first (see core.rollups)
+        versions.mark(versions.EVENTS, user_id=old['user_id'])
+        rollups.mark_days(old['user_id'], rollups.days_of_event(old['start_time'], old['end_time'], old['rrule'], old['series_end']))
+
+
+@receiver(post_save, sender=CalendarEvent)
+@receiver(post_delete, sender=CalendarEvent)
+def _calendar_event_changed(sender, instance, **kwargs):
+    # Events version first (see core.rollups)
+    versions.mark(versions.EVENTS, user_id=instance.user_id)
+    rollups.mark_days(instance.user_id, rollups.days_of_event(instance.start_time, instance.end_time, instance.rrule, instance.series_end))
+
+
+@receiver(post_save, sender=Preferences)
+@receiver(post_delete, sender=Preferences)
+def _preferences_changed(sender, instance, **kwargs):
+    versions.mark(versions.PREFS, user_id=instance.user_id)
+    prefs.invalidate(instance.user_id)
+    # Drop anything re-read before the commit made the change visible
+    transaction.on_commit(lambda: prefs.invalidate(instance.user_id))
+
+
+@receiver(post_migrate)
+def _ensure_search_index(sender, using, **kwargs):
+    # Triggers do not survive SQLite table rebuilds by later migrations
+    if sender.name == 'core':
+        search.ensure_index(connections[using])
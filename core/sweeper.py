@@ -0,0 +1,79 @@
+"""Background sweep of tasks whose deadline has passed.
+
+Requests no longer delete expired tasks; they filter them out with
+``live_tasks``. The sweep first flags them (one UPDATE) and then deletes
+flagged tasks in chunks, so a large backlog never becomes one long
+DELETE. ``run_schedule_worker`` calls ``maybe_sweep`` on every loop (it
+is throttled per process) and ``manage.py sweep_expired_tasks`` runs it
+from cron.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import versions
+from .models import Task
+
+log = logging.getLogger(__name__)
+
+_last_sweep = {'at': None}
+_sweep_lock = threading.Lock()
+
+
+def live_tasks(user_id):
+    """The user's tasks that are neither flagged expired nor past their deadline."""
+    return Task.objects.filter(user_id=user_id, expired=False).exclude(deadline__lte=timezone.now())
+
+
+def mark_expired_tasks() -> int:
+    """Flag every task whose deadline has passed; returns how many were flagged."""
+    due = Task.objects.filter(expired=False, deadline__lte=timezone.now())
+    with transaction.atomic():
+        user_ids = set(due.values_list('user_id', flat=True).distinct())
+        flagged = due.update(expired=True)
+        # Bulk write (see core.rollups)
+        for user_id in user_ids:
+            versions.mark(versions.TASKS, user_id=user_id)
+    return flagged
+
+
+def purge_expired_tasks(batch_size: int = None, max_batches: int = None) -> int:
+    """Delete flagged tasks ``batch_size`` at a time; returns how many were deleted."""
+    batch_size = max(1, int(batch_size or getattr(settings, 'TASK_SWEEP_BATCH_SIZE', 500)))
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(Task.objects.filter(expired=True).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        Task.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        batches += 1
+    return deleted
+
+
+def sweep_expired_tasks(batch_size: int = None, max_batches: int = None):
+    """Flag then purge expired tasks; returns ``(flagged, deleted)``."""
+    flagged = mark_expired_tasks()
+    deleted = purge_expired_tasks(batch_size, max_batches)
+    return flagged, deleted
+
+
+def maybe_sweep(force: bool = False):
+    """Sweep unless this process already did within TASK_SWEEP_INTERVAL_SECONDS."""
+    interval = float(getattr(settings, 'TASK_SWEEP_INTERVAL_SECONDS', 300))
+    now = time.monotonic()
+    with _sweep_lock:
+        if not force and _last_sweep['at'] is not None and now - _last_sweep['at'] < interval:
+            return None
+        _last_sweep['at'] = now
+    try:
+        # A bounded number of chunks per loop keeps the worker responsive
+        return sweep_expired_tasks(max_batches=10)
+    except Exception:
+        log.exception("Expired-task sweep failed")
+        return None
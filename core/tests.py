@@ -1,3 +1,665 @@
-from django.test import TestCase
+import random
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import analytics, events, ics, jobs, llm, plan_cache, prefs, recurrence, search, versions
+from .models import CalendarEvent, DayRollup, PlanCacheEntry, Preferences, Schedule, ScheduleItem, ScheduleJob, Task
+from .planner import plan_day
+from .views import _decode_cursor, _task_date_span, _task_page
+
+
+def _at(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class PlanCacheTests(TestCase):
+    key = plan_cache.plan_cache_key(['- Write report (60 min)'], 'Balanced', '09:00', '18:00')
+
+    def setUp(self):
+        plan_cache.clear_memory()
+        self.addCleanup(plan_cache.clear_memory)
+
+    def _delta(self, before):
+        after = plan_cache.cache_stats()
+        return {name: after[name] - before[name] for name in ('memory_hits', 'db_hits', 'misses')}
+
+    def test_miss_then_memory_then_db_hit(self):
+        before = plan_cache.cache_stats()
+        self.assertIsNone(plan_cache.get_plan(self.key))
+        plan_cache.put_plan(self.key, 'plan')
+        self.assertEqual(plan_cache.get_plan(self.key), 'plan')
+        # Another worker: empty LRU, shared table
+        plan_cache.clear_memory()
+        self.assertEqual(plan_cache.get_plan(self.key), 'plan')
+        # ... which refilled the LRU
+        self.assertEqual(plan_cache.get_plan(self.key), 'plan')
+        self.assertEqual(self._delta(before), {'memory_hits': 2, 'db_hits': 1, 'misses': 1})
+        self.assertEqual(PlanCacheEntry.objects.get(key=self.key).hits, 1)
+
+    def test_expired_db_entry_is_a_miss(self):
+        plan_cache.put_plan(self.key, 'plan')
+        plan_cache.clear_memory()
+        PlanCacheEntry.objects.update(stored_at=timezone.now() - timedelta(days=1))
+        with self.settings(PLAN_CACHE_TTL_SECONDS=3600):
+            self.assertIsNone(plan_cache.get_plan(self.key))
+
+    def test_lru_keeps_the_recently_used_entries(self):
+        keys = [plan_cache.plan_cache_key([f'- task {i}'], 'Balanced', '09:00', '18:00') for i in range(3)]
+        with self.settings(PLAN_CACHE_MEMORY_MAX_ENTRIES=2):
+            plan_cache.put_plan(keys[0], 'p0')
+            plan_cache.put_plan(keys[1], 'p1')
+            plan_cache.get_plan(keys[0])
+            plan_cache.put_plan(keys[2], 'p2')
+        self.assertEqual(plan_cache.cache_stats()['memory_entries'], 2)
+        before = plan_cache.cache_stats()
+        for key in keys:
+            plan_cache.get_plan(key)
+        # keys[1] was least recently used: dropped from the LRU, still in the table
+        self.assertEqual(self._delta(before), {'memory_hits': 2, 'db_hits': 1, 'misses': 0})
+
+
+class TaskInvalidationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        self.client.login(username='a', password='pw')
+        self.today = timezone.localdate()
+
+    def _schedule(self, offset):
+        return Schedule.objects.create(user=self.user, day_date=self.today + timedelta(days=offset))
+
+    def test_toggle_marks_only_the_task_span_stale(self):
+        task = Task.objects.create(
+            user=self.user, title='Essay', begin_date=self.today + timedelta(days=1),
+            deadline=_at(self.today + timedelta(days=2), 12),
+        )
+        before, inside, after = self._schedule(0), self._schedule(1), self._schedule(3)
+        other = Schedule.objects.create(user=User.objects.create_user('b', 'b@example.com', 'pw'), day_date=self.today + timedelta(days=1))
+        self.client.get(reverse('tasks:toggle', args=[task.id]))
+        stale = set(Schedule.objects.filter(stale=True).values_list('id', flat=True))
+        self.assertEqual(stale, {inside.id})
+        self.assertNotIn(before.id, stale)
+        self.assertNotIn(after.id, stale)
+        self.assertNotIn(other.id, stale)
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_deadline_span_uses_the_local_date(self):
+        # 21:00 in New York is already the next day in UTC, the zone deadlines are loaded in
+        deadline = _at(date(2026, 10, 20), 21).astimezone(ZoneInfo('UTC'))
+        span = _task_date_span({'begin_date': None, 'deadline': deadline}, date(2026, 10, 19))
+        self.assertEqual(span, (date(2026, 10, 19), date(2026, 10, 20)))
+
+    def test_task_version_bumps_on_commit(self):
+        before = versions.current(versions.TASKS, user_id=self.user.id)[versions.TASKS]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Task.objects.create(user=self.user, title='Essay')
+            self.assertEqual(versions.current(versions.TASKS, user_id=self.user.id)[versions.TASKS], before)
+        self.assertTrue(callbacks)
+        self.assertEqual(versions.current(versions.TASKS, user_id=self.user.id)[versions.TASKS], before + 1)
+
+
+@override_settings(OPENAI_API_KEY='')
+class ScheduleJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        self.today = timezone.localdate()
+
+    def test_enqueue_reuses_open_jobs(self):
+        job = jobs.enqueue_day_schedule(self.user.id, self.today)
+        self.assertEqual(jobs.enqueue_day_schedule(self.user.id, self.today), job)
+        tomorrow = self.today + timedelta(days=1)
+        queued = jobs.enqueue_day_schedules(self.user.id, [self.today, tomorrow, tomorrow])
+        self.assertEqual(queued[self.today], job)
+        self.assertEqual(ScheduleJob.objects.count(), 2)
+        # A finished job no longer covers the date
+        ScheduleJob.objects.filter(id=job.id).update(status=ScheduleJob.STATUS_DONE)
+        self.assertNotEqual(jobs.enqueue_day_schedule(self.user.id, self.today), job)
+
+    def test_claim_takes_each_pending_job_once(self):
+        first = jobs.enqueue_day_schedule(self.user.id, self.today)
+        second = jobs.enqueue_day_schedule(self.user.id, self.today + timedelta(days=1))
+        claimed = jobs.claim_next_job()
+        self.assertEqual(claimed, first)
+        self.assertEqual(claimed.status, ScheduleJob.STATUS_RUNNING)
+        self.assertIsNotNone(claimed.started_at)
+        self.assertEqual(jobs.claim_next_job(), second)
+        self.assertIsNone(jobs.claim_next_job())
+
+    def test_worker_generates_the_queued_days(self):
+        Task.objects.create(user=self.user, title='Essay', daily_time_minutes=60)
+        days = [self.today, self.today + timedelta(days=1)]
+        queued = jobs.enqueue_day_schedules(self.user.id, days)
+        jobs.work(once=True)
+        for day in days:
+            job = ScheduleJob.objects.get(id=queued[day].id)
+            self.assertEqual(job.status, ScheduleJob.STATUS_DONE)
+            self.assertEqual(job.schedule.day_date, day)
+            self.assertEqual([it.title for it in job.schedule.items.all()], ['Essay'])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('core.llm.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = llm._CircuitBreaker(threshold=3, cooldown=60)
+
+    def test_opens_after_threshold_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), 'closed')
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), 'open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 61
+        self.assertEqual(self.breaker.state(), 'half-open')
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        # A failed trial opens it for another cooldown
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state(), 'open')
+        self.now += 61
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state(), 'closed')
+        self.assertTrue(self.breaker.allow())
+
+    def test_guarded_counts_only_outages(self):
+        class Unavailable(Exception):
+            status_code = 503
+
+        class BadRequest(Exception):
+            status_code = 400
+
+        def fail(exc):
+            def call():
+                raise exc
+            return call
+
+        with mock.patch.object(llm, '_breaker', self.breaker), self.settings(OPENAI_MAX_RETRIES=0):
+            for _ in range(5):
+                with self.assertRaises(BadRequest):
+                    llm._guarded(fail(BadRequest()))
+            self.assertEqual(llm.breaker_state(), 'closed')
+            for _ in range(3):
+                with self.assertRaises(Unavailable):
+                    llm._guarded(fail(Unavailable()))
+            self.assertEqual(llm.breaker_state(), 'open')
+            with self.assertRaises(llm.ProviderUnavailable):
+                llm._guarded(lambda: 'reply')
+
+
+class PlannerTests(SimpleTestCase):
+    day = date(2026, 10, 19)
+
+    def _tasks(self, rng, count):
+        return [
+            SimpleNamespace(
+                title=f't{i}', daily_time_minutes=rng.choice([15, 20, 30, 45, 60, 75]), duration_minutes=30,
+                priority=rng.choice(['Low', 'Medium', 'High']), energy_level='Normal', deadline=None,
+                time_of_day_pref=rng.choice(['Any', 'Any', 'Morning', 'Afternoon', 'Noon']),
+            )
+            for i in range(count)
+        ]
+
+    def test_random_days_respect_window_busy_and_cadence(self):
+        rng = random.Random(7)
+        for _ in range(150):
+            cadence = rng.choice([60, 90])
+            busy = []
+            for _ in range(rng.randint(0, 3)):
+                st = _at(self.day, rng.randint(9, 16), rng.choice([0, 15, 30]))
+                busy.append((st, st + timedelta(minutes=rng.choice([30, 60]))))
+            items = plan_day(self._tasks(rng, rng.randint(3, 12)), self.day, time(9), time(18), busy=busy, break_cadence=cadence)
+            run_start = prev_end = None
+            for it in items:
+                self.assertGreaterEqual(it['start'], _at(self.day, 9))
+                self.assertLessEqual(it['end'], _at(self.day, 18))
+                for bs, be in busy:
+                    self.assertFalse(it['start'] < be and bs < it['end'], 'item overlaps a busy block')
+                if prev_end is not None:
+                    self.assertGreaterEqual(it['start'], prev_end)
+                if prev_end is None or it['start'] != prev_end:
+                    run_start = it['start']
+                elif (it['end'] - run_start) > timedelta(minutes=cadence):
+                    self.fail(f'back-to-back run longer than {cadence} minutes')
+                prev_end = it['end']
+
+    def test_deadline_today_ends_before_deadline(self):
+        task = SimpleNamespace(
+            title='due', daily_time_minutes=60, duration_minutes=60, priority='High', energy_level='Normal',
+            deadline=_at(self.day, 11), time_of_day_pref='Any',
+        )
+        items = plan_day([task], self.day, time(9), time(18), busy=[(_at(self.day, 9), _at(self.day, 9, 30))])
+        self.assertEqual(len(items), 1)
+        self.assertGreaterEqual(items[0]['start'], _at(self.day, 9, 30))
+        self.assertLessEqual(items[0]['end'], _at(self.day, 11))
+
+
+class SchedulerParamTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('a', 'a@example.com', 'pw')
+        self.client.login(username='a', password='pw')
+
+    def _status(self, name, **params):
+        return self.client.get(reverse(name), params).status_code
+
+    def test_month_parameters(self):
+        resp = self.client.get(reverse('tasks:scheduler-month'), {'year': '2026', 'month': '2'})
+        self.assertEqual(
+            (resp.json()['year'], resp.json()['month'], resp.json()['from'], resp.json()['to']),
+            (2026, 2, '2026-02-01', '2026-02-28'),
+        )
+        for params in ({'month': '13'}, {'month': '0'}, {'year': 'abc'}):
+            self.assertEqual(self._status('tasks:scheduler-month', **params), 400, params)
+
+    def test_month_from_to_parameters(self):
+        resp = self.client.get(reverse('tasks:scheduler-month'), {'from': '2026-01', 'to': '2026-03'})
+        self.assertEqual((resp.json()['from'], resp.json()['to']), ('2026-01-01', '2026-03-31'))
+        for params in ({'from': '2026-13'}, {'from': '2026-03', 'to': '2026-01'}, {'from': '2025-01', 'to': '2026-03'}):
+            self.assertEqual(self._status('tasks:scheduler-month', **params), 400, params)
+
+    def test_range_parameters(self):
+        resp = self.client.get(reverse('tasks:scheduler-range'), {'from': '2026-10-01', 'to': '2026-11-11'})
+        self.assertEqual(len(resp.json()['days']), 42)
+        for params in ({'from': '2026-10-32'}, {'from': '2026-10-05', 'to': '2026-10-01'}, {'from': '2026-10-01', 'to': '2026-11-12'}):
+            self.assertEqual(self._status('tasks:scheduler-range', **params), 400, params)
+
+    def test_generate_parameters(self):
+        url = reverse('tasks:scheduler-generate')
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(url, '{"from": "2026-10-01"}', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, 'not json', content_type='application/json').status_code, 400)
+        today = timezone.localdate()
+        body = {'from': today.isoformat(), 'to': (today + timedelta(days=42)).isoformat()}
+        self.assertEqual(self.client.post(url, body, content_type='application/json').status_code, 400)
+        # Nothing to plan
+        body['to'] = today.isoformat()
+        self.assertEqual(self.client.post(url, body, content_type='application/json').json(), {'status': 'ready', 'dates': []})
+
+
+class DayRollupTests(TestCase):
+    day = date(2026, 10, 19)
+
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+
+    def _rollup(self):
+        row = DayRollup.objects.filter(user=self.user, day=self.day).first()
+        return (row.scheduled_minutes, row.item_count, row.event_minutes) if row else None
+
+    def test_item_changes_refresh_the_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = Schedule.objects.create(user=self.user, day_date=self.day)
+            item = ScheduleItem.objects.create(user=self.user, schedule=schedule, title='Essay', start_time=_at(self.day, 9), end_time=_at(self.day, 10))
+        self.assertEqual(self._rollup(), (60, 1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            item.end_time = _at(self.day, 10, 30)
+            item.save()
+        self.assertEqual(self._rollup(), (90, 1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(self._rollup(), (0, 0, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.delete()
+        self.assertIsNone(self._rollup())
+
+    def test_event_changes_refresh_the_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            event = CalendarEvent.objects.create(user=self.user, title='Standup', start_time=_at(self.day, 9), end_time=_at(self.day, 9, 30))
+            # Overlapping busy time counts once
+            CalendarEvent.objects.create(user=self.user, title='Sync', start_time=_at(self.day, 9, 15), end_time=_at(self.day, 10))
+        self.assertEqual(self._rollup(), (0, 0, 60))
+        with self.captureOnCommitCallbacks(execute=True):
+            event.start_time, event.end_time = _at(self.day + timedelta(days=1), 9), _at(self.day + timedelta(days=1), 9, 30)
+            event.save()
+        self.assertEqual(self._rollup(), (0, 0, 45))
+
+    def test_rollups_wait_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            schedule = Schedule.objects.create(user=self.user, day_date=self.day)
+            ScheduleItem.objects.create(user=self.user, schedule=schedule, title='Essay', start_time=_at(self.day, 9), end_time=_at(self.day, 10))
+        self.assertIsNone(self._rollup())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._rollup(), (60, 1, 0))
+
+
+class AnalyticsSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        analytics._memo.clear()
+        self.addCleanup(analytics._memo.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=self.user, title='Essay')
+
+    def test_snapshot_is_reused_until_the_data_changes(self):
+        self.assertEqual(analytics.snapshot(self.user.id)['total_tasks'], 1)
+        # Version check only
+        with self.assertNumQueries(1):
+            self.assertEqual(analytics.snapshot(self.user.id)['total_tasks'], 1)
+        # Another process: version check plus the stored snapshot
+        analytics._memo.clear()
+        with self.assertNumQueries(2):
+            self.assertEqual(analytics.snapshot(self.user.id)['total_tasks'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=self.user, title='Report', completed=True)
+        data = analytics.snapshot(self.user.id)
+        self.assertEqual((data['total_tasks'], data['completed_tasks']), (2, 1))
+
+    def test_snapshots_are_per_user(self):
+        other = User.objects.create_user('b', 'b@example.com', 'pw')
+        self.assertEqual(analytics.snapshot(self.user.id)['total_tasks'], 1)
+        self.assertEqual(analytics.snapshot(other.id)['total_tasks'], 0)
+
+
+class ScheduleOrderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        self.client.login(username='a', password='pw')
+        day = timezone.localdate()
+        self.schedule = Schedule.objects.create(user=self.user, day_date=day, day_start=time(9), day_end=time(18))
+        self.items = [
+            ScheduleItem.objects.create(
+                user=self.user, schedule=self.schedule, title=f'item {i}', position=i,
+                start_time=_at(day, 9 + i), end_time=_at(day, 10 + i),
+            )
+            for i in range(2)
+        ]
+        self.url = reverse('tasks:schedule-order', args=[self.schedule.id])
+
+    def _reorder(self, version):
+        return self.client.post(self.url, {'item_ids[]': [self.items[1].id, self.items[0].id], 'version': version})
+
+    def test_stale_version_conflicts(self):
+        resp = self._reorder(1)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['version'], 2)
+        self.assertEqual([it['title'] for it in resp.json()['items']], ['item 1', 'item 0'])
+        resp = self._reorder(1)
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()['version'], 2)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.version, 2)
+
+
+class PrefsCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        prefs.invalidate()
+        self.addCleanup(prefs.invalidate)
+
+    def _save(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            obj, _ = Preferences.objects.update_or_create(user=self.user, defaults=fields)
+        return obj
+
+    def test_parsed_once_and_reloaded_after_a_save(self):
+        self._save(focus_window_start='08:00', focus_window_end='16:00', working_days='Mon,Wed')
+        p = prefs.get_prefs(self.user.id)
+        self.assertEqual((p.day_start, p.day_end, p.working_days), (time(8), time(16), frozenset({0, 2})))
+        with self.assertNumQueries(0):
+            self.assertIs(prefs.get_prefs(self.user.id), p)
+        self._save(focus_window_start='10:00')
+        self.assertEqual(prefs.get_prefs(self.user.id).day_start, time(10))
+
+    def test_other_processes_notice_the_version(self):
+        self._save(focus_window_start='08:00')
+        prefs.get_prefs(self.user.id)
+        # A save in another process: no signal here, only the bumped version
+        Preferences.objects.filter(user=self.user).update(focus_window_start='07:00')
+        with self.captureOnCommitCallbacks(execute=True):
+            versions.mark(versions.PREFS, user_id=self.user.id)
+        self.assertEqual(prefs.get_prefs(self.user.id).day_start, time(8))
+        with self.settings(PREFS_VERSION_CHECK_SECONDS=0):
+            self.assertEqual(prefs.get_prefs(self.user.id).day_start, time(7))
+
+    def test_reversed_window_falls_back_to_defaults(self):
+        self._save(focus_window_start='18:00', focus_window_end='09:00')
+        p = prefs.get_prefs(self.user.id)
+        self.assertEqual((p.day_start, p.day_end), (prefs.DEFAULT_START, prefs.DEFAULT_END))
+
+
+class IcsImportTests(TestCase):
+    FEED = (
+        b'BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:one@example.com\r\nSUMMARY:Standup\r\n'
+        b'DTSTART:20261019T090000Z\r\nDTEND:20261019T091500Z\r\nEND:VEVENT\r\n'
+        b'BEGIN:VEVENT\r\nUID:two@example.com\r\nSUMMARY:Review\r\n'
+        b'DTSTART:20261020T140000Z\r\nDTEND:20261020T150000Z\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n'
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+
+    def _import(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ics.import_events(ics.iter_events([self.FEED]), self.user.id)
+
+    def test_reimport_is_a_no_op(self):
+        self.assertEqual(self._import(), {'created': 2, 'updated': 0, 'unchanged': 0})
+        before = versions.current(versions.EVENTS, user_id=self.user.id)
+        self.assertEqual(self._import(), {'created': 0, 'updated': 0, 'unchanged': 2})
+        self.assertEqual(versions.current(versions.EVENTS, user_id=self.user.id), before)
+        self.assertEqual(CalendarEvent.objects.filter(user=self.user).count(), 2)
+
+
+class RecurrenceTests(TestCase):
+    FEED = (
+        b'BEGIN:VCALENDAR\r\n'
+        b'BEGIN:VEVENT\r\nUID:standup@example.com\r\nSUMMARY:Standup\r\n'
+        b'DTSTART:20261005T090000Z\r\nDTEND:20261005T093000Z\r\n'
+        b'RRULE:FREQ=WEEKLY;COUNT=4\r\nEXDATE:20261012T090000Z\r\nEND:VEVENT\r\n'
+        b'BEGIN:VEVENT\r\nUID:standup@example.com\r\nRECURRENCE-ID:20261019T090000Z\r\nSUMMARY:Standup (moved)\r\n'
+        b'DTSTART:20261019T140000Z\r\nDTEND:20261019T143000Z\r\nEND:VEVENT\r\n'
+        b'END:VCALENDAR\r\n'
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        # Caches are keyed by user id and events version, both of which repeat across tests
+        recurrence._masters.clear()
+        recurrence._windows.clear()
+        events._span.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            ics.import_events(ics.iter_events([self.FEED]), self.user.id)
+
+    def _utc(self, *args):
+        return datetime(*args, tzinfo=ZoneInfo('UTC'))
+
+    def test_exdate_and_recurrence_id(self):
+        rows = events.events_between(self.user.id, self._utc(2026, 10, 1), self._utc(2026, 11, 1))
+        self.assertEqual([(st, title) for st, _, title in rows], [
+            (self._utc(2026, 10, 5, 9), 'Standup'),
+            (self._utc(2026, 10, 19, 14), 'Standup (moved)'),
+            (self._utc(2026, 10, 26, 9), 'Standup'),
+        ])
+        # The master is stored once
+        self.assertEqual(CalendarEvent.objects.filter(user=self.user).exclude(rrule='').count(), 1)
+
+    def test_monthly_last_weekday_until(self):
+        rule = recurrence.parse_rrule('FREQ=MONTHLY;BYDAY=-1FR;UNTIL=20270131T235959Z')
+        start = self._utc(2026, 10, 30, 16)
+        self.assertEqual(
+            [st.date() for st, _ in recurrence.expand(start, timedelta(hours=1), rule)],
+            [date(2026, 10, 30), date(2026, 11, 27), date(2026, 12, 25), date(2027, 1, 29)],
+        )
+
+    def test_first_events_include_past_and_recurring(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CalendarEvent.objects.create(user=self.user, title='Old', start_time=self._utc(2020, 1, 1, 9), end_time=self._utc(2020, 1, 1, 10))
+        rows = events.first_events(self.user.id, 3)
+        self.assertEqual([title for _, _, title in rows], ['Old', 'Standup', 'Standup (moved)'])
+
+
+class ScheduleFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        Preferences.objects.create(user=self.user, feed_token='secret-token')
+        day = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = Schedule.objects.create(user=self.user, day_date=day)
+            ScheduleItem.objects.create(user=self.user, schedule=schedule, title='Essay', start_time=_at(day, 9), end_time=_at(day, 10))
+        self.url = reverse('tasks:schedule-feed')
+
+    def _get(self, **headers):
+        return self.client.get(self.url, {'token': 'secret-token'}, **headers)
+
+    def test_feed_lists_the_items(self):
+        resp = self._get()
+        self.assertEqual(resp.status_code, 200)
+        body = b''.join(resp.streaming_content).decode()
+        self.assertIn('SUMMARY:Essay', body)
+        self.assertIn(f'-u{self.user.id}@todou-ai', body)
+        self.assertEqual(resp['Cache-Control'], 'private, no-cache')
+
+    def test_not_modified_on_etag_and_last_modified(self):
+        resp = self._get()
+        with self.assertNumQueries(2):
+            self.assertEqual(self._get(HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']).status_code, 304)
+        # Another user's validator never matches
+        other = User.objects.create_user('b', 'b@example.com', 'pw')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 200)
+
+    def test_change_invalidates(self):
+        etag = self._get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            ScheduleItem.objects.update(title='Report')
+            versions.mark(versions.SCHEDULES, user_id=self.user.id)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unknown_token_is_404(self):
+        self.assertEqual(self.client.get(self.url, {'token': 'nope'}).status_code, 404)
+        # No token and no session: log in first
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class UserScopeTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('a', 'a@example.com', 'pw')
+        self.today = timezone.localdate()
+        self.task = Task.objects.create(user=self.owner, title='Private task')
+        self.schedule = Schedule.objects.create(user=self.owner, day_date=self.today)
+        self.item = ScheduleItem.objects.create(
+            user=self.owner, schedule=self.schedule, title='Private item', start_time=_at(self.today, 9), end_time=_at(self.today, 10),
+        )
+        CalendarEvent.objects.create(user=self.owner, title='Private event', start_time=_at(self.today, 12), end_time=_at(self.today, 13))
+        User.objects.create_user('b', 'b@example.com', 'pw')
+        self.client.login(username='b', password='pw')
+
+    def test_lists_and_day_views_are_scoped(self):
+        self.assertNotContains(self.client.get(reverse('tasks:list')), 'Private task')
+        self.assertEqual(self.client.get(reverse('tasks:list-page')).json()['html'].count('Private task'), 0)
+        day = self.client.get(reverse('tasks:scheduler-day'), {'date': self.today.isoformat()}).json()
+        self.assertEqual((day['items'], day['events'], day['schedule_id']), ([], [], None))
+        days = self.client.get(reverse('tasks:scheduler-range'), {'from': self.today.isoformat(), 'to': self.today.isoformat()}).json()['days']
+        self.assertEqual((days[0]['items'], days[0]['events']), ([], []))
+        self.assertEqual(self.client.get(reverse('tasks:search'), {'q': 'private'}).json()['results'], [])
+
+    def test_other_users_rows_are_not_found(self):
+        for name in ('tasks:edit', 'tasks:delete', 'tasks:toggle'):
+            self.assertEqual(self.client.post(reverse(name, args=[self.task.id])).status_code, 404, name)
+        resp = self.client.post(reverse('tasks:schedule-order', args=[self.schedule.id]), {'item_ids[]': [self.item.id]})
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(self.client.get(reverse('tasks:schedule-export', args=[self.schedule.id])).status_code, 404)
+        self.task.refresh_from_db()
+        self.assertFalse(self.task.completed)
+
+
+@override_settings(OPENAI_API_KEY='', SCHEDULE_ASYNC=False)
+class DayEtagTests(TransactionTestCase):
+    # Real commits: the view reads rollups refreshed on commit, as in autocommit production
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        self.client.login(username='a', password='pw')
+        self.today = timezone.localdate()
+        self.url = reverse('tasks:scheduler-day')
+        Task.objects.create(user=self.user, title='Essay', daily_time_minutes=60)
+
+    def _get(self, **headers):
+        return self.client.get(self.url, {'date': self.today.isoformat()}, **headers)
+
+    def test_first_revalidation_after_inline_generation(self):
+        resp = self._get()
+        self.assertEqual(resp.json()['status'], 'ready')
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+
+    def test_item_change_invalidates(self):
+        etag = self._get()['ETag']
+        item = ScheduleItem.objects.get(schedule__day_date=self.today)
+        item.title = 'Report'
+        item.save()
+        resp = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['items'][0]['title'], 'Report')
+
+    def test_pending_response_has_no_etag(self):
+        with self.settings(SCHEDULE_ASYNC=True):
+            resp = self._get()
+        self.assertEqual(resp.json()['status'], 'pending')
+        self.assertFalse(resp.has_header('ETag'))
+
+
+class TaskCursorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+        for i in range(7):
+            Task.objects.create(user=self.user, title=f'task {i}')
+        # Every task shares one created_at, so only the id orders them
+        Task.objects.update(created_at=_at(date(2026, 10, 1), 12))
+
+    def test_pages_cover_ties_once_in_order(self):
+        seen, cursor = [], None
+        while True:
+            tasks, cursor = _task_page(self.user.id, {}, cursor, size=3)
+            seen += [t.id for t in tasks]
+            if cursor is None:
+                break
+        ids = list(Task.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(seen, ids)
+
+    def test_next_pages_keep_the_applied_filters(self):
+        Task.objects.filter(title='task 0').update(priority='High')
+        self.client.login(username='a', password='pw')
+        resp = self.client.get(reverse('tasks:list'), {'priority': 'High', 'completed': '0'})
+        self.assertContains(resp, 'data-filters="priority=High&amp;completed=0"')
+
+    def test_malformed_cursor(self):
+        with self.assertRaises(ValueError):
+            _decode_cursor('not-a-cursor')
+
+
+class SearchSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a', 'a@example.com', 'pw')
+
+    def _task_titles(self, text):
+        return [hit['title'] for hit in search.search(self.user.id, text) if hit['type'] == 'task']
+
+    def test_index_follows_update_and_delete(self):
+        task = Task.objects.create(user=self.user, title='Quarterly report')
+        self.assertEqual(self._task_titles('quarterly'), ['Quarterly report'])
+        task.title = 'Annual summary'
+        task.save()
+        self.assertEqual(self._task_titles('quarterly'), [])
+        self.assertEqual(self._task_titles('annual'), ['Annual summary'])
+        task.delete()
+        self.assertEqual(self._task_titles('annual'), [])
+
+    def test_other_users_rows_are_not_returned(self):
+        other = User.objects.create_user('b', 'b@example.com', 'pw')
+        Task.objects.create(user=other, title='Quarterly report')
+        self.assertEqual(self._task_titles('quarterly'), [])
@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from .views import HomeView, TaskListView, create_task, scheduler, scheduler_day, scheduler_month_summary, update_schedule_order, edit_task, delete_task, toggle_complete, preferences_view, calendar_view, calendar_chat, import_ics, export_schedule_ics, analytics_view, register
+from .views import HomeView, TaskListView, task_list_page, create_task, scheduler, scheduler_day, scheduler_month_summary, scheduler_range, scheduler_generate_range, update_schedule_order, edit_task, delete_task, toggle_complete, preferences_view, calendar_view, calendar_chat, import_ics, export_schedule_ics, schedule_feed, search_view, analytics_view, register
 
 app_name = 'tasks'
 
@@ -12,6 +12,7 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(next_page='tasks:home'), name='logout'),
     path('register/', register, name='register'),
     path('tasks/', TaskListView.as_view(), name='list'),
+    path('tasks/page/', task_list_page, name='list-page'),
     path('tasks/create/', create_task, name='create'),
     path('tasks/<int:task_id>/edit/', edit_task, name='edit'),
     path('tasks/<int:task_id>/delete/', delete_task, name='delete'),
@@ -19,11 +20,15 @@ urlpatterns = [
     path('scheduler/', scheduler, name='scheduler'),
     path('scheduler/day/', scheduler_day, name='scheduler-day'),
     path('scheduler/month/', scheduler_month_summary, name='scheduler-month'),
+    path('scheduler/range/', scheduler_range, name='scheduler-range'),
+    path('scheduler/generate/', scheduler_generate_range, name='scheduler-generate'),
     path('scheduler/<int:schedule_id>/order/', update_schedule_order, name='schedule-order'),
     path('calendar/', calendar_view, name='calendar'),
     path('calendar/chat/', calendar_chat, name='calendar-chat'),
     path('calendar/import/', import_ics, name='calendar-import'),
+    path('search/', search_view, name='search'),
     path('analytics/', analytics_view, name='analytics'),
     path('schedule/<int:schedule_id>/export.ics', export_schedule_ics, name='schedule-export'),
+    path('schedule/feed.ics', schedule_feed, name='schedule-feed'),
     path('settings/', preferences_view, name='settings'),
 ]
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""Data-version counters for invalidating derived snapshots.
+
+Each named data set ('tasks', 'schedules', 'events', 'prefs') has a counter
+per user in DataVersion (stored as '<name>:<user id>') that is bumped once
+per committed transaction that wrote to it. Signal handlers in core.signals
+call ``mark``; bulk writes call it themselves. A snapshot stored with the
+versions it was computed from is valid while they still match.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+TASKS = 'tasks'
+SCHEDULES = 'schedules'
+EVENTS = 'events'
+PREFS = 'prefs'
+
+_state = threading.local()
+
+
+def _pending() -> set:
+    if not hasattr(_state, 'names'):
+        _state.names = set()
+    return _state.names
+
+
+def _key(name, user_id):
+    return name if user_id is None else f'{name}:{user_id}'
+
+
+def mark(*names, user_id=None):
+    """Bump ``names`` (of ``user_id``) when the current transaction commits."""
+    _pending().update(_key(name, user_id) for name in names)
+    transaction.on_commit(flush)
+
+
+def flush():
+    names = sorted(_pending())
+    _pending().clear()
+    for name in names:
+        now = timezone.now()
+        if not DataVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now):
+            obj, created = DataVersion.objects.get_or_create(name=name, defaults={'version': 1, 'updated_at': now})
+            if not created:
+                DataVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+
+
+def current(*names, user_id=None) -> dict:
+    """Current counters for ``names`` of ``user_id`` in one query (0 for never-written sets)."""
+    return state(*names, user_id=user_id)[0]
+
+
+def state(*names, user_id=None):
+    """``(counters, last_bumped)`` for ``names`` in one query; ``last_bumped`` is None if never written."""
+    keys = {_key(name, user_id): name for name in names}
+    rows = {keys[key]: (version, updated) for key, version, updated in
+            DataVersion.objects.filter(name__in=list(keys)).values_list('name', 'version', 'updated_at')}
+    counters = {name: rows.get(name, (0, None))[0] for name in names}
+    stamps = [updated for _, updated in rows.values() if updated]
+    return counters, (max(stamps) if stamps else None)
@@ -1,42 +1,142 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
+from django.conf import settings
+from django.template.loader import render_to_string
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login as auth_login
 from django.views.generic import TemplateView, ListView
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
 from django.urls import reverse
 from django.http import JsonResponse
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from .models import Task, Schedule, ScheduleItem, Preferences, CalendarEvent
-from .ai import generate_schedule, generate_chat_reply
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlencode
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Task, Schedule, ScheduleItem, Preferences, DayRollup
+from .ai import generate_schedule, generate_schedule_range, generate_chat_reply, stream_chat_reply
+from .plan_cache import cache_stats as plan_cache_stats
+from .llm import breaker_state, provider_available
+from .planner import plan_day
+from .sweeper import live_tasks
+from .prefs import get_prefs, parse_window
+from .events import busy_by_date, busy_for_date, clip_to_day, day_bounds, events_between, events_by_date, first_events
+from . import ics, jobs, rollups, search, versions
+from .analytics import snapshot as analytics_snapshot
 from datetime import datetime, timedelta, date as date_cls
+import base64
 import json
 import re
+import secrets
 
 
 class HomeView(TemplateView):
     template_name = 'home.html'
 
 
+def _task_filters(params):
+    """Task list filters from query params, keeping only known priority / type / completed values."""
+    filters = {}
+    if params.get('priority') in dict(Task.PRIORITY_CHOICES):
+        filters['priority'] = params['priority']
+    if params.get('task_type') in dict(Task.TASK_TYPE_CHOICES):
+        filters['task_type'] = params['task_type']
+    if params.get('completed') in ('0', '1'):
+        filters['completed'] = params['completed'] == '1'
+    return filters
+
+
+def _encode_cursor(t) -> str:
+    raw = f"{int(t.completed)}|{t.created_at.isoformat()}|{t.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(value: str):
+    """``(completed, created_at, id)`` of the last task on the previous page; ValueError when malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode('utf-8')
+        completed, created, pk = raw.split('|')
+        created_at = parse_datetime(created)
+        if created_at is None or completed not in ('0', '1'):
+            raise ValueError(value)
+        return completed == '1', created_at, int(pk)
+    except Exception:
+        raise ValueError(f'invalid cursor: {value!r}')
+
+
+def _task_page(user_id, filters, cursor=None, size=None):
+    """One keyset page of the user's live tasks: ``(tasks, next_cursor)``.
+
+    Open tasks come first, then newest first, with id as the tie-breaker;
+    each (filtered) order is an index range scan (task_user_*list_idx), and
+    the cursor continues after the last row shown, so page N costs the same
+    as page 1.
+    """
+    size = size or int(getattr(settings, 'TASK_PAGE_SIZE', 50))
+    qs = live_tasks(user_id).filter(**filters)
+    if cursor:
+        completed, created_at, pk = _decode_cursor(cursor)
+        qs = qs.filter(
+            Q(completed__gt=completed)
+            | Q(completed=completed, created_at__lt=created_at)
+            | Q(completed=completed, created_at=created_at, id__lt=pk)
+        )
+    tasks = list(qs.order_by('completed', '-created_at', '-id')[:size + 1])
+    if len(tasks) > size:
+        return tasks[:size], _encode_cursor(tasks[size - 1])
+    return tasks, None
+
+
 class TaskListView(LoginRequiredMixin, ListView):
+    """First page of the task list; further pages load from ``task_list_page`` as the user scrolls."""
     model = Task
     template_name = 'tasks/list.html'
     context_object_name = 'tasks'
 
     def get_queryset(self):
-        cleanup_expired_tasks()
-        return Task.objects.all()
+        self.filters = _task_filters(self.request.GET)
+        try:
+            tasks, self.next_cursor = _task_page(self.request.user.id, self.filters, self.request.GET.get('cursor'))
+        except ValueError:
+            tasks, self.next_cursor = _task_page(self.request.user.id, self.filters)
+        return tasks
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx['today'] = timezone.localdate()
+        ctx['next_cursor'] = self.next_cursor
+        ctx['filters'] = {key: str(int(value)) if key == 'completed' else value for key, value in self.filters.items()}
+        # Later pages must use the filters these rows were rendered with, not the form's unsubmitted values
+        ctx['filter_query'] = urlencode(ctx['filters'])
+        ctx['priority_choices'] = [value for value, _ in Task.PRIORITY_CHOICES]
+        ctx['task_type_choices'] = [value for value, _ in Task.TASK_TYPE_CHOICES]
         return ctx
 
 
+@login_required
+def task_list_page(request):
+    """JSON endpoint for infinite scroll: the next page of task rows after ``cursor``.
+
+    Takes the same priority / task_type / completed filters as the list page
+    and returns the rendered rows plus the cursor of the following page
+    (null on the last one).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=405)
+    try:
+        tasks, next_cursor = _task_page(request.user.id, _task_filters(request.GET), request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+    html = render_to_string('tasks/_rows.html', {'tasks': tasks, 'today': timezone.localdate()}, request=request)
+    return JsonResponse({'html': html, 'count': len(tasks), 'next': next_cursor})
+
+
 @login_required
 def create_task(request):
+    user_id = request.user.id
     if request.method == 'POST':
         title = request.POST.get('title')
         priority = request.POST.get('priority') or 'Medium'
@@ -52,7 +152,8 @@ def create_task(request):
                 begin_date = datetime.strptime(begin_date_str, '%Y-%m-%d').date()
             except Exception:
                 begin_date = None
-        Task.objects.create(
+        t = Task.objects.create(
+            user=request.user,
             title=title,
             priority=priority,
             energy_level=energy,
@@ -62,23 +163,14 @@ def create_task(request):
             time_of_day_pref=time_pref,
             task_type=task_type,
         )
-        # Invalidate saved schedules from today so they regenerate on next view
-        _invalidate_schedules_from(timezone.localdate())
+        # Mark saved schedules on the dates this task can appear as stale
+        _invalidate_schedules_for_task(user_id, None, t)
         return redirect('tasks:list')
     # Planner summary for warnings
     today = timezone.localdate()
-    tasks = Task.objects.filter(completed=False).filter(Q(begin_date__isnull=True) | Q(begin_date__lte=today))
+    tasks = live_tasks(user_id).filter(completed=False).filter(Q(begin_date__isnull=True) | Q(begin_date__lte=today))
     total_used = sum(int(t.daily_time_minutes or 0) for t in tasks)
-    prefs = Preferences.objects.first()
-    def minutes_between(a, b):
-        try:
-            if not a or not b:
-                return 540
-            dt = datetime.combine(timezone.localdate(), a), datetime.combine(timezone.localdate(), b)
-            return int((dt[1] - dt[0]).total_seconds() // 60)
-        except Exception:
-            return 540
-    day_budget = minutes_between(getattr(prefs, 'focus_window_start', None), getattr(prefs, 'focus_window_end', None))
+    day_budget = get_prefs(user_id).window_minutes
     pref_totals = {}
     for p in ['Any','Morning','Noon','Afternoon','Evening','Night']:
         pref_totals[p] = sum(int(t.daily_time_minutes or 0) for t in tasks if t.time_of_day_pref == p)
@@ -102,8 +194,10 @@ def create_task(request):
 
 @login_required
 def edit_task(request, task_id):
-    t = Task.objects.get(id=task_id)
+    user_id = request.user.id
+    t = get_object_or_404(Task, id=task_id, user_id=user_id)
     if request.method == 'POST':
+        before = _task_snapshot(t)
         t.title = request.POST.get('title') or t.title
         t.priority = request.POST.get('priority') or t.priority
         t.energy_level = request.POST.get('energy') or t.energy_level
@@ -119,23 +213,14 @@ def edit_task(request, task_id):
         t.time_of_day_pref = request.POST.get('time_pref') or t.time_of_day_pref
         t.task_type = request.POST.get('task_type') or t.task_type
         t.save()
-        # Invalidate saved schedules from today
-        _invalidate_schedules_from(timezone.localdate())
+        # Invalidate saved schedules on the dates covered before and after the edit
+        _invalidate_schedules_for_task(user_id, before, t)
         return redirect('tasks:list')
     # Planner summary for warnings
     today = timezone.localdate()
-    tasks = Task.objects.filter(completed=False).filter(Q(begin_date__isnull=True) | Q(begin_date__lte=today)).exclude(id=t.id)
+    tasks = live_tasks(user_id).filter(completed=False).filter(Q(begin_date__isnull=True) | Q(begin_date__lte=today)).exclude(id=t.id)
     total_used = sum(int(x.daily_time_minutes or 0) for x in tasks)
-    prefs = Preferences.objects.first()
-    def minutes_between(a, b):
-        try:
-            if not a or not b:
-                return 540
-            dt = datetime.combine(timezone.localdate(), a), datetime.combine(timezone.localdate(), b)
-            return int((dt[1] - dt[0]).total_seconds() // 60)
-        except Exception:
-            return 540
-    day_budget = minutes_between(getattr(prefs, 'focus_window_start', None), getattr(prefs, 'focus_window_end', None))
+    day_budget = get_prefs(user_id).window_minutes
     pref_totals = {}
     for p in ['Any','Morning','Noon','Afternoon','Evening','Night']:
         pref_totals[p] = sum(int(x.daily_time_minutes or 0) for x in tasks if x.time_of_day_pref == p)
@@ -157,28 +242,30 @@ def edit_task(request, task_id):
 
 @login_required
 def delete_task(request, task_id):
-    t = Task.objects.get(id=task_id)
+    t = get_object_or_404(Task, id=task_id, user_id=request.user.id)
     if request.method == 'POST':
+        before = _task_snapshot(t)
         t.delete()
-        # Invalidate saved schedules from today after deletion
-        _invalidate_schedules_from(timezone.localdate())
+        # Invalidate saved schedules the deleted task could have appeared on
+        _invalidate_schedules_for_task(request.user.id, before, None)
         return redirect('tasks:list')
     return render(request, 'tasks/delete_confirm.html', {'task': t})
 
 
 @login_required
 def toggle_complete(request, task_id):
-    t = Task.objects.get(id=task_id)
+    t = get_object_or_404(Task, id=task_id, user_id=request.user.id)
+    before = _task_snapshot(t)
     t.completed = not t.completed
     t.save(update_fields=['completed'])
-    # Invalidate saved schedules from today after completion toggle
-    _invalidate_schedules_from(timezone.localdate())
+    # Invalidate saved schedules on the task's dates after completion toggle
+    _invalidate_schedules_for_task(request.user.id, before, t)
     return redirect('tasks:list')
 
 
 @login_required
 def preferences_view(request):
-    prefs, _ = Preferences.objects.get_or_create(id=1)
+    prefs, _ = Preferences.objects.get_or_create(user=request.user)
     if request.method == 'POST':
         fs = request.POST.get('focus_start') or None
         fe = request.POST.get('focus_end') or None
@@ -200,13 +287,17 @@ def preferences_view(request):
         prefs.break_cadence_minutes = int(request.POST.get('break_cadence') or prefs.break_cadence_minutes)
         prefs.working_days = request.POST.get('working_days') or prefs.working_days
         prefs.save()
-        return redirect('settings')
+        return redirect('tasks:settings')
     return render(request, 'settings.html', { 'prefs': prefs })
 
 
 @login_required
 def calendar_view(request):
-    events = CalendarEvent.objects.order_by('start_time')[:200]
+    # The first 200 events, past ones included, with recurring series expanded (core.recurrence)
+    events = [
+        {'title': title, 'start_time': st, 'end_time': en}
+        for st, en, title in first_events(request.user.id, 200)
+    ]
     return render(request, 'calendar.html', {'events': events})
 
 
@@ -215,8 +306,11 @@ def calendar_chat(request):
     """POST endpoint: take a user message and return an assistant reply
     with awareness of tasks and saved schedules.
 
-    Body: {"message": "..."}
-    Response: {"reply": "..."}
+    Body: {"message": "...", "stream": false}
+    Response: {"reply": "...", "plan_source": "saved|cache|generated|none", "context": {...}}
+
+    With ``"stream": true`` the reply is sent as NDJSON, one event per line:
+    token events as the model produces them, then the plan and a done event.
     """
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
@@ -228,111 +322,56 @@ def calendar_chat(request):
     if not user_msg:
         return JsonResponse({'error': 'message required'}, status=400)
     # Gather context
-    prefs = Preferences.objects.first()
-    def safe_str(s, default):
-        try:
-            t = datetime.strptime((s or default), '%H:%M').time()
-            return t.strftime('%H:%M')
-        except Exception:
-            return default
-    day_start = safe_str(getattr(prefs, 'focus_window_start', None), '09:00')
-    day_end = safe_str(getattr(prefs, 'focus_window_end', None), '18:00')
-    tasks = Task.objects.filter(completed=False).order_by('-priority', 'title')[:500]
-    schedules = Schedule.objects.order_by('-day_date', '-created_at')[:30]
-    reply = generate_chat_reply(user_msg, tasks, schedules, day_start, day_end)
-    return JsonResponse({'reply': reply})
+    user_id = request.user.id
+    prefs = get_prefs(user_id)
+    day_start, day_end = prefs.day_start_str, prefs.day_end_str
+    tasks = live_tasks(user_id).filter(completed=False).order_by('-priority', 'title')[:500]
+    schedules = Schedule.objects.filter(user_id=user_id).order_by('-day_date', '-created_at').prefetch_related('items')[:30]
+    # A fresh saved schedule for today doubles as the reply's Plan block
+    saved_today = Schedule.objects.filter(user_id=user_id, day_date=timezone.localdate(), stale=False).order_by('-created_at').first()
+    if data.get('stream'):
+        events = stream_chat_reply(user_msg, tasks, schedules, day_start, day_end, saved_schedule=saved_today)
+        resp = StreamingHttpResponse((json.dumps(ev) + "\n" for ev in events), content_type='application/x-ndjson')
+        resp['Cache-Control'] = 'no-cache'
+        # Ask reverse proxies not to buffer the stream
+        resp['X-Accel-Buffering'] = 'no'
+        return resp
+    reply, meta = generate_chat_reply(user_msg, tasks, schedules, day_start, day_end, saved_schedule=saved_today)
+    return JsonResponse({'reply': reply, 'plan_source': meta['plan_source'], 'context': meta.get('context')})
 
 
 @login_required
 def import_ics(request):
     if request.method == 'POST' and request.FILES.get('ics'):
-        f = request.FILES['ics']
-        content = f.read().decode('utf-8', errors='ignore')
-        lines = [l.strip() for l in content.splitlines()]
-        evt = {}
-        def parse_dt(val):
-            try:
-                if val.endswith('Z'):
-                    dt = datetime.strptime(val, '%Y%m%dT%H%M%SZ')
-                    return timezone.make_aware(dt, timezone.utc)
-                else:
-                    dt = datetime.strptime(val, '%Y%m%dT%H%M%S')
-                    return timezone.make_aware(dt)
-            except Exception:
-                return None
-        for l in lines:
-            if l == 'BEGIN:VEVENT':
-                evt = {}
-            elif l.startswith('SUMMARY:'):
-                evt['title'] = l.split(':', 1)[1]
-            elif l.startswith('DTSTART'):
-                val = l.split(':', 1)[1]
-                evt['start'] = parse_dt(val)
-            elif l.startswith('DTEND'):
-                val = l.split(':', 1)[1]
-                evt['end'] = parse_dt(val)
-            elif l == 'END:VEVENT':
-                if evt.get('start') and evt.get('end'):
-                    CalendarEvent.objects.create(title=evt.get('title') or 'Event', start_time=evt['start'], end_time=evt['end'], source='ICS')
+        # Parsed chunk by chunk and upserted by UID (see core.ics)
+        ics.import_events(ics.iter_events(request.FILES['ics'].chunks()), request.user.id)
         return redirect('tasks:calendar')
-    return render(request, 'calendar_import.html')
+    prefs, _ = Preferences.objects.get_or_create(user=request.user)
+    if not prefs.feed_token:
+        prefs.feed_token = secrets.token_urlsafe(24)
+        prefs.save(update_fields=['feed_token'])
+    feed_url = request.build_absolute_uri(reverse('tasks:schedule-feed')) + f'?token={prefs.feed_token}'
+    return render(request, 'calendar_import.html', {'feed_url': feed_url})
 
 
-def _seq_schedule_items(tasks, day_start: str, day_end: str, for_date: date_cls = None):
-    """Lay out tasks sequentially within timeframe, skipping calendar conflicts.
+def _seq_schedule_items(user_id, tasks, day_start: str, day_end: str, for_date: date_cls = None, mode: str = 'Balanced'):
+    """Lay out tasks locally within timeframe, skipping calendar conflicts.
 
+    Delegates to the constraint-based planner (core.planner), which honours
+    time-of-day preferences, priority, deadlines, energy and break cadence.
     If ``for_date`` is provided, schedule within that date; otherwise uses today.
     """
     target_date = for_date or timezone.localdate()
-    # Safely parse focus window; fallback to defaults on invalid inputs
-    try:
-        start_t = datetime.strptime(day_start or '09:00', '%H:%M').time()
-    except Exception:
-        start_t = datetime.strptime('09:00', '%H:%M').time()
-    try:
-        end_t = datetime.strptime(day_end or '18:00', '%H:%M').time()
-    except Exception:
-        end_t = datetime.strptime('18:00', '%H:%M').time()
-    # If reversed window, swap to sensible defaults
-    if end_t <= start_t:
-        start_t = datetime.strptime('09:00', '%H:%M').time()
-        end_t = datetime.strptime('18:00', '%H:%M').time()
-    start_dt = timezone.make_aware(datetime.combine(target_date, start_t))
-    end_dt = timezone.make_aware(datetime.combine(target_date, end_t))
-    busy = list(CalendarEvent.objects.filter(start_time__date=target_date).values_list('start_time', 'end_time'))
-    items = []
-    cursor = start_dt
-    pos = 0
-    for t in tasks:
-        # Use daily_time_minutes as the effective duration; fallback to existing duration or 30m
-        dur_minutes = int(getattr(t, 'daily_time_minutes', 0) or 0)
-        if dur_minutes <= 0:
-            dur_minutes = int(getattr(t, 'duration_minutes', 30) or 30)
-        dur = timedelta(minutes=dur_minutes)
-        # advance cursor past any busy interval
-        while True:
-            overlap = next(((bs, be) for (bs, be) in busy if not (cursor >= be or (cursor + dur) <= bs)), None)
-            if overlap:
-                cursor = overlap[1]
-            else:
-                break
-        if cursor + dur > end_dt:
-            break
-        items.append({
-            'task': t,
-            'title': t.title,
-            'start': cursor,
-            'end': cursor + dur,
-            'position': pos,
-        })
-        cursor = cursor + dur
-        pos += 1
-    return items
+    # Invalid or reversed windows fall back to 09:00-18:00
+    start_t, end_t = parse_window(day_start, day_end)
+    busy = busy_for_date(user_id, target_date)
+    return plan_day(tasks, target_date, start_t, end_t, busy=busy, mode=mode, break_cadence=get_prefs(user_id).break_cadence)
 
 
 @login_required
 def scheduler(request):
     """Calendar-based scheduler page showing saved schedule for today."""
+    user_id = request.user.id
     # Handle Apply Plan POST from calendar chat
     if request.method == 'POST':
         try:
@@ -349,54 +388,17 @@ def scheduler(request):
             return JsonResponse({'error': 'invalid date'}, status=400)
 
         # Preferences for focus window
-        prefs = Preferences.objects.first()
-        def safe_str(s, default):
-            try:
-                t = datetime.strptime((s or default), '%H:%M').time()
-                return t.strftime('%H:%M')
-            except Exception:
-                return default
-        day_start = safe_str(getattr(prefs, 'focus_window_start', None), '09:00')
-        day_end = safe_str(getattr(prefs, 'focus_window_end', None), '18:00')
-
-        # Replace any existing schedule for target date
-        Schedule.objects.filter(day_date=target_date).delete()
-
-        # Create schedule and parse AI items
-        try:
-            start_t = datetime.strptime(day_start, '%H:%M').time()
-        except Exception:
-            start_t = datetime.strptime('09:00', '%H:%M').time()
-        try:
-            end_t = datetime.strptime(day_end, '%H:%M').time()
-        except Exception:
-            end_t = datetime.strptime('18:00', '%H:%M').time()
-        if end_t <= start_t:
-            start_t = datetime.strptime('09:00', '%H:%M').time()
-            end_t = datetime.strptime('18:00', '%H:%M').time()
-
-        schedule = Schedule.objects.create(
-            mode='Balanced',
-            day_start=start_t,
-            day_end=end_t,
-            plan_text=plan_text,
-            day_date=target_date,
-        )
+        prefs = get_prefs(user_id)
+        day_start, day_end = prefs.day_start_str, prefs.day_end_str
+        start_t, end_t = prefs.day_start, prefs.day_end
 
         items = _parse_ai_schedule(plan_text, target_date, day_start, day_end)
         if items:
             # Attempt to attach tasks by title for convenience
-            tasks = Task.objects.filter(completed=False)
+            tasks = live_tasks(user_id).filter(completed=False)
             _attach_tasks_by_title(items, list(tasks))
-            for s in items:
-                ScheduleItem.objects.create(
-                    schedule=schedule,
-                    task=s.get('task'),
-                    title=s['title'],
-                    start_time=s['start'],
-                    end_time=s['end'],
-                    position=s['position'],
-                )
+        # Replace any existing schedule for target date in one transaction
+        schedule = _replace_day_schedules(user_id, {target_date: items}, 'Balanced', start_t, end_t, plan_text)[target_date]
         # Remember recent creation to show confirmation on scheduler page
         try:
             request.session['recent_schedule_date'] = target_date.strftime('%Y-%m-%d')
@@ -405,33 +407,24 @@ def scheduler(request):
             pass
         return JsonResponse({'ok': True, 'schedule_id': schedule.id, 'date': target_date.strftime('%Y-%m-%d')})
 
-    cleanup_expired_tasks()
-    prefs = Preferences.objects.first()
-    def safe_str(s, default):
-        try:
-            t = datetime.strptime((s or default), '%H:%M').time()
-            return t.strftime('%H:%M')
-        except Exception:
-            return default
-    day_start = safe_str(getattr(prefs, 'focus_window_start', None), '09:00')
-    day_end = safe_str(getattr(prefs, 'focus_window_end', None), '18:00')
+    prefs = get_prefs(user_id)
+    day_start, day_end = prefs.day_start_str, prefs.day_end_str
     today = timezone.localdate()
     # Check global tasks and tasks applicable to today
-    has_tasks_any = Task.objects.filter(completed=False).exists()
-    has_tasks_for_today = Task.objects.filter(completed=False).filter(
+    has_tasks_any = live_tasks(user_id).filter(completed=False).exists()
+    has_tasks_for_today = live_tasks(user_id).filter(completed=False).filter(
         Q(begin_date__isnull=True) | Q(begin_date__lte=today)
     ).filter(
         Q(deadline__isnull=True) | Q(deadline__date__gte=today)
     ).exists()
-    # Try to load a saved schedule for today
-    schedule = Schedule.objects.filter(day_date=today).order_by('-created_at').first()
-    if not schedule and has_tasks_for_today:
-        # Generate on-demand and persist for today
-        schedule = _generate_day_schedule(today)
+    # Load the saved schedule for today; a missing or stale one is queued for regeneration
+    schedule, job = _load_day_schedule(user_id, today, has_tasks_for_today)
     items = []
     if schedule:
         for it in schedule.items.all().order_by('position'):
             items.append({'title': it.title, 'start': it.start_time.strftime('%H:%M'), 'end': it.end_time.strftime('%H:%M')})
+    elif job:
+        items = _provisional_items(user_id, today, day_start, day_end)
     # Pull recent creation banner (once)
     try:
         recent_created_date = request.session.pop('recent_schedule_date', None)
@@ -444,63 +437,96 @@ def scheduler(request):
         'items': items,
         'has_tasks_for_date': has_tasks_for_today,
         'has_tasks_any': has_tasks_any,
+        'schedule_pending': job is not None,
         'recently_created_date': recent_created_date,
     })
 
 
+def _not_modified(request, headers, etag, last_modified=None):
+    """A 304 carrying ``headers`` when the request's validators still match, else None."""
+    resp = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if resp is not None:
+        for key, value in headers.items():
+            resp[key] = value
+    return resp
+
+
+def _day_etag(user_id, target: date_cls) -> str:
+    """Validator for ``scheduler_day`` of ``target``, in three small queries.
+
+    The day's schedule and events are covered by its DayRollup stamp (every
+    write that touches the day refreshes the row), tasks and preferences by
+    the user's data versions. The next live deadline is part of it because
+    ``live_tasks`` drops a task the moment its deadline passes, before the
+    sweep bumps any version.
+    """
+    counters = versions.current(versions.TASKS, versions.EVENTS, versions.PREFS, user_id=user_id)
+    stamp = DayRollup.objects.filter(user_id=user_id, day=target).values_list('updated_at', flat=True).first()
+    deadline = live_tasks(user_id).filter(completed=False).aggregate(next=Min('deadline'))['next']
+    return '"day-{}-{}-{}-{}-{}-{}"'.format(
+        target.strftime('%Y%m%d'),
+        counters[versions.TASKS],
+        counters[versions.EVENTS],
+        counters[versions.PREFS],
+        int(stamp.timestamp() * 1000000) if stamp else 0,
+        int(deadline.timestamp()) if deadline else 0,
+    )
+
+
 @login_required
 def scheduler_day(request):
     """Return JSON schedule for a given date.
 
     Prefers saved schedule (Schedule/day_date). Includes calendar events and upcoming tasks.
+    Answers ``If-None-Match`` with a 304 (see ``_day_etag``) before running
+    any of the queries below; a pending response carries no ETag so polling
+    always sees the finished schedule.
     """
     if request.method != 'GET':
         return JsonResponse({'error': 'GET required'}, status=405)
-    cleanup_expired_tasks()
     date_str = request.GET.get('date')
     try:
         target = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else timezone.localdate()
     except Exception:
         target = timezone.localdate()
-    prefs = Preferences.objects.first()
-    def safe_str(s, default):
-        try:
-            t = datetime.strptime((s or default), '%H:%M').time()
-            return t.strftime('%H:%M')
-        except Exception:
-            return default
-    day_start = safe_str(getattr(prefs, 'focus_window_start', None), '09:00')
-    day_end = safe_str(getattr(prefs, 'focus_window_end', None), '18:00')
+    user_id = request.user.id
+    started = timezone.now()
+    etag = _day_etag(user_id, target)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    not_modified = _not_modified(request, headers, etag)
+    if not_modified is not None:
+        return not_modified
+    prefs = get_prefs(user_id)
+    day_start, day_end = prefs.day_start_str, prefs.day_end_str
     # Check tasks applicable to target date and whether any tasks exist at all
-    has_tasks_any = Task.objects.filter(completed=False).exists()
-    has_tasks_for_target = Task.objects.filter(completed=False).filter(
+    has_tasks_any = live_tasks(user_id).filter(completed=False).exists()
+    has_tasks_for_target = live_tasks(user_id).filter(completed=False).filter(
         Q(begin_date__isnull=True) | Q(begin_date__lte=target)
     ).filter(
         Q(deadline__isnull=True) | Q(deadline__date__gte=target)
     ).exists()
-    # Prefer saved schedule
-    schedule = Schedule.objects.filter(day_date=target).order_by('-created_at').first()
+    # Prefer saved schedule; when missing or stale, generation is queued and a
+    # provisional local layout is returned until the job finishes
+    schedule, job = _load_day_schedule(user_id, target, has_tasks_for_target)
+    if job is None and (schedule is None or schedule.created_at >= started):
+        # Generated inline or dropped a stale day: the validator from before the write would never match again
+        headers['ETag'] = _day_etag(user_id, target)
     items = []
     if schedule:
         for it in schedule.items.all().order_by('position'):
-            items.append({'title': it.title, 'start': it.start_time.strftime('%H:%M'), 'end': it.end_time.strftime('%H:%M')})
-    else:
-        if has_tasks_for_target:
-            # Generate on-demand and persist for target date
-            schedule = _generate_day_schedule(target)
-            for it in schedule.items.all().order_by('position'):
-                items.append({'title': it.title, 'start': it.start_time.strftime('%H:%M'), 'end': it.end_time.strftime('%H:%M')})
-        # else: no applicable tasks for this date, return empty items
-    # Events for target date
+            items.append({'id': it.id, 'title': it.title, 'start': it.start_time.strftime('%H:%M'), 'end': it.end_time.strftime('%H:%M')})
+    elif job:
+        items = _provisional_items(user_id, target, day_start, day_end)
+    # Events overlapping the target date (including ones that started earlier)
     events = []
-    for (st, en, title) in CalendarEvent.objects.filter(start_time__date=target).values_list('start_time', 'end_time', 'title'):
-        events.append({'title': title, 'start': st.strftime('%H:%M'), 'end': en.strftime('%H:%M')})
+    for (st, en, title) in events_between(user_id, *day_bounds(target)):
+        events.append({'title': title, 'start': timezone.localtime(st).strftime('%H:%M'), 'end': timezone.localtime(en).strftime('%H:%M')})
     # Upcoming tasks starting after target
     upcoming = []
-    for t in Task.objects.filter(completed=False, begin_date__gt=target).order_by('begin_date')[:20]:
+    for t in live_tasks(user_id).filter(completed=False, begin_date__gt=target).order_by('begin_date')[:20]:
         delta_days = (t.begin_date - target).days if t.begin_date else None
         upcoming.append({'title': t.title, 'begin_date': t.begin_date.strftime('%Y-%m-%d'), 'in_days': delta_days})
-    return JsonResponse({
+    resp = JsonResponse({
         'date': target.strftime('%Y-%m-%d'),
         'day_start': day_start,
         'day_end': day_end,
@@ -509,7 +535,27 @@ def scheduler_day(request):
         'upcoming': upcoming,
         'has_tasks_for_date': has_tasks_for_target,
         'has_tasks_any': has_tasks_any,
+        'status': 'pending' if job else ('ready' if schedule else 'empty'),
+        'job_id': job.id if job else None,
+        'schedule_id': schedule.id if schedule else None,
+        'version': schedule.version if schedule else None,
     })
+    if not job:
+        for key, value in headers.items():
+            resp[key] = value
+    return resp
+
+
+def _month_bounds(value: str, end: bool = False):
+    """Parse ``YYYY-MM-DD`` or ``YYYY-MM`` (first/last day of that month)."""
+    d = parse_date(value)
+    if d:
+        return d
+    year, month = (int(p) for p in value.split('-'))
+    first = date_cls(year, month, 1)
+    if not end:
+        return first
+    return (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
 
 
 @login_required
@@ -517,150 +563,387 @@ def scheduler_month_summary(request):
     """Return JSON summary of total scheduled minutes per day for a month.
 
     Query params: year (YYYY), month (1-12). Defaults to current month.
+    A longer range (e.g. a year view) can be requested in one call with
+    from/to as YYYY-MM or YYYY-MM-DD (at most 400 days).
+    Totals come from the DayRollup table, so this is one indexed range read.
+    The ETag is the range's row count and newest rollup stamp, so an
+    unchanged month is answered with a 304 after a single aggregate.
     """
     if request.method != 'GET':
         return JsonResponse({'error': 'GET required'}, status=405)
     today = timezone.localdate()
-    try:
-        year = int(request.GET.get('year') or today.year)
-        month = int(request.GET.get('month') or today.month)
-    except Exception:
-        year, month = today.year, today.month
-    # First and last day of month
-    first = date_cls(year, month, 1)
-    # compute last day: next month minus one day
-    if month == 12:
-        next_month = date_cls(year+1, 1, 1)
+    payload = {}
+    if request.GET.get('from') or request.GET.get('to'):
+        try:
+            first = _month_bounds(request.GET.get('from') or request.GET.get('to'))
+            last = _month_bounds(request.GET.get('to') or request.GET.get('from'), end=True)
+        except Exception:
+            return JsonResponse({'error': 'from/to must be YYYY-MM or YYYY-MM-DD'}, status=400)
+        if last < first:
+            return JsonResponse({'error': 'to must not be before from'}, status=400)
+        if (last - first).days >= 400:
+            return JsonResponse({'error': 'range too large (max 400 days)'}, status=400)
     else:
-        next_month = date_cls(year, month+1, 1)
-    last = next_month - timedelta(days=1)
-    # Build summary
+        try:
+            year = int(request.GET.get('year') or today.year)
+            month = int(request.GET.get('month') or today.month)
+            first = date_cls(year, month, 1)
+        except Exception:
+            return JsonResponse({'error': 'year must be YYYY and month 1-12'}, status=400)
+        last = _month_bounds(first.strftime('%Y-%m'), end=True)
+        payload.update({'year': year, 'month': month})
+    rollups_in_range = DayRollup.objects.filter(user_id=request.user.id, day__gte=first, day__lte=last)
+    # A deleted row lowers the count, a refreshed one advances the stamp
+    summary = rollups_in_range.aggregate(rows=Count('id'), newest=Max('updated_at'))
+    etag = '"month-{:%Y%m%d}-{:%Y%m%d}-{}-{}"'.format(
+        first, last, summary['rows'], int(summary['newest'].timestamp() * 1000000) if summary['newest'] else 0,
+    )
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    not_modified = _not_modified(request, headers, etag)
+    if not_modified is not None:
+        return not_modified
     minutes_by_day = {}
-    for sch in Schedule.objects.filter(day_date__gte=first, day_date__lte=last):
-        total = 0
-        for it in sch.items.all():
-            total += int((it.end_time - it.start_time).total_seconds() // 60)
-        if sch.day_date:
-            minutes_by_day[sch.day_date.strftime('%Y-%m-%d')] = total
-    return JsonResponse({
-        'year': year,
-        'month': month,
+    items_by_day = {}
+    event_minutes_by_day = {}
+    for day, minutes, count, event_minutes, has_schedule in rollups_in_range.values_list('day', 'scheduled_minutes', 'item_count', 'event_minutes', 'has_schedule'):
+        key = day.strftime('%Y-%m-%d')
+        if has_schedule:
+            minutes_by_day[key] = minutes
+            items_by_day[key] = count
+        if event_minutes:
+            event_minutes_by_day[key] = event_minutes
+    payload.update({
+        'from': first.isoformat(),
+        'to': last.isoformat(),
         'minutes_by_day': minutes_by_day,
+        'items_by_day': items_by_day,
+        'event_minutes_by_day': event_minutes_by_day,
     })
+    resp = JsonResponse(payload)
+    for key, value in headers.items():
+        resp[key] = value
+    return resp
 
 
-def _generate_day_schedule(target_date: date_cls):
-    """Generate and persist a schedule for a specific date, then return the saved Schedule."""
-    prefs = Preferences.objects.first()
-    raw_start = getattr(prefs, 'focus_window_start', None)
-    raw_end = getattr(prefs, 'focus_window_end', None)
-    # Sanitize focus window strings
-    def safe_str(s, default):
-        try:
-            t = datetime.strptime((s or default), '%H:%M').time()
-            return t.strftime('%H:%M')
-        except Exception:
-            return default
-    day_start = safe_str(raw_start, '09:00')
-    day_end = safe_str(raw_end, '18:00')
+@login_required
+def scheduler_range(request):
+    """Return JSON schedules for every date in a range (the multi-day ``scheduler_day``).
+
+    Query params: from/to as YYYY-MM-DD (default a week from today, at most
+    42 days). Preferences, tasks, events and saved schedules are each read
+    once for the whole range and grouped per date in memory, so the query
+    count does not grow with the range. The view never writes a Schedule:
+    from today on, dates with active tasks but no fresh schedule get a
+    provisional local plan, with status ``pending`` and the job queued for
+    them when SCHEDULE_ASYNC is on (one lookup and one bulk insert for the
+    whole range), else status ``none`` until ``scheduler_day`` generates
+    the date. Past dates only show what was saved.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=405)
+    today = timezone.localdate()
+    try:
+        first = datetime.strptime(request.GET['from'], '%Y-%m-%d').date() if request.GET.get('from') else today
+        last = datetime.strptime(request.GET['to'], '%Y-%m-%d').date() if request.GET.get('to') else first + timedelta(days=6)
+    except Exception:
+        return JsonResponse({'error': 'from/to must be YYYY-MM-DD'}, status=400)
+    if last < first:
+        return JsonResponse({'error': 'to must not be before from'}, status=400)
+    if (last - first).days >= 42:
+        return JsonResponse({'error': 'range too large (max 42 days)'}, status=400)
+    user_id = request.user.id
+    dates = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    prefs = get_prefs(user_id)
+    day_start, day_end = prefs.day_start_str, prefs.day_end_str
+    open_tasks = live_tasks(user_id).filter(completed=False)
+    tasks_by_date = _active_tasks_by_date(user_id, dates)
+    # Everything starting inside the range plus the 20 after it covers every date's "upcoming" list
+    upcoming_tasks = list(open_tasks.filter(begin_date__gt=first, begin_date__lte=last).order_by('begin_date'))
+    upcoming_tasks += list(open_tasks.filter(begin_date__gt=last).order_by('begin_date')[:20])
+    has_tasks_any = open_tasks.exists()
+    events = events_by_date(user_id, dates)
+    fresh = {}
+    for d, stale in Schedule.objects.filter(user_id=user_id, day_date__in=dates).values_list('day_date', 'stale'):
+        fresh[d] = fresh.get(d, True) and not stale
+    # Past dates keep whatever was saved; from today on only fresh schedules are shown
+    missing = [d for d in dates if d >= today and tasks_by_date[d] and not fresh.get(d)]
+    provisional = {
+        d: [
+            {'title': it['title'], 'start': it['start'].strftime('%H:%M'), 'end': it['end'].strftime('%H:%M'), 'provisional': True}
+            for it in plan_day(tasks_by_date[d], d, prefs.day_start, prefs.day_end, busy=clip_to_day(events[d], d), break_cadence=prefs.break_cadence)
+        ]
+        for d in missing
+    }
+    queued = jobs.enqueue_day_schedules(user_id, missing) if missing and jobs.async_enabled() else {}
+    schedules = {}
+    for schedule in Schedule.objects.filter(user_id=user_id, day_date__in=dates).order_by('day_date', '-created_at'):
+        if schedule.day_date < today or fresh.get(schedule.day_date):
+            schedules.setdefault(schedule.day_date, schedule)
+    items_by_schedule = {}
+    for it in ScheduleItem.objects.filter(schedule_id__in=[sc.id for sc in schedules.values()]).order_by('position'):
+        items_by_schedule.setdefault(it.schedule_id, []).append(
+            {'id': it.id, 'title': it.title, 'start': it.start_time.strftime('%H:%M'), 'end': it.end_time.strftime('%H:%M')}
+        )
+    days = []
+    for d in dates:
+        schedule = schedules.get(d)
+        upcoming = [
+            {'title': t.title, 'begin_date': t.begin_date.strftime('%Y-%m-%d'), 'in_days': (t.begin_date - d).days}
+            for t in upcoming_tasks if t.begin_date > d
+        ][:20]
+        job = queued.get(d)
+        days.append({
+            'date': d.strftime('%Y-%m-%d'),
+            'items': items_by_schedule.get(schedule.id, []) if schedule else provisional.get(d, []),
+            'events': [
+                {'title': title, 'start': timezone.localtime(st).strftime('%H:%M'), 'end': timezone.localtime(en).strftime('%H:%M')}
+                for st, en, title in events[d]
+            ],
+            'upcoming': upcoming,
+            'has_tasks_for_date': bool(tasks_by_date[d]),
+            'status': 'ready' if schedule else ('pending' if job else ('none' if d in provisional else 'empty')),
+            'job_id': job.id if job else None,
+            'schedule_id': schedule.id if schedule else None,
+            'version': schedule.version if schedule else None,
+        })
+    return JsonResponse({
+        'from': first.strftime('%Y-%m-%d'),
+        'to': last.strftime('%Y-%m-%d'),
+        'day_start': day_start,
+        'day_end': day_end,
+        'has_tasks_any': has_tasks_any,
+        'days': days,
+    })
+
+
+def _generate_day_schedule(user_id, target_date: date_cls):
+    """Generate and persist the user's schedule for a specific date, then return the saved Schedule."""
+    prefs = get_prefs(user_id)
+    day_start, day_end = prefs.day_start_str, prefs.day_end_str
     mode = 'Balanced'
-    # Active tasks for target_date: begin_date <= target_date, deadline is null or >= target_date
-    tasks_qs = Task.objects.filter(completed=False).filter(
+    tasks = _active_tasks_for_date(user_id, target_date)
+    # While the provider is failing (breaker open) go straight to local planning
+    plan = (generate_schedule(list(tasks), mode, day_start, day_end) or '') if provider_available() else ''
+    items = _parse_ai_schedule(plan, target_date, day_start, day_end)
+    # Try to attach tasks by title for AI-produced items
+    if items:
+        _attach_tasks_by_title(items, list(tasks))
+    else:
+        # Fallback to the local planner when AI schedule is unavailable or unparsable
+        items = _seq_schedule_items(user_id, list(tasks), day_start, day_end, for_date=target_date, mode=mode)
+    # Replace any existing schedule for this date
+    return _replace_day_schedules(user_id, {target_date: items}, mode, prefs.day_start, prefs.day_end, plan)[target_date]
+
+
+def _replace_day_schedules(user_id, items_by_date, mode: str, start_t, end_t, plan_text):
+    """Atomically replace the user's saved schedules of the given dates.
+
+    ``items_by_date`` maps a date to its item dicts (title, start, end,
+    position and optional task); ``plan_text`` is the text stored on every
+    Schedule or a ``{date: text}`` dict (missing dates get ''). Old schedules are deleted, then the new
+    Schedules and all their items are written with one bulk insert each, so
+    readers see either the old day or the complete new one.
+    Returns ``{date: Schedule}``.
+    """
+    dates = sorted(items_by_date)
+    texts = {d: plan_text.get(d, '') if isinstance(plan_text, dict) else plan_text for d in dates}
+    with transaction.atomic():
+        Schedule.objects.filter(user_id=user_id, day_date__in=dates).delete()
+        schedules = Schedule.objects.bulk_create([
+            Schedule(
+                user_id=user_id, mode=mode, day_start=start_t, day_end=end_t, day_date=d,
+                plan_text=texts[d], search_text=search.plan_search_text(texts[d]),
+            )
+            for d in dates
+        ])
+        by_date = dict(zip(dates, schedules))
+        ScheduleItem.objects.bulk_create([
+            ScheduleItem(
+                user_id=user_id,
+                schedule=by_date[d],
+                task=it.get('task'),
+                title=it['title'],
+                start_time=it['start'],
+                end_time=it['end'],
+                position=it['position'],
+            )
+            for d in dates for it in items_by_date[d]
+        ])
+        # Bulk write (see core.rollups)
+        rollups.mark_days(user_id, dates)
+        versions.mark(versions.SCHEDULES, user_id=user_id)
+    return by_date
+
+
+def _generate_range_schedules(user_id, dates, mode: str = 'Balanced'):
+    """Generate and persist the user's schedules for several dates with a single LLM call.
+
+    Each date gets its own focus window, busy events and active task set in
+    the prompt; the model answers with one JSON object per date. Dates the
+    model skipped (or every date, when the provider is unavailable) fall back
+    to the local planner. All Schedules/ScheduleItems are written in one
+    transaction. Dates without active tasks are skipped.
+    Returns ``{date: Schedule}``.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return {}
+    prefs = get_prefs(user_id)
+    day_start, day_end = prefs.day_start_str, prefs.day_end_str
+    start_t, end_t = prefs.day_start, prefs.day_end
+    cadence = prefs.break_cadence
+    tasks_by_date = {d: ts for d, ts in _active_tasks_by_date(user_id, dates).items() if ts}
+    dates = [d for d in dates if d in tasks_by_date]
+    if not dates:
+        return {}
+    # Busy time for every date from one event query
+    busy = busy_by_date(user_id, dates)
+    plan = ''
+    if provider_available():
+        days = [{
+            'date': d,
+            'day_start': day_start,
+            'day_end': day_end,
+            'tasks': tasks_by_date[d],
+            'busy': [f"{timezone.localtime(a):%H:%M}-{timezone.localtime(b):%H:%M}" for a, b in sorted(busy[d])],
+        } for d in dates]
+        plan = generate_schedule_range(days, mode) or ''
+    plan_days = _plan_days(plan)
+    items_by_date = {}
+    plan_by_date = {}
+    for d in dates:
+        items = _items_from_json(_day_entry(plan_days, d), d, day_start, day_end)
+        if items:
+            _attach_tasks_by_title(items, tasks_by_date[d])
+            # Each day keeps only its own slice of the multi-day answer
+            plan_by_date[d] = json.dumps({'date': d.strftime('%Y-%m-%d'), 'items': _day_entry(plan_days, d)})
+        else:
+            items = plan_day(tasks_by_date[d], d, start_t, end_t, busy=busy[d], mode=mode, break_cadence=cadence)
+        items_by_date[d] = items
+    return _replace_day_schedules(user_id, items_by_date, mode, start_t, end_t, plan_by_date)
+
+
+@login_required
+def scheduler_generate_range(request):
+    """POST endpoint: plan every date in a range that lacks a fresh schedule.
+
+    Body: {"from": "YYYY-MM-DD", "to": "YYYY-MM-DD"} (at most 42 days; past
+    dates are skipped). With SCHEDULE_ASYNC the dates are queued and the
+    worker batches them into multi-day LLM calls; otherwise they are
+    generated inline, but only the first SCHEDULE_JOB_BATCH_SIZE dates (the
+    worker's batch, one LLM call) so the request stays bounded; the rest are
+    returned as ``deferred`` and get generated when they are viewed.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        first = datetime.strptime(data.get('from') or '', '%Y-%m-%d').date()
+        last = datetime.strptime(data.get('to') or '', '%Y-%m-%d').date()
+    except Exception:
+        return JsonResponse({'error': 'from and to required (YYYY-MM-DD)'}, status=400)
+    user_id = request.user.id
+    first = max(first, timezone.localdate())
+    if last < first:
+        return JsonResponse({'status': 'ready', 'dates': []})
+    if (last - first).days >= 42:
+        return JsonResponse({'error': 'range too large (max 42 days)'}, status=400)
+    wanted = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    fresh = set(Schedule.objects.filter(user_id=user_id, day_date__in=wanted, stale=False).values_list('day_date', flat=True))
+    wanted = [d for d in wanted if d not in fresh]
+    if wanted:
+        active = _active_tasks_by_date(user_id, wanted)
+        wanted = [d for d in wanted if active.get(d)]
+    if not wanted:
+        return JsonResponse({'status': 'ready', 'dates': []})
+    if jobs.async_enabled():
+        queued = jobs.enqueue_day_schedules(user_id, wanted)
+        dates = [d.strftime('%Y-%m-%d') for d in wanted]
+        return JsonResponse({'status': 'pending', 'dates': dates, 'job_ids': [queued[d].id for d in wanted]})
+    # One worker-sized batch (a single LLM call) per request
+    batch, deferred = wanted[:jobs.batch_size()], wanted[jobs.batch_size():]
+    _generate_range_schedules(user_id, batch)
+    return JsonResponse({
+        'status': 'ready',
+        'dates': [d.strftime('%Y-%m-%d') for d in batch],
+        'deferred': [d.strftime('%Y-%m-%d') for d in deferred],
+    })
+
+
+def _active_tasks_for_date(user_id, target_date: date_cls):
+    """The user's active tasks for target_date in planning order.
+
+    Active means begin_date <= target_date and deadline is null or >= target_date.
+    """
+    tasks_qs = live_tasks(user_id).filter(completed=False).filter(
         Q(begin_date__isnull=True) | Q(begin_date__lte=target_date)
     ).filter(
         Q(deadline__isnull=True) | Q(deadline__date__gte=target_date)
     )
+    return sorted(tasks_qs, key=_planning_order)
+
+
+def _planning_order(t):
     pref_order = {'Morning': 0, 'Noon': 1, 'Afternoon': 2, 'Evening': 3, 'Night': 4, 'Any': 5}
     prio_order = {'High': 0, 'Medium': 1, 'Low': 2}
-    tasks = sorted(tasks_qs, key=lambda t: (
+    return (
         pref_order.get(getattr(t, 'time_of_day_pref', 'Any'), 5),
         prio_order.get(t.priority, 1),
         -int((getattr(t, 'daily_time_minutes', 0) or getattr(t, 'duration_minutes', 30))),
-    ))
-    plan = generate_schedule(list(tasks), mode, day_start, day_end) or ''
-    # Replace any existing schedule for this date
-    Schedule.objects.filter(day_date=target_date).delete()
-    # Safely parse for persistence
-    try:
-        start_t = datetime.strptime(day_start, '%H:%M').time()
-    except Exception:
-        start_t = datetime.strptime('09:00', '%H:%M').time()
-    try:
-        end_t = datetime.strptime(day_end, '%H:%M').time()
-    except Exception:
-        end_t = datetime.strptime('18:00', '%H:%M').time()
-    if end_t <= start_t:
-        start_t = datetime.strptime('09:00', '%H:%M').time()
-        end_t = datetime.strptime('18:00', '%H:%M').time()
-    schedule = Schedule.objects.create(
-        mode=mode,
-        day_start=start_t,
-        day_end=end_t,
-        plan_text=plan,
-        day_date=target_date,
     )
-    ai_items = _parse_ai_schedule(plan, target_date, day_start, day_end)
-    # Try to attach tasks by title for AI-produced items
-    if ai_items:
-        _attach_tasks_by_title(ai_items, list(tasks))
-        for s in ai_items:
-            ScheduleItem.objects.create(
-                schedule=schedule,
-                task=s.get('task'),
-                title=s['title'],
-                start_time=s['start'],
-                end_time=s['end'],
-                position=s['position'],
-            )
-    else:
-        # Fallback to sequential layout when AI schedule is unavailable or unparsable
-        seq = _seq_schedule_items(list(tasks), day_start, day_end, for_date=target_date)
-        for s in seq:
-            ScheduleItem.objects.create(
-                schedule=schedule,
-                task=s['task'],
-                title=s['title'],
-                start_time=s['start'],
-                end_time=s['end'],
-                position=s['position'],
-            )
-    return schedule
+
+
+def _active_tasks_by_date(user_id, dates):
+    """``{date: [tasks]}`` of the user's tasks for several dates from a single task query."""
+    first, last = min(dates), max(dates)
+    candidates = list(live_tasks(user_id).filter(completed=False).filter(
+        Q(begin_date__isnull=True) | Q(begin_date__lte=last)
+    ).filter(
+        Q(deadline__isnull=True) | Q(deadline__date__gte=first)
+    ))
+    by_date = {}
+    for d in dates:
+        active = [
+            t for t in candidates
+            if (t.begin_date is None or t.begin_date <= d)
+            and (t.deadline is None or timezone.localtime(t.deadline).date() >= d)
+        ]
+        by_date[d] = sorted(active, key=_planning_order)
+    return by_date
+
+
+def _provisional_items(user_id, target_date: date_cls, day_start: str, day_end: str):
+    """Local sequential layout shown while a background generation job is pending."""
+    seq = _seq_schedule_items(user_id, _active_tasks_for_date(user_id, target_date), day_start, day_end, for_date=target_date)
+    return [
+        {'title': s['title'], 'start': s['start'].strftime('%H:%M'), 'end': s['end'].strftime('%H:%M'), 'provisional': True}
+        for s in seq
+    ]
 
 
 def _parse_ai_schedule(plan_text: str, target_date: date_cls, day_start: str, day_end: str):
     """Parse AI plan text into concrete schedule items.
 
-    Supports two formats:
+    Supports three formats:
     - Strict JSON: {"items": [{"title": "...", "start": "HH:MM", "end": "HH:MM"}], "notes": "..."}
+    - Multi-day JSON: {"days": {"YYYY-MM-DD": {"items": [...]}}} (target_date's entry is used)
     - Fallback line format: "HH:MM-HH:MM Title" (common separators - – —)
     Returns a list of dicts with keys: title, start (aware dt), end (aware dt), position, task(None)
     All items are clamped to the focus window.
     """
     items = []
+    window_start, window_end = parse_window(day_start, day_end)
     # Parse JSON first
     try:
         data = json.loads(plan_text)
+        if isinstance(data, dict) and 'days' in data:
+            # Never fall through to line parsing, which would mix in other dates
+            return _items_from_json(_day_entry(data['days'], target_date), target_date, day_start, day_end)
         arr = data.get('items') if isinstance(data, dict) else (data if isinstance(data, list) else None)
-        if isinstance(arr, list):
-            pos = 0
-            for obj in arr:
-                title = (obj.get('title') or '').strip()
-                st_s = (obj.get('start') or '').strip()
-                en_s = (obj.get('end') or '').strip()
-                if not title or not st_s or not en_s:
-                    continue
-                try:
-                    st_t = datetime.strptime(st_s, '%H:%M').time()
-                    en_t = datetime.strptime(en_s, '%H:%M').time()
-                except Exception:
-                    continue
-                item = _build_item_with_clamp(title, st_t, en_t, target_date, day_start, day_end, pos)
-                if item:
-                    items.append(item)
-                    pos += 1
-            # Only return if we parsed at least one item
-            if items:
-                return items
+        items = _items_from_json(arr, target_date, day_start, day_end)
+        # Only return if we parsed at least one item
+        if items:
+            return items
     except Exception:
         pass
 
@@ -675,22 +958,63 @@ def _parse_ai_schedule(plan_text: str, target_date: date_cls, day_start: str, da
             en_t = datetime.strptime(en_s, '%H:%M').time()
         except Exception:
             continue
-        item = _build_item_with_clamp(title, st_t, en_t, target_date, day_start, day_end, pos)
+        item = _build_item_with_clamp(title, st_t, en_t, target_date, window_start, window_end, pos)
         if item:
             items.append(item)
             pos += 1
     return items
 
 
-def _build_item_with_clamp(title: str, st_t, en_t, target_date: date_cls, day_start: str, day_end: str, pos: int):
-    # Clamp to focus window and discard invalid/empty ranges
+def _plan_days(plan_text: str):
+    """The "days" object (or list) of a multi-day plan; None when unparsable."""
     try:
-        window_start = datetime.strptime(day_start, '%H:%M').time()
-        window_end = datetime.strptime(day_end, '%H:%M').time()
+        data = json.loads(plan_text)
     except Exception:
-        window_start = datetime.strptime('09:00', '%H:%M').time()
-        window_end = datetime.strptime('18:00', '%H:%M').time()
-    # Clamp times
+        data = None
+    return data.get('days') if isinstance(data, dict) else None
+
+
+def _day_entry(days, target_date: date_cls):
+    """Items array for ``target_date`` from a "days" object (keyed by date) or list (with "date")."""
+    iso = target_date.strftime('%Y-%m-%d')
+    entry = None
+    if isinstance(days, dict):
+        entry = days.get(iso)
+    elif isinstance(days, list):
+        entry = next((d for d in days if isinstance(d, dict) and d.get('date') == iso), None)
+    if isinstance(entry, dict):
+        return entry.get('items')
+    return entry if isinstance(entry, list) else None
+
+
+def _items_from_json(arr, target_date: date_cls, day_start: str, day_end: str):
+    items = []
+    if not isinstance(arr, list):
+        return items
+    window_start, window_end = parse_window(day_start, day_end)
+    pos = 0
+    for obj in arr:
+        if not isinstance(obj, dict):
+            continue
+        title = (obj.get('title') or '').strip()
+        st_s = (obj.get('start') or '').strip()
+        en_s = (obj.get('end') or '').strip()
+        if not title or not st_s or not en_s:
+            continue
+        try:
+            st_t = datetime.strptime(st_s, '%H:%M').time()
+            en_t = datetime.strptime(en_s, '%H:%M').time()
+        except Exception:
+            continue
+        item = _build_item_with_clamp(title, st_t, en_t, target_date, window_start, window_end, pos)
+        if item:
+            items.append(item)
+            pos += 1
+    return items
+
+
+def _build_item_with_clamp(title: str, st_t, en_t, target_date: date_cls, window_start, window_end, pos: int):
+    # Clamp to the focus window (``time`` objects, parsed once by the caller) and discard invalid/empty ranges
     st_t = max(st_t, window_start)
     en_t = min(en_t, window_end)
     if en_t <= st_t:
@@ -715,35 +1039,54 @@ def _attach_tasks_by_title(items, tasks):
             it['task'] = t
 
 
-def cleanup_expired_tasks():
-    now = timezone.now()
-    Task.objects.filter(deadline__isnull=False, deadline__lte=now).delete()
-
-
 @login_required
 def update_schedule_order(request, schedule_id):
+    """POST item_ids[] (new order) and optionally version (as last seen).
+
+    Positions and sequential start/end times are recomputed in memory and
+    written with one bulk_update inside a transaction. The schedule version
+    is bumped with a conditional UPDATE; if another edit got there first the
+    request fails with 409 and the current version.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
     try:
-        schedule = Schedule.objects.get(id=schedule_id)
+        schedule = Schedule.objects.get(id=schedule_id, user_id=request.user.id)
     except Schedule.DoesNotExist:
         return JsonResponse({'error': 'Schedule not found'}, status=404)
-    order = request.POST.getlist('item_ids[]')
-    # Update positions
-    for idx, item_id in enumerate(order):
-        ScheduleItem.objects.filter(id=item_id, schedule=schedule).update(position=idx)
-    # Recompute times sequentially based on duration
-    start_time = timezone.make_aware(datetime.combine(timezone.localdate(), schedule.day_start))
-    cursor = start_time
-    for item in schedule.items.all().order_by('position'):
-        dur = item.end_time - item.start_time
-        item.start_time = cursor
-        item.end_time = cursor + dur
-        item.save(update_fields=['start_time', 'end_time'])
-        cursor = item.end_time
+    try:
+        expected = int(request.POST.get('version') or schedule.version)
+    except ValueError:
+        return JsonResponse({'error': 'invalid version'}, status=400)
+    order = {}
+    for idx, item_id in enumerate(request.POST.getlist('item_ids[]')):
+        try:
+            order.setdefault(int(item_id), idx)
+        except ValueError:
+            continue
+    with transaction.atomic():
+        claimed = Schedule.objects.filter(id=schedule.id, version=expected).update(version=F('version') + 1)
+        if not claimed:
+            current = Schedule.objects.filter(id=schedule.id).values_list('version', flat=True).first()
+            return JsonResponse({'error': 'Schedule was changed by another edit', 'version': current}, status=409)
+        items = list(schedule.items.all().order_by('position'))
+        # Listed items take the requested order; any others keep theirs after them
+        items.sort(key=lambda it: (order.get(it.id, len(order)), it.position))
+        # Recompute times sequentially based on duration
+        cursor = timezone.make_aware(datetime.combine(schedule.day_date or timezone.localdate(), schedule.day_start))
+        for idx, item in enumerate(items):
+            dur = item.end_time - item.start_time
+            item.position = idx
+            item.start_time = cursor
+            item.end_time = cursor + dur
+            cursor = item.end_time
+        ScheduleItem.objects.bulk_update(items, ['position', 'start_time', 'end_time'])
+        # Bulk write (see core.rollups)
+        rollups.mark_days(schedule.user_id, [schedule.day_date])
+        versions.mark(versions.SCHEDULES, user_id=schedule.user_id)
     # Return updated items for UI refresh
     updated = []
-    for it in schedule.items.all().order_by('position'):
+    for it in items:
         updated.append({
             'id': str(it.id),
             'title': it.title,
@@ -751,135 +1094,191 @@ def update_schedule_order(request, schedule_id):
             'end': it.end_time.strftime('%H:%M'),
             'position': it.position,
         })
-    return JsonResponse({'ok': True, 'items': updated})
+    return JsonResponse({'ok': True, 'items': updated, 'version': expected + 1})
+
+
+def _task_snapshot(t):
+    """Capture the fields that decide which dates a task can appear on."""
+    return {'begin_date': t.begin_date, 'deadline': t.deadline, 'completed': t.completed}
 
 
-def _invalidate_schedules_from(date_from: date_cls):
-    """Delete ALL saved schedules when tasks change.
+def _task_date_span(state, today: date_cls):
+    """Return (first, last) dates a task state can be scheduled on, or None.
 
-    Previously this deleted from a given date onward; per new requirement,
-    we remove every saved schedule so views regenerate on demand.
+    ``last`` is None for tasks without a deadline (open-ended). Past dates are
+    never affected; saved history stays as it was.
     """
+    if not state:
+        return None
+    first = state.get('begin_date') or today
+    if isinstance(first, str):
+        first = parse_date(first) or today
+    first = max(first, today)
+    deadline = state.get('deadline')
+    if isinstance(deadline, str):
+        deadline = parse_datetime(deadline) or parse_date(deadline)
+    last = None
+    if deadline:
+        if isinstance(deadline, datetime):
+            # The local calendar date, as the planner and rollups use
+            last = timezone.localtime(deadline).date() if timezone.is_aware(deadline) else deadline.date()
+        else:
+            last = deadline
+        if last < first:
+            return None
+    return first, last
+
+
+def _invalidate_schedules_for_task(user_id, before, after):
+    """Mark the user's saved schedules stale on every date the task could affect.
+
+    ``before``/``after`` are the task state prior to and following the change
+    (a ``_task_snapshot`` dict or a Task; None for create/delete). A task that
+    was completed on both sides affects nothing. Schedules are flagged, not
+    deleted, so only dates that are viewed again pay for a regeneration.
+    """
+    if isinstance(after, Task):
+        after = _task_snapshot(after)
+    if (before or {}).get('completed', True) and (after or {}).get('completed', True):
+        return 0
+    today = timezone.localdate()
+    cond = Q()
+    for state in (before, after):
+        span = _task_date_span(state, today)
+        if not span:
+            continue
+        first, last = span
+        rng = Q(day_date__gte=first)
+        if last:
+            rng &= Q(day_date__lte=last)
+        cond |= rng
+    if not cond:
+        return 0
     try:
-        Schedule.objects.all().delete()
+        return Schedule.objects.filter(cond, user_id=user_id, stale=False).update(stale=True)
     except Exception:
-        pass
+        return 0
+
+
+def _load_day_schedule(user_id, target_date: date_cls, has_tasks: bool):
+    """Return the user's ``(schedule, job)`` for ``target_date``.
+
+    A fresh saved Schedule is returned as is. A missing or stale one is
+    regenerated: queued as a ScheduleJob when SCHEDULE_ASYNC is on (so the
+    request never waits on OpenAI), otherwise generated inline.
+    """
+    schedule = Schedule.objects.filter(user_id=user_id, day_date=target_date).order_by('-created_at').first()
+    if schedule and not schedule.stale:
+        return schedule, None
+    if has_tasks:
+        if jobs.async_enabled():
+            return None, jobs.enqueue_day_schedule(user_id, target_date)
+        return _generate_day_schedule(user_id, target_date), None
+    if schedule:
+        # Stale and nothing left to plan for this date
+        Schedule.objects.filter(user_id=user_id, day_date=target_date).delete()
+    return None, None
 
 
 @login_required
 def export_schedule_ics(request, schedule_id):
     try:
-        schedule = Schedule.objects.get(id=schedule_id)
+        schedule = Schedule.objects.get(id=schedule_id, user_id=request.user.id)
     except Schedule.DoesNotExist:
         return HttpResponse('Not found', status=404)
-    lines = [
-        'BEGIN:VCALENDAR',
-        'VERSION:2.0',
-        'PRODID:-//Todou AI//Kash Scheduler//EN',
-    ]
-    for it in schedule.items.all():
-        def fmt(dt):
-            return dt.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
-        lines += [
-            'BEGIN:VEVENT',
-            f'SUMMARY:{it.title}',
-            f'DTSTART:{fmt(it.start_time)}',
-            f'DTEND:{fmt(it.end_time)}',
-            'END:VEVENT',
-        ]
-    lines.append('END:VCALENDAR')
-    ics = "\r\n".join(lines)
-    resp = HttpResponse(ics, content_type='text/calendar')
+    events = (_feed_event(schedule.user_id, schedule.day_date, it.position, it.title, it.start_time, it.end_time)
+              for it in schedule.items.all().order_by('position'))
+    resp = HttpResponse(''.join(ics.calendar_lines(events)), content_type='text/calendar')
     resp['Content-Disposition'] = f'attachment; filename="schedule-{schedule.id}.ics"'
     return resp
 
 
-def analytics_view(request):
-    total_tasks = Task.objects.count()
-    completed_tasks = Task.objects.filter(completed=True).count()
-    latest = Schedule.objects.order_by('-created_at').first()
-    total_minutes = 0
-    if latest:
-        for it in latest.items.all():
-            total_minutes += int((it.end_time - it.start_time).total_seconds() // 60)
-
-    # Charts data
-    # Completion chart
-    completion_labels = ['Completed', 'Incomplete']
-    completion_data = [completed_tasks, max(total_tasks - completed_tasks, 0)]
-
-    # Priority distribution (incomplete tasks)
-    priority_labels = ['High', 'Medium', 'Low']
-    priority_data = [
-        Task.objects.filter(completed=False, priority='High').count(),
-        Task.objects.filter(completed=False, priority='Medium').count(),
-        Task.objects.filter(completed=False, priority='Low').count(),
-    ]
+def _feed_event(user_id, day, position, title, start, end, dtstamp=None):
+    """VEVENT dict for a schedule item; the UID names the user's slot (day +
+    position), so it survives the item being regenerated and never collides
+    with another user's feed."""
+    uid = f'{day:%Y%m%d}-{position}-u{user_id}@todou-ai' if day else None
+    return {'uid': uid, 'title': title, 'start': start, 'end': end, 'dtstamp': dtstamp}
 
-    # Energy distribution (incomplete tasks)
-    energy_labels = ['High', 'Normal', 'Low']
-    energy_data = [
-        Task.objects.filter(completed=False, energy_level='High').count(),
-        Task.objects.filter(completed=False, energy_level='Normal').count(),
-        Task.objects.filter(completed=False, energy_level='Low').count(),
-    ]
 
-    # Schedule minutes per day (last 14 schedules)
-    scheds = list(Schedule.objects.exclude(day_date__isnull=True).order_by('-day_date')[:14])
-    schedule_labels = [s.day_date.strftime('%Y-%m-%d') for s in reversed(scheds)]
-    schedule_data = []
-    for s in reversed(scheds):
-        mins = 0
-        for it in s.items.all():
-            mins += int((it.end_time - it.start_time).total_seconds() // 60)
-        schedule_data.append(mins)
-
-    # Additional analytics
-    # Tasks created per day (last 14 days)
+def schedule_feed(request):
+    """ICS subscription feed of the saved day schedules in a date range.
+
+    Query params: from/to as YYYY-MM or YYYY-MM-DD (default 30 days back to
+    90 days ahead, at most 400 days). ETag and Last-Modified come from the
+    schedules data version, so a client polling an unchanged feed gets a
+    304 after a single lookup; otherwise the items are streamed.
+
+    Calendar clients cannot log in, so ``?token=`` with the user's feed
+    token (Preferences.feed_token) selects whose schedules are served;
+    without one a session is required.
+    """
+    token = request.GET.get('token')
+    if token:
+        user_id = Preferences.objects.filter(feed_token=token).values_list('user_id', flat=True).first()
+        if user_id is None:
+            return HttpResponse('Not found', status=404)
+    elif request.user.is_authenticated:
+        user_id = request.user.id
+    else:
+        return redirect_to_login(request.get_full_path())
     today = timezone.localdate()
-    last_days = [today - timedelta(days=i) for i in range(13, -1, -1)]
-    tasks_created_labels = [d.strftime('%Y-%m-%d') for d in last_days]
-    tasks_created_data = [Task.objects.filter(created_at__date=d).count() for d in last_days]
-
-    # Task type distribution (all tasks)
-    task_type_labels = [c[0] for c in Task.TASK_TYPE_CHOICES]
-    task_type_data = [Task.objects.filter(task_type=label).count() for label in task_type_labels]
-
-    # Time-of-day preference distribution (incomplete tasks)
-    time_pref_labels = [c[0] for c in Task.TIME_OF_DAY_CHOICES]
-    time_pref_data = [Task.objects.filter(completed=False, time_of_day_pref=label).count() for label in time_pref_labels]
-
-    # Schedule mode distribution (recent schedules)
-    mode_labels = [c[0] for c in Schedule.MODE_CHOICES]
-    recent_scheds = Schedule.objects.order_by('-created_at')[:50]
-    mode_counts = {m: 0 for m in mode_labels}
-    for sch in recent_scheds:
-        mode_counts[sch.mode] = mode_counts.get(sch.mode, 0) + 1
-    schedule_mode_labels = mode_labels
-    schedule_mode_data = [mode_counts[m] for m in mode_labels]
-
-    return render(request, 'analytics.html', {
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'latest_schedule': latest,
-        'total_minutes': total_minutes,
-        'completion_labels': completion_labels,
-        'completion_data': completion_data,
-        'priority_labels': priority_labels,
-        'priority_data': priority_data,
-        'energy_labels': energy_labels,
-        'energy_data': energy_data,
-        'schedule_labels': schedule_labels,
-        'schedule_data': schedule_data,
-        'tasks_created_labels': tasks_created_labels,
-        'tasks_created_data': tasks_created_data,
-        'task_type_labels': task_type_labels,
-        'task_type_data': task_type_data,
-        'time_pref_labels': time_pref_labels,
-        'time_pref_data': time_pref_data,
-        'schedule_mode_labels': schedule_mode_labels,
-        'schedule_mode_data': schedule_mode_data,
-    })
+    try:
+        first = _month_bounds(request.GET['from']) if request.GET.get('from') else today - timedelta(days=30)
+        last = _month_bounds(request.GET['to'], end=True) if request.GET.get('to') else today + timedelta(days=90)
+    except Exception:
+        return HttpResponse('from/to must be YYYY-MM or YYYY-MM-DD', status=400, content_type='text/plain')
+    if last < first or (last - first).days >= 400:
+        return HttpResponse('invalid range (max 400 days)', status=400, content_type='text/plain')
+    counters, modified = versions.state(versions.SCHEDULES, user_id=user_id)
+    # The session URL is the same for every user: name the user in the validator and keep shared caches out
+    etag = f'"schedules-u{user_id}-{counters[versions.SCHEDULES]}-{first:%Y%m%d}-{last:%Y%m%d}"'
+    last_modified = int(modified.timestamp()) if modified else None
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified)
+    not_modified = _not_modified(request, headers, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    rows = ScheduleItem.objects.filter(
+        user_id=user_id,
+        schedule__day_date__range=(first, last),
+    ).order_by('schedule__day_date', 'position').values_list(
+        'schedule__day_date', 'position', 'title', 'start_time', 'end_time',
+    ).iterator(chunk_size=500)
+    events = (_feed_event(user_id, *row, dtstamp=modified) for row in rows)
+    extra = ['X-PUBLISHED-TTL:PT15M', 'REFRESH-INTERVAL;VALUE=DURATION:PT15M']
+    resp = StreamingHttpResponse(ics.calendar_lines(events, name='Kash schedule', extra=extra), content_type='text/calendar; charset=utf-8')
+    for key, value in headers.items():
+        resp[key] = value
+    return resp
+
+
+@login_required
+def search_view(request):
+    """JSON search over the user's tasks, schedule items, events and plans (see core.search).
+
+    Query params: q (every word matched as a prefix), limit (default 20, at most 50).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=405)
+    query = (request.GET.get('q') or '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit') or 20), 1), 50)
+    except Exception:
+        limit = 20
+    return JsonResponse({'query': query, 'results': search.search(request.user.id, query, limit)})
+
+
+@login_required
+def analytics_view(request):
+    ctx = dict(analytics_snapshot(request.user.id))
+    # Only the id is used (export link); avoid loading the row
+    latest_id = ctx.pop('latest_schedule_id', None)
+    ctx['latest_schedule'] = {'id': latest_id} if latest_id else None
+    ctx['plan_cache'] = plan_cache_stats()
+    ctx['ai_breaker'] = breaker_state()
+    return render(request, 'analytics.html', ctx)
 
 
 def register(request):
@@ -128,6 +128,41 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Kash AI (OpenAI) configuration
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+# Point at an OpenAI-compatible server, e.g. http://127.0.0.1:8765/v1 for `manage.py fake_openai`
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', '')
+# Shared client (core.llm): timeouts, jittered retries on 429/5xx, circuit breaker
+OPENAI_TIMEOUT_SECONDS = float(os.environ.get('OPENAI_TIMEOUT_SECONDS', 20))
+OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', 2))
+OPENAI_RETRY_BASE_SECONDS = float(os.environ.get('OPENAI_RETRY_BASE_SECONDS', 0.5))
+OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', 10))
+OPENAI_BREAKER_FAILURES = int(os.environ.get('OPENAI_BREAKER_FAILURES', 5))
+OPENAI_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('OPENAI_BREAKER_COOLDOWN_SECONDS', 60))
+# Token budget for the tasks/schedules context in calendar chat prompts
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', 1500))
+
+# Generated plan cache (core.plan_cache): in-process LRU + DB tier
+PLAN_CACHE_TTL_SECONDS = int(os.environ.get('PLAN_CACHE_TTL_SECONDS', 6 * 3600))
+PLAN_CACHE_MEMORY_MAX_ENTRIES = int(os.environ.get('PLAN_CACHE_MEMORY_MAX_ENTRIES', 256))
+PLAN_CACHE_DB_MAX_ENTRIES = int(os.environ.get('PLAN_CACHE_DB_MAX_ENTRIES', 5000))
+
+# Queue schedule generation for the run_schedule_worker command instead of
+# calling OpenAI inside the request. Only enable it where that worker runs
+# (see render.yaml): without one, queued days stay pending.
+SCHEDULE_ASYNC = config('SCHEDULE_ASYNC', default=False, cast=bool)
+# Queued dates a worker plans together in one multi-day LLM call
+SCHEDULE_JOB_BATCH_SIZE = int(os.environ.get('SCHEDULE_JOB_BATCH_SIZE', 7))
+# Expired-task sweep (run_schedule_worker / sweep_expired_tasks): at most once per
+# interval per process, deleting in chunks of TASK_SWEEP_BATCH_SIZE
+TASK_SWEEP_INTERVAL_SECONDS = int(os.environ.get('TASK_SWEEP_INTERVAL_SECONDS', 300))
+TASK_SWEEP_BATCH_SIZE = int(os.environ.get('TASK_SWEEP_BATCH_SIZE', 500))
+# How often a process re-checks the preferences version (core.prefs); local saves apply at once
+PREFS_VERSION_CHECK_SECONDS = float(os.environ.get('PREFS_VERSION_CHECK_SECONDS', 5))
+# Recurring events (core.recurrence): expanded windows kept per process, and how far
+# ahead an open-ended series is counted in the day rollups
+RECURRENCE_CACHE_WINDOWS = int(os.environ.get('RECURRENCE_CACHE_WINDOWS', 256))
+RECURRENCE_ROLLUP_DAYS = int(os.environ.get('RECURRENCE_ROLLUP_DAYS', 366))
+# Task list rows per keyset page (first render and each infinite-scroll fetch)
+TASK_PAGE_SIZE = int(os.environ.get('TASK_PAGE_SIZE', 50))
 
 # Auth redirects
 LOGIN_URL = '/login/'